@@ -2,18 +2,52 @@ from flask import Flask
 from app.config import Config
 from flask import Flask
 from app.config import config
+from app.utils.context_builder import init_summary_updater
 from app.extensions import init_extensions
 from app.routes import register_routes
+from app.utils.finance import init_finance
+from app.utils.jobs import init_job_runner
+from app.utils.llm_client import init_llm_client
+from app.utils.metrics import init_metrics
+from app.utils.savable import init_savable
+from app.utils.search_index import init_search
+from app.utils.speculative import init_speculative
+from app.utils.search_indexer import init_search_indexer
+from app.utils.upload_stream import UploadRequest
 
 def create_app(config_name='default'):
     """应用工厂函数"""
     app = Flask(__name__)
+    app.request_class = UploadRequest  # 上传文件流式写入上传目录
     app.config.from_object(config[config_name])
     
     # 初始化扩展
     init_extensions(app)
     
+    # 请求耗时统计和/metrics接口
+    init_metrics(app)
+    
     # 注册路由
     register_routes(app)
     
+    # 初始化大模型客户端
+    init_llm_client(app)
+    
+    # 初始化可保存信息分类器和信息项预提取
+    init_savable(app)
+    init_speculative(app)
+    
+    # 初始化后台摘要更新
+    init_summary_updater(app)
+    
+    # 初始化检索服务和后台索引器（索引器线程由服务进程启动）
+    search = init_search(app)
+    init_search_indexer(app, search)
+    
+    # 注册财务记录命令
+    init_finance(app)
+    
+    # 初始化后台任务线程池
+    init_job_runner(app)
+    
     return app
\ No newline at end of file
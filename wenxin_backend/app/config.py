@@ -9,24 +9,127 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # 每个进程的数据库连接池大小（gunicorn.conf.py按工作模式设置）
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))  # 连接池满时最多额外创建的连接数
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # 连接最长复用时间（秒），应小于MySQL的wait_timeout
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'  # 取出连接时先检测是否可用，避免使用已被服务端断开的连接
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))  # 连接池耗尽时等待空闲连接的最长时间（秒）
+    DB_DRIVER = os.getenv('DB_DRIVER', 'pymysql')  # MySQL驱动：pymysql、mysqlclient（C实现，需另外安装）或auto（已安装mysqlclient时使用）
+    DATABASE_REPLICA_URI = os.getenv('DATABASE_REPLICA_URI')  # 可选：只读副本，列表、详情和统计接口从副本读取
     JWT_SECRET_KEY = os.getenv('SECRET_KEY')
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_EXPIRATION_DELTA', 86400))
     
      # JWT黑名单配置
     JWT_BLACKLIST_ENABLED = True
     JWT_BLACKLIST_TOKEN_CHECKS = ['access']
+    JWT_BLOCKLIST_REFRESH_SECONDS = float(os.getenv('JWT_BLOCKLIST_REFRESH_SECONDS', 5))  # 其他进程吊销的Token最多延迟多久生效
+    JWT_BLOCKLIST_BLOOM_CAPACITY = int(os.getenv('JWT_BLOCKLIST_BLOOM_CAPACITY', 100000))  # 布隆过滤器预估容量
+    JWT_BLOCKLIST_PURGE_INTERVAL = int(os.getenv('JWT_BLOCKLIST_PURGE_INTERVAL', 3600))  # 清理过期黑名单记录的间隔（秒），0表示不清理
     
     # 服务配置
     VECTOR_DB_URL = os.getenv('VECTOR_DB_URL')
     DASHSCOPE_API_KEY = os.getenv('DASHSCOPE_API_KEY')
     SPEECH_API_KEY = os.getenv('SPEECH_RECOGNITION_API_KEY')
     OCR_API_KEY = os.getenv('OCR_API_KEY')
+
+    # 大模型调用配置
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'dashscope')  # dashscope 或 fake（本地模拟，离线测试和压测用）
+    LLM_FAKE_LATENCY = float(os.getenv('LLM_FAKE_LATENCY', 0.0))  # 模拟模型每次调用（流式时每段输出）的延迟（秒）
+    LLM_BASE_URL = os.getenv('LLM_BASE_URL', 'https://dashscope.aliyuncs.com/compatible-mode/v1')
+    LLM_TEXT_MODEL = os.getenv('LLM_TEXT_MODEL', 'qwen-plus')  # 文本信息提取
+    LLM_CHAT_MODEL = os.getenv('LLM_CHAT_MODEL', 'qwen-plus')  # 对话回复
+    LLM_OCR_MODEL = os.getenv('LLM_OCR_MODEL', 'qwen-vl-ocr')  # 图片信息提取
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 30))  # 单次调用总时限（含重试，秒）
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))  # 临时错误的最大重试次数
+    LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', 0.5))  # 重试退避基数（秒）
+    LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 20))  # HTTP连接池大小
+    LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', 5))  # 连续失败多少次后熔断
+    LLM_BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', 30))  # 熔断冷却时间（秒）
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'  # 是否缓存信息提取类调用的结果
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1024))  # 进程内缓存条目上限
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 3600))  # 缓存过期时间（秒）
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH')  # 可选：SQLite缓存文件路径，多个工作进程共享
+    
+    # 监控指标配置
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # 是否统计请求和数据库耗时
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # 访问/metrics需要携带的Bearer Token（未配置时不提供/metrics接口）
+    METRICS_TIMING_LOG = os.getenv('METRICS_TIMING_LOG', 'false').lower() in ('1', 'true', 'yes')  # 是否为每个请求输出JSON格式的耗时日志
+    METRICS_SLOW_REQUEST_MS = float(os.getenv('METRICS_SLOW_REQUEST_MS', 0))  # 只记录耗时超过该值（毫秒）的请求
     
     # 安全配置
     ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY')
 
     # 文件上传配置
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+    UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 20 * 1024 * 1024))  # 单个上传文件的最大字节数
+    UPLOAD_QUOTA_BYTES = int(os.getenv('UPLOAD_QUOTA_BYTES', 0))  # 每个用户的上传总量上限，0表示不限制
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 1024 * 1024))  # 普通接口的请求体上限
+    UPLOAD_MAX_CONTENT_LENGTH = UPLOAD_MAX_BYTES + 1024 * 1024  # 上传接口的请求体上限（文件之外留出表单字段的空间）
+    UPLOAD_KEEP_IN_MEMORY_BYTES = int(os.getenv('UPLOAD_KEEP_IN_MEMORY_BYTES', 8 * 1024 * 1024))  # 不超过此大小的上传文件保留在内存中直接处理
+    UPLOAD_KEEP_IN_MEMORY_REQUEST_BYTES = int(os.getenv('UPLOAD_KEEP_IN_MEMORY_REQUEST_BYTES', 32 * 1024 * 1024))  # 一次请求中保留在内存中的上传文件总大小，超出后的文件从磁盘读取
+    BATCH_UPLOAD_MAX_ITEMS = int(os.getenv('BATCH_UPLOAD_MAX_ITEMS', 50))  # 批量上传单次最多的文件和文本条数
+    BATCH_UPLOAD_MAX_BYTES = int(os.getenv('BATCH_UPLOAD_MAX_BYTES', 200 * 1024 * 1024))  # 批量上传的请求体上限
+    BATCH_UPLOAD_CONCURRENCY = int(os.getenv('BATCH_UPLOAD_CONCURRENCY', 8))  # 批量上传时同时调用模型的最大数量
+
+    # OCR图片预处理配置
+    OCR_MAX_SIDE = int(os.getenv('OCR_MAX_SIDE', 1600))  # 发送给OCR模型的图片最长边（像素）
+    OCR_JPEG_QUALITY = int(os.getenv('OCR_JPEG_QUALITY', 85))  # 重新编码的JPEG质量
+    OCR_DERIVED_FOLDER = os.getenv('OCR_DERIVED_FOLDER')  # 预处理图片缓存目录，默认为UPLOAD_FOLDER/derived
+
+    # 对话上下文配置
+    CHAT_CONTEXT_WINDOW = int(os.getenv('CHAT_CONTEXT_WINDOW', 20))  # 最多读取最近多少条消息
+    CHAT_CONTEXT_MAX_TOKENS = int(os.getenv('CHAT_CONTEXT_MAX_TOKENS', 1000))  # 上下文（含摘要）token上限
+    CHAT_SUMMARY_BATCH = int(os.getenv('CHAT_SUMMARY_BATCH', 10))  # 窗口外积累多少条旧消息后更新一次摘要
+    CHAT_SUMMARY_MAX_CHARS = int(os.getenv('CHAT_SUMMARY_MAX_CHARS', 300))  # 摘要长度上限（字）
+    CHAT_SUMMARY_ASYNC = os.getenv('CHAT_SUMMARY_ASYNC', 'true').lower() in ('1', 'true', 'yes')  # 是否在后台线程中更新摘要（更新期间使用已有摘要）
+    CHAT_SUMMARY_WORKERS = int(os.getenv('CHAT_SUMMARY_WORKERS', 1))  # 摘要更新线程数
+    QWEN_TOKENIZER_PATH = os.getenv('QWEN_TOKENIZER_PATH')  # 可选：Qwen的tokenizer.json路径（需安装tokenizers），用于精确计算token
+
+    # 可保存信息判断配置（本地分类器，与生成回复并行）
+    SAVABLE_MODEL_PATH = os.getenv('SAVABLE_MODEL_PATH')  # 可选：scripts/train_savable.py训练的模型文件（.npz），未配置时只用规则
+    SAVABLE_THRESHOLD = float(os.getenv('SAVABLE_THRESHOLD', 0.5))  # 模型判定为可保存的概率阈值（模型文件中的阈值优先）
+    SAVABLE_WORKERS = int(os.getenv('SAVABLE_WORKERS', 2))  # 分类线程数
+    SPECULATIVE_EXTRACTION_ENABLED = os.getenv('SPECULATIVE_EXTRACTION_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # 判定可保存时是否在后台预先提取信息项
+    SPECULATIVE_TTL = float(os.getenv('SPECULATIVE_TTL', 300))  # 预提取结果的有效期（秒）
+    SPECULATIVE_WAIT = float(os.getenv('SPECULATIVE_WAIT', 10))  # 保存时预提取仍在进行，最多等待多少秒
+    SPECULATIVE_WORKERS = int(os.getenv('SPECULATIVE_WORKERS', 2))  # 预提取线程数
+    SPECULATIVE_MAX_ENTRIES = int(os.getenv('SPECULATIVE_MAX_ENTRIES', 1000))  # 最多缓存多少个对话的预提取结果
+
+    # 检索配置
+    SEARCH_INDEX_PATH = os.getenv('SEARCH_INDEX_PATH', 'search_index')  # 检索索引目录，为空时只保存在内存中
+    EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', 256))  # 本地哈希嵌入的向量维度
+    SEARCH_IVF_MIN_ITEMS = int(os.getenv('SEARCH_IVF_MIN_ITEMS', 20000))  # 单个用户信息项达到此数量时启用IVF近似检索
+    SEARCH_IVF_NPROBE = int(os.getenv('SEARCH_IVF_NPROBE', 8))  # IVF检索时扫描的倒排列表数
+    SEARCH_MAX_LOADED_USERS = int(os.getenv('SEARCH_MAX_LOADED_USERS', 32))  # 最多同时加载多少个用户的索引
+    SEARCH_SAVE_EVERY = int(os.getenv('SEARCH_SAVE_EVERY', 2000))  # 索引新增多少条后压缩保存一次
+    SEARCH_SYNC_INTERVAL = float(os.getenv('SEARCH_SYNC_INTERVAL', 1.0))  # 检索时最多每隔多少秒从数据库同步一次新信息项
+    SEARCH_INDEXER_ENABLED = os.getenv('SEARCH_INDEXER_ENABLED', 'false').lower() in ('1', 'true', 'yes')  # 是否由后台检索索引器维护索引（关闭时写入后直接更新本进程的索引）
+    SEARCH_INDEXER_IN_WORKERS = os.getenv('SEARCH_INDEXER_IN_WORKERS', 'true').lower() in ('1', 'true', 'yes')  # 启用索引器时是否在gunicorn工作进程中运行；false时只在flask search-indexer专用进程中运行
+    SEARCH_INDEXER_BATCH = int(os.getenv('SEARCH_INDEXER_BATCH', 256))  # 索引器每批嵌入的行数
+    SEARCH_INDEXER_INTERVAL = float(os.getenv('SEARCH_INDEXER_INTERVAL', 5.0))  # 没有新写入通知时的轮询间隔（秒）
+    SEARCH_INDEXER_OVERLAP = float(os.getenv('SEARCH_INDEXER_OVERLAP', 5.0))  # 每次扫描从水位线回退的秒数（覆盖提交较晚的事务）
+    SEARCH_INDEXER_LEASE = float(os.getenv('SEARCH_INDEXER_LEASE', 30.0))  # 写索引租约的有效期（秒）
+    SEARCH_SAVE_IDLE = float(os.getenv('SEARCH_SAVE_IDLE', 30.0))  # 索引器空闲多少秒后保存剩余改动
+    VECTOR_DB_COLLECTION = os.getenv('VECTOR_DB_COLLECTION', 'user_infos')  # 向量库集合名（配置VECTOR_DB_URL时使用）
+    VECTOR_DB_API_KEY = os.getenv('VECTOR_DB_API_KEY')
+
+    # 摘要生成配置（/api/generate）
+    DIGEST_MAP_BATCH = int(os.getenv('DIGEST_MAP_BATCH', 50))  # 每次调用模型总结的最多信息项数
+    DIGEST_MAX_CHARS = int(os.getenv('DIGEST_MAX_CHARS', 500))  # 摘要长度上限（字）
+    DIGEST_CONCURRENCY = int(os.getenv('DIGEST_CONCURRENCY', 4))  # 同时生成多少个时间段的摘要
+
+    # 财务记录配置（/api/info/finance）
+    FINANCE_DEFAULT_CURRENCY = os.getenv('FINANCE_DEFAULT_CURRENCY', 'CNY')  # 提取结果未注明币种时使用
+
+    # 列表分页配置
+    PAGE_SIZE = int(os.getenv('PAGE_SIZE', 50))  # 默认每页条数
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 200))  # 每页最大条数
+
+    # 异步任务配置（上传后后台调用模型）
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))  # 后台工作线程数
+    JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', 100))  # 队列最大长度，超出时拒绝新任务
+    JOB_QUEUE_BACKEND = os.getenv('JOB_QUEUE_BACKEND', 'memory')  # memory 或 sqlite
+    JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', 'jobs.sqlite3')  # sqlite队列文件路径
     
 class DevelopmentConfig(Config):
     """开发环境配置"""
@@ -2,26 +2,38 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from app.utils.database import configure_engines, RoutingSession
 
 
 # 初始化扩展
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # 支持只读请求从副本查询
 migrate = Migrate()
 jwt = JWTManager()
 cors = CORS()
 def init_extensions(app):
     """初始化所有扩展"""
+    # 连接池参数、MySQL驱动和只读副本
+    configure_engines(app)
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
-    cors.init_app(app)
+    cors.init_app(app, expose_headers=['X-Next-Cursor'])  # 允许前端读取分页游标
 
-    # 将TokenBlocklist的导入移到函数内部，避免循环导入
-    from app.models.user_info import TokenBlocklist
+    # 将黑名单缓存的导入移到函数内部，避免循环导入
+    from app.utils.token_blocklist import RevocationCache, BlocklistPurger
+    from app.utils.metrics import span
+
+    # 进程内黑名单缓存，绝大多数请求无需查询TokenBlocklist表
+    revocation_cache = RevocationCache(
+        refresh_interval=app.config.get('JWT_BLOCKLIST_REFRESH_SECONDS', 5),
+        capacity=app.config.get('JWT_BLOCKLIST_BLOOM_CAPACITY', 100000)
+    )
+    purger = BlocklistPurger(app, revocation_cache, app.config.get('JWT_BLOCKLIST_PURGE_INTERVAL', 3600))
+    app.extensions['token_revocation'] = revocation_cache
 
     # 添加JWT回调函数
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        jti = jwt_payload["jti"]
-        token = db.session.query(TokenBlocklist.id).filter_by(jti=jti).scalar()
-        return token is not None
\ No newline at end of file
+        purger.start()  # 首次校验Token时启动后台清理线程
+        with span('jwt_blocklist'):
+            return revocation_cache.is_revoked(jwt_payload["jti"])
\ No newline at end of file
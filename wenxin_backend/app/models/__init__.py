@@ -1 +1 @@
-from app.models.user_info import User, UserInfo, TokenBlocklist
\ No newline at end of file
+from app.models.user_info import User, UserInfo, TokenBlocklist, UploadBlob, UploadQuota, ProcessJob, SearchTombstone, IndexerState, DigestCache, FinanceRecord
\ No newline at end of file
@@ -10,12 +10,18 @@ def beijing_time():
 class Conversation(db.Model):
     """对话模型（包含多个UserInfo信息项）"""
     __tablename__ = 'conversations'
+    __table_args__ = (
+        # 对话列表按(更新时间, id)倒序游标分页
+        db.Index('ix_conversations_user_updated', 'user_id', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # 关联用户
     title = db.Column(db.String(255), nullable=False)  # 对话标题（取自首次上传内容）
     created_at = db.Column(db.DateTime, default=beijing_time)  # 对话创建时间（北京时间）
-    updated_at = db.Column(db.DateTime, onupdate=beijing_time)  # 最后更新时间
+    updated_at = db.Column(db.DateTime, default=beijing_time, onupdate=beijing_time)  # 最后更新时间
+    summary = db.Column(db.Text)  # 较早消息的滚动摘要（构建上下文时使用）
+    summary_message_id = db.Column(db.Integer)  # 已并入摘要的最后一条消息ID
     
     # 关联该对话下的所有信息项
     info_items = db.relationship('UserInfo', backref='conversation', lazy='dynamic', cascade='all, delete-orphan')
@@ -44,6 +50,16 @@ class User(db.Model):
 class UserInfo(db.Model):
     """用户信息模型"""
     __tablename__ = 'user_infos'
+    __table_args__ = (
+        # 信息列表按用户（和分类）筛选、按创建时间倒序分页
+        db.Index('ix_user_infos_user_category_created', 'user_id', 'category', 'created_at'),
+        # 对话详情中按时间顺序列出信息项
+        db.Index('ix_user_infos_conversation_created', 'conversation_id', 'created_at'),
+        # 检索索引按(更新时间, id)水位线增量同步
+        db.Index('ix_user_infos_updated', 'updated_at', 'id'),
+        # 未启用索引器时，各进程按用户的更新时间同步修改过的信息项
+        db.Index('ix_user_infos_user_updated', 'user_id', 'updated_at'),
+    )
     
     # 新增：关联对话的外键
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
@@ -58,7 +74,10 @@ class UserInfo(db.Model):
     title = db.Column(db.String(255))  # 提取的信息标题
     description = db.Column(db.Text)  # 提取的信息详细描述
     created_at = db.Column(db.DateTime, default=beijing_time)
-    updated_at = db.Column(db.DateTime, onupdate=beijing_time)
+    updated_at = db.Column(db.DateTime, default=beijing_time, onupdate=beijing_time)
+
+    # 财务信息项解析出的金额记录（删除信息项时一并删除）
+    finance_record = db.relationship('FinanceRecord', backref='info', uselist=False, cascade='all, delete-orphan')
 
 class TokenBlocklist(db.Model):
     """Token黑名单模型"""
@@ -69,16 +88,126 @@ class TokenBlocklist(db.Model):
     created_at = db.Column(db.DateTime, default=beijing_time, nullable=False)
 
 
+class UploadBlob(db.Model):
+    """上传文件内容存储（按内容哈希去重，同一文件只保存一份）"""
+    __tablename__ = 'upload_blobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    digest = db.Column(db.String(64), unique=True, nullable=False)  # 文件内容的SHA-256
+    file_path = db.Column(db.String(255), nullable=False)  # 文件存储路径
+    size = db.Column(db.Integer, nullable=False)  # 文件大小（字节）
+    extracted_items = db.Column(db.JSON)  # AI提取结果（为空表示尚未成功提取）
+    created_at = db.Column(db.DateTime, default=beijing_time)
+
+
+class UploadQuota(db.Model):
+    """用户上传用量（用于限制每个用户的上传总量）"""
+    __tablename__ = 'upload_quotas'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    bytes_used = db.Column(db.BigInteger, nullable=False, default=0)  # 已上传字节数
+    file_count = db.Column(db.Integer, nullable=False, default=0)  # 已上传文件数
+    updated_at = db.Column(db.DateTime, default=beijing_time, onupdate=beijing_time)
+
+
+class ProcessJob(db.Model):
+    """异步信息处理任务（上传后立即返回任务ID，由后台线程调用模型）"""
+    __tablename__ = 'process_jobs'
+
+    id = db.Column(db.String(36), primary_key=True)  # 任务ID（uuid4）
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
+    info_type = db.Column(db.String(32), nullable=False)  # text, image, other
+    content = db.Column(db.Text, nullable=False)  # 原始文本或文件路径
+    metadata_info = db.Column(db.JSON)  # 元数据（如文件哈希、大小）
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, running, done, failed
+    result = db.Column(db.JSON)  # 处理结果（提取的信息项列表）
+    error = db.Column(db.Text)  # 失败原因
+    created_at = db.Column(db.DateTime, default=beijing_time)
+    updated_at = db.Column(db.DateTime, onupdate=beijing_time)
+
+
 class Message(db.Model):
     """对话消息模型（用户与智能体的交互内容）"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        # 构建上下文时按时间倒序读取最近的消息
+        db.Index('ix_messages_conversation_created', 'conversation_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)  # 关联对话
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # 关联用户
     role = db.Column(db.String(10), nullable=False)  # 角色：user/assistant
     content = db.Column(db.Text, nullable=False)  # 消息内容
+    token_count = db.Column(db.Integer)  # 消息的估算token数（写入时计算）
     created_at = db.Column(db.DateTime, default=beijing_time)  # 消息时间
     
     # 关联关系
-    conversation = db.relationship('Conversation', backref=db.backref('messages', lazy='dynamic', cascade='all, delete-orphan'))
\ No newline at end of file
+    conversation = db.relationship('Conversation', backref=db.backref('messages', lazy='dynamic', cascade='all, delete-orphan'))
+
+
+class SearchTombstone(db.Model):
+    """已删除信息项的记录（删除时写入，检索索引器从索引中移除后删除）"""
+    __tablename__ = 'search_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    info_id = db.Column(db.Integer, nullable=False)  # 被删除的信息项ID
+    user_id = db.Column(db.Integer, nullable=False)
+    vector_id = db.Column(db.String(64))  # 向量库中的ID（未写入向量库时为空）
+    created_at = db.Column(db.DateTime, default=beijing_time)
+
+
+class IndexerState(db.Model):
+    """检索索引器的进度和租约（多进程部署时只有持有租约的进程写索引）"""
+    __tablename__ = 'indexer_state'
+
+    name = db.Column(db.String(32), primary_key=True)  # incremental 或 backfill
+    watermark_at = db.Column(db.DateTime)  # 已处理到的UserInfo.updated_at
+    watermark_id = db.Column(db.Integer, default=0)  # 同一更新时间内已处理到的ID
+    cursor_user_id = db.Column(db.Integer, default=0)  # 回填进度：当前用户
+    cursor_id = db.Column(db.Integer, default=0)  # 回填进度：当前用户下已处理到的ID
+    lease_owner = db.Column(db.String(64))  # 持有租约的进程
+    lease_until = db.Column(db.DateTime)  # 租约到期时间
+    updated_at = db.Column(db.DateTime, default=beijing_time, onupdate=beijing_time)
+
+
+class DigestCache(db.Model):
+    """按(用户, 分类, 时间段)缓存的信息摘要，时间段内信息项的指纹变化时重新生成"""
+    __tablename__ = 'digest_cache'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'category', 'kind', 'period_start', name='uq_digest_cache_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category = db.Column(db.String(32), nullable=False)  # 信息分类，all表示全部分类
+    kind = db.Column(db.String(8), nullable=False)  # day, week, month
+    period_start = db.Column(db.Date, nullable=False)  # 时间段开始日期
+    fingerprint = db.Column(db.String(128), nullable=False)  # 生成摘要时时间段内信息项的指纹
+    summary = db.Column(db.Text, nullable=False)
+    item_count = db.Column(db.Integer, default=0)
+    last_item_id = db.Column(db.Integer)  # 已并入摘要的最大信息项ID（按天的摘要增量更新时使用）
+    created_at = db.Column(db.DateTime, default=beijing_time)
+    updated_at = db.Column(db.DateTime, default=beijing_time, onupdate=beijing_time)
+
+
+class FinanceRecord(db.Model):
+    """财务信息项的结构化金额记录（按时间、交易对方汇总时直接在数据库中计算）"""
+    __tablename__ = 'finance_records'
+    __table_args__ = (
+        # 按用户和日期范围汇总收支
+        db.Index('ix_finance_records_user_date', 'user_id', 'occurred_on'),
+        # 按交易对方汇总
+        db.Index('ix_finance_records_user_counterparty', 'user_id', 'counterparty'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    info_id = db.Column(db.Integer, db.ForeignKey('user_infos.id'), unique=True, nullable=False)  # 对应的信息项
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    amount = db.Column(db.Numeric(14, 2), nullable=False)  # 金额（正数）
+    currency = db.Column(db.String(8), nullable=False, default='CNY')  # 币种（ISO代码）
+    direction = db.Column(db.String(8), nullable=False, default='expense')  # expense（支出）或 income（收入）
+    occurred_on = db.Column(db.Date, nullable=False)  # 发生日期
+    counterparty = db.Column(db.String(255))  # 交易对方（商户、付款人等）
+    created_at = db.Column(db.DateTime, default=beijing_time)
\ No newline at end of file
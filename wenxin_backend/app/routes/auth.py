@@ -1,5 +1,5 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, get_jwt
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import create_access_token, get_jwt, jwt_required
 from app.models.user_info import User,TokenBlocklist
 from app.extensions import db
 from app.utils.auth import verify_password
@@ -41,10 +41,13 @@ def login():
     return jsonify(access_token=access_token), 200
 
 @auth_bp.post('/logout')
+@jwt_required()
 def logout():
     """用户退出登录"""
     jti = get_jwt()["jti"]
     now = datetime.utcnow()
     db.session.add(TokenBlocklist(jti=jti, created_at=now))
     db.session.commit()
+    # 立即加入本进程的黑名单缓存
+    current_app.extensions['token_revocation'].revoke(jti)
     return jsonify(message="退出登录成功"), 200
\ No newline at end of file
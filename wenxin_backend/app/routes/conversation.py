@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.database import read_replica
 from app.extensions import db
 from app.models.user_info import Conversation, UserInfo, beijing_time, Message
+from app.utils.pagination import get_page_size, apply_keyset, encode_cursor
+from sqlalchemy import func
 from datetime import timedelta
 
 conversation_bp = Blueprint('conversation', __name__)
@@ -26,13 +29,17 @@ def create_conversation():
 
 @conversation_bp.route('', methods=['GET'])
 @jwt_required()
+@read_replica
 def list_conversations():
-    """获取用户的对话列表（支持按时间范围筛选：7天/30天）"""
+    """
+    获取用户的对话列表（支持按时间范围筛选：7天/30天）
+    按更新时间倒序游标分页：limit指定每页条数，下一页游标在响应头X-Next-Cursor中返回
+    """
     user_id = int(get_jwt_identity())
     date_range = request.args.get('date_range')  # 可选参数：7days/30days
     
-    # 基础查询：用户的所有对话，按更新时间倒序（最新的在前面）
-    query = Conversation.query.filter_by(user_id=user_id).order_by(Conversation.updated_at.desc())
+    # 基础查询：用户的所有对话
+    query = Conversation.query.filter_by(user_id=user_id)
     
     # 时间范围筛选
     if date_range:
@@ -44,17 +51,41 @@ def list_conversations():
         else:
             return jsonify({'error': '时间范围参数无效，支持7days或30days'}), 400
     
-    conversations = query.all()
-    return jsonify([{
+    # 按更新时间倒序（最新的在前面）游标分页
+    page_size = get_page_size()
+    try:
+        query = apply_keyset(query, Conversation.updated_at, Conversation.id, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    conversations = query.limit(page_size + 1).all()
+    has_more = len(conversations) > page_size
+    conversations = conversations[:page_size]
+    
+    # 一次分组查询统计本页各对话的信息项数量
+    info_counts = {}
+    if conversations:
+        info_counts = dict(
+            db.session.query(UserInfo.conversation_id, func.count(UserInfo.id))
+            .filter(UserInfo.conversation_id.in_([conv.id for conv in conversations]))
+            .group_by(UserInfo.conversation_id)
+            .all()
+        )
+    
+    response = jsonify([{
         'id': conv.id,
         'title': conv.title,
         'created_at': conv.created_at.isoformat(),
         'updated_at': conv.updated_at.isoformat() if conv.updated_at else None,
-        'info_count': conv.info_items.count()  # 该对话包含的信息项数量
-    } for conv in conversations]), 200
+        'info_count': info_counts.get(conv.id, 0)  # 该对话包含的信息项数量
+    } for conv in conversations])
+    if has_more:
+        last = conversations[-1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last.updated_at, last.id)
+    return response, 200
 
 @conversation_bp.route('/<int:conv_id>', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_conversation(conv_id):
     """获取单个对话详情（包含该对话下的所有信息项）"""
     user_id = int(get_jwt_identity())
@@ -89,9 +120,113 @@ def get_conversation(conv_id):
 
 
 
-import dashscope
-from flask import current_app
-from app.utils.ai_process import detect_savable_info,process_text_with_ai,truncate_context
+import json
+from flask import Response, stream_with_context, current_app
+from app.utils.ai_process import process_text_with_ai,estimate_token_length,chat_reply,stream_chat_reply
+from app.utils.context_builder import build_context
+from app.utils.info_store import save_info_items
+from app.utils.metrics import span
+from app.utils.savable import get_savable_classifier
+from app.utils.speculative import get_speculative_extractor, recent_save_content
+from app.utils.search_index import index_user_infos
+
+# 系统提示：定义智能体身份
+SYSTEM_PROMPT = """
+        你是问心智能体，一个友好的助手。你的主要功能是：
+        1. 与用户进行自然对话
+        2. 回复简洁明了，符合中文表达习惯
+
+        重要要求：
+        - 当用户与你打招呼的时候,请介绍自己是问心智能体。
+        """
+
+# 保存指令的确认回复（不调用模型）
+SAVED_REPLY = "已为你保存相关信息,可在对话详情中查看。"
+# 回复中的保存提示（模型仍输出该提示时同样预提取信息项）
+SAVE_HINT = '如需保存以上信息'
+
+def message_to_dict(msg):
+    """消息对象转为接口返回格式"""
+    return {
+        'id': msg.id,
+        'content': msg.content,
+        'created_at': msg.created_at.isoformat()
+    }
+
+def add_message(conv_id, user_id, role, content):
+    """写入一条消息并flush，返回接口格式（提交后不再读取该对象，避免重新打开事务）"""
+    msg = Message(
+        conversation_id=conv_id,
+        user_id=user_id,
+        role=role,
+        content=content,
+        token_count=estimate_token_length(content)
+    )
+    db.session.add(msg)
+    db.session.flush()
+    return message_to_dict(msg)
+
+def save_assistant_message(conv_id, user_id, assistant_reply):
+    """保存智能体回复并更新对话最后更新时间（一次短事务），返回回复的接口格式"""
+    assistant_reply_data = add_message(conv_id, user_id, 'assistant', assistant_reply)
+    Conversation.query.filter_by(id=conv_id).update(
+        {Conversation.updated_at: beijing_time()}, synchronize_session=False
+    )
+    db.session.commit()
+    return assistant_reply_data
+
+def savable_result(future):
+    """取出可保存信息的判断结果（判断出错时视为不可保存）"""
+    if future is None:
+        return False
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"可保存信息判断错误: {e}")
+        return False
+
+def speculate_if_savable(conv_id, assistant_reply, savable):
+    """回复后用户可能发送保存指令时，在后台预先提取信息项"""
+    extractor = get_speculative_extractor()
+    if extractor is not None and (savable or SAVE_HINT in assistant_reply):
+        extractor.start(conv_id)
+
+def sse_event(data, event=None):
+    """按SSE格式编码一条事件"""
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+def stream_message_reply(conv_id, user_id, user_message_data, messages, savable_future=None):
+    """流式生成回复：逐段推送给客户端，结束后一次性保存完整回复"""
+    yield sse_event({'user_message': user_message_data}, event='start')
+    
+    chunks = []
+    try:
+        for delta in stream_chat_reply(messages):
+            chunks.append(delta)
+            yield sse_event({'delta': delta})
+    except Exception as e:
+        print(f"AI回复生成失败: {e}")
+        if not chunks:
+            chunks.append("抱歉,我暂时无法回复,请稍后再试。")
+        yield sse_event({'error': 'AI回复生成失败'}, event='error')
+    
+    assistant_reply = ''.join(chunks)
+    assistant_reply_data = save_assistant_message(conv_id, user_id, assistant_reply)
+    savable = savable_result(savable_future)
+    speculate_if_savable(conv_id, assistant_reply, savable)
+    yield sse_event({
+        'assistant_reply': assistant_reply_data,
+        'savable': savable
+    }, event='done')
+
+def stream_canned_reply(user_message_data, assistant_reply_data):
+    """以与流式回复相同的事件格式返回不需要调用模型的回复"""
+    yield sse_event({'user_message': user_message_data}, event='start')
+    yield sse_event({'delta': assistant_reply_data['content']})
+    yield sse_event({'assistant_reply': assistant_reply_data, 'savable': False}, event='done')
 
 @conversation_bp.route('/<int:conv_id>/message', methods=['POST'])
 @jwt_required()
@@ -110,110 +245,83 @@ def send_message(conv_id):
     if not user_message:
         return jsonify({'error': '消息内容不能为空'}), 400
     
-    # 1. 保存用户消息
-    user_msg = Message(
-        conversation_id=conv_id,
-        user_id=user_id,
-        role='user',
-        content=user_message
-    )
-    db.session.add(user_msg)
+    # 1. 获取历史对话上下文（较早消息的摘要 + 最近的消息，控制在token上限内）
+    with span('context_build'):
+        context = build_context(conversation)
     
-    # 2. 获取历史对话上下文（最近10轮，避免token过长）
-    history_messages = conversation.messages.order_by(Message.created_at.asc()).limit(20).all()
-    context = [
-        {'role': msg.role, 'content': msg.content} 
-        for msg in history_messages
-    ]
-    # 截断上下文至最大token限制（例如1000token）
-    context = truncate_context(context, max_tokens=1000)
+    # 2. 保存用户消息并立即提交（第一次短事务），之后调用模型期间没有打开的事务
+    user_message_data = add_message(conv_id, user_id, 'user', user_message)
+    db.session.commit()
 
     # 限制用户输入长度（例如150字符）
     if len(user_message) > 150:
       user_message = user_message[:150] + "..."  # 截断并添加省略号
 
+    # stream=true 时以SSE方式逐段返回回复，降低首字延迟
+    stream = request.args.get('stream', '').lower() in ('1', 'true') or data.get('stream') is True
+
     # 2.5 检测用户是否发送保存指令
     user_intent = user_message.strip().lower()
     if user_intent in ['保存', '是', '需要保存']:
-       # 提取最近对话内容生成待保存文本
-       recent_content = "\n".join([f"{msg['role']}: {msg['content']}" for msg in context[-5:]])  # 取最近5条
-       # 调用现有文本处理函数生成信息项
-       extracted_items = process_text_with_ai(recent_content)
-    
-       # 保存到UserInfo
-       for item in extracted_items:
-        user_info = UserInfo(
-            user_id=user_id,
-            conversation_id=conv_id,
-            info_type='text',
-            content=recent_content,
-            category=item['category'],
-            title=item['title'],
-            description=item['description']
-        )
-        db.session.add(user_info)
+       # 提取保存指令之前的最近对话内容生成待保存文本，随后结束只读事务
+       recent_content = recent_save_content(conv_id, before_id=user_message_data['id'])
        db.session.commit()
+       # 优先使用上一轮回复后在后台预提取的信息项，没有可用结果时再调用模型
+       extracted_items = None
+       extractor = get_speculative_extractor()
+       if extractor is not None and not data.get('no_cache'):
+           extracted_items = extractor.take(conv_id, recent_content, current_app.config.get('SPECULATIVE_WAIT', 10))
+       if extracted_items is None:
+           extracted_items = process_text_with_ai(recent_content, use_cache=not data.get('no_cache'))
+    
+       # 第二次短事务：批量写入信息项并更新对话，与确认回复一起提交
+       save_info_items(conversation, user_id, 'text', recent_content, extracted_items, return_ids=False)
+       assistant_reply_data = save_assistant_message(conv_id, user_id, SAVED_REPLY)
+       index_user_infos(user_id)
     
-       # 生成确认回复
-       assistant_reply = "已为你保存相关信息,可在对话详情中查看。"
+       # 确认回复是固定文本，不再调用模型生成回复
+       if stream:
+           return Response(
+               stream_canned_reply(user_message_data, assistant_reply_data),
+               mimetype='text/event-stream',
+               headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+           )
+       return jsonify({
+           'user_message': user_message_data,
+           'assistant_reply': assistant_reply_data,
+           'savable': False
+       }), 201
 
+    # 本地判断消息是否包含可保存的信息（不调用模型），与生成回复并行
+    savable_future = get_savable_classifier().submit(user_message_data['content'])
        
     # 3. 调用AI生成回复（问心智能体身份）
-    try:
-        dashscope.api_key = current_app.config.get('DASHSCOPE_API_KEY')
-        # 系统提示：定义智能体身份
-        system_prompt = """
-        你是问心智能体，一个友好的助手。你的主要功能是：
-        1. 与用户进行自然对话
-        2. 当对话中涉及需要记录的信息（如会议安排、工作任务、财务收支等）时，会提示用户是否需要保存
-        3. 回复简洁明了，符合中文表达习惯
-
-        重要要求：
-        - 当用户与你打招呼的时候,请介绍自己是问心智能体。
-        - 当识别到可保存的信息时，必须在回复末尾添加以下快捷操作提示：
-        【如需保存以上信息，请回复"保存"或点击保存按钮】
-        """
-        
-        # 构建对话历史
-        messages = [{'role': 'system', 'content': system_prompt}] + context
-        messages.append({'role': 'user', 'content': user_message})  # 最新用户消息
-        
-        # 调用大模型
-        response = dashscope.Generation.call(
-            model='qwen-plus',
-            messages=messages,
-            result_format='message'
+    # 构建对话历史
+    messages = [{'role': 'system', 'content': SYSTEM_PROMPT}] + context
+    messages.append({'role': 'user', 'content': user_message})  # 最新用户消息
+    
+    if stream:
+        return Response(
+            stream_with_context(stream_message_reply(conv_id, user_id, user_message_data, messages, savable_future)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
         )
-        assistant_reply = response.output.choices[0].message.content
-        
-        
+    
+    try:
+        # 调用大模型（可保存信息的判断同时在分类线程中进行）
+        assistant_reply = chat_reply(messages)
     except Exception as e:
         print(f"AI回复生成失败: {e}")
         assistant_reply = "抱歉,我暂时无法回复,请稍后再试。"
+    savable = savable_result(savable_future)
     
-    # 4. 保存智能体回复
-    assistant_msg = Message(
-        conversation_id=conv_id,
-        user_id=user_id,
-        role='assistant',
-        content=assistant_reply
-    )
-    db.session.add(assistant_msg)
+    # 4. 第二次短事务：保存智能体回复，并更新对话最后更新时间
+    assistant_reply_data = save_assistant_message(conv_id, user_id, assistant_reply)
+    speculate_if_savable(conv_id, assistant_reply, savable)
     
-    # 5. 更新对话最后更新时间
-    conversation.updated_at = beijing_time()
-    db.session.commit()
-    
-    # 6. 返回结果（包含用户消息和智能体回复）
+    # 5. 返回结果（包含用户消息、智能体回复，以及是否可以提示用户保存）
     return jsonify({
-        'user_message': {
-            'id': user_msg.id,
-            'content': user_msg.content,
-            'created_at': user_msg.created_at.isoformat()
-        },
-        'assistant_reply': {
-            'id': assistant_msg.id,
-            'content': assistant_msg.content,
-            'created_at': assistant_msg.created_at.isoformat()
-        }
-    }), 201
\ No newline at end of file
+        'user_message': user_message_data,
+        'assistant_reply': assistant_reply_data,
+        'savable': savable
+    }), 201
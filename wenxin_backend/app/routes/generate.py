@@ -1,11 +1,32 @@
 # app/routes/generate.py
-from flask import Blueprint
+from datetime import date
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models.user_info import beijing_time
+from app.utils.ai_process import VALID_CATEGORIES
+from app.utils.digest import PERIODS, build_digest
 
 # 创建生成模块的蓝图（命名为 generate_bp，与导入名称一致）
 generate_bp = Blueprint('generate', __name__)
 
-# 预留生成相关接口示例（可选）
-# @generate_bp.route('/text', methods=['POST'])
-# def generate_text():
-#     # 文本生成逻辑
-#     return jsonify({"generated_text": "示例内容"}), 200
\ No newline at end of file
+@generate_bp.route('/digest', methods=['GET'])
+@jwt_required()
+def generate_digest():
+    """
+    生成用户某一天/周/月的信息摘要（按天缓存，信息项未变化时不重复调用模型）
+    参数：period（day/week/month，默认day）、category（可选分类）、date（YYYY-MM-DD，默认今天）
+    """
+    user_id = int(get_jwt_identity())
+
+    period = request.args.get('period', 'day')
+    if period not in PERIODS:
+        return jsonify({'error': f"period必须是{'、'.join(PERIODS)}之一"}), 400
+    category = request.args.get('category')
+    if category and category not in VALID_CATEGORIES:
+        return jsonify({'error': '分类无效'}), 400
+    try:
+        day = date.fromisoformat(request.args['date']) if request.args.get('date') else beijing_time().date()
+    except ValueError:
+        return jsonify({'error': 'date格式应为YYYY-MM-DD'}), 400
+
+    return jsonify(build_digest(user_id, category, period, day)), 200
@@ -1,4 +1,45 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.database import read_replica
+from app.utils.finance import FINANCE_GROUPS, FINANCE_DIRECTIONS, finance_summary, parse_date
+from app.utils.pagination import get_page_size
 
 # 创建info模块的蓝图
 info_bp = Blueprint('info', __name__)
+
+@info_bp.route('/finance', methods=['GET'])
+@jwt_required()
+@read_replica
+def finance_stats():
+    """
+    汇总用户的收支（在数据库中计算，不调用模型）
+    参数：group_by（total/day/month/counterparty，默认total）、start、end（YYYY-MM-DD，包含两端）、
+    direction（expense/income）、currency（如CNY）、limit（按交易对方分组时返回的条数）
+    """
+    user_id = int(get_jwt_identity())
+
+    group_by = request.args.get('group_by', 'total')
+    if group_by not in FINANCE_GROUPS:
+        return jsonify({'error': f"group_by必须是{'、'.join(FINANCE_GROUPS)}之一"}), 400
+    direction = request.args.get('direction')
+    if direction and direction not in FINANCE_DIRECTIONS:
+        return jsonify({'error': f"direction必须是{'、'.join(FINANCE_DIRECTIONS)}之一"}), 400
+    start, end = request.args.get('start'), request.args.get('end')
+    if (start and not parse_date(start)) or (end and not parse_date(end)):
+        return jsonify({'error': '日期格式应为YYYY-MM-DD'}), 400
+    currency = request.args.get('currency')
+
+    groups = finance_summary(
+        user_id, group_by,
+        start=parse_date(start) if start else None,
+        end=parse_date(end) if end else None,
+        direction=direction,
+        currency=currency.upper() if currency else None,
+        limit=get_page_size() if group_by == 'counterparty' else None
+    )
+    return jsonify({
+        'group_by': group_by,
+        'start': start,
+        'end': end,
+        'groups': groups
+    }), 200
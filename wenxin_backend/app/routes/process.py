@@ -1,10 +1,23 @@
-import os
+import json
 import uuid
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.database import read_replica
 from app.extensions import db
-from app.models.user_info import UserInfo, Conversation
-from app.utils.ai_process import process_text_with_ai, process_image_with_ai
+from app.models.user_info import UserInfo, Conversation, ProcessJob
+from app.utils.blob_store import save_blob, get_or_create_blob
+from app.utils.info_store import (
+    extract_image_items, extract_text_items, extract_items_concurrently,
+    save_info_items, insert_info_items,
+    is_first_upload, touch_conversation
+)
+from app.utils.jobs import JobQueueFull
+from app.utils.metrics import span
+from app.utils.search_index import index_user_infos
+from app.utils.pagination import get_page_size, apply_keyset, encode_cursor
+from app.utils.upload_quota import remaining_quota, record_upload
+from app.utils.upload_stream import uploaded_size
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
 
 
 process_bp = Blueprint('process', __name__)
@@ -15,179 +28,358 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'txt'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@process_bp.route('/upload', methods=['POST'])
-@jwt_required()
-def upload_info():
-    """上传信息并进行分类处理"""
-    user_id = int(get_jwt_identity())
-    
+@process_bp.errorhandler(RequestEntityTooLarge)
+def handle_too_large(e):
+    return jsonify({'error': '上传内容过大'}), 413
+
+@process_bp.errorhandler(UnsupportedMediaType)
+def handle_unsupported_type(e):
+    return jsonify({'error': '文件内容与扩展名不符'}), 415
+
+# 请求体中文件之外的表单字段和multipart分隔符预留的字节数
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+def apply_upload_limit(user_id):
+    """
+    按用户剩余配额设置本次请求的文件大小上限，配额已用完时返回错误响应
+    在解析请求体之前调用：Content-Length明显超出剩余配额时直接拒绝，不读取上传内容
+    """
+    remaining = remaining_quota(user_id)
+    if remaining is None:
+        return None
+    if remaining <= 0:
+        return jsonify({'error': '上传空间已用完'}), 413
+    if request.content_length and request.content_length > remaining + FORM_OVERHEAD_BYTES:
+        return jsonify({'error': '上传空间不足'}), 413
+    request.upload_limit = min(remaining, current_app.config.get('UPLOAD_MAX_BYTES') or remaining)
+    return None
+
+def cache_bypass_requested():
+    """请求是否要求跳过模型结果缓存（no_cache=1 或 Cache-Control: no-cache）"""
+    if request.values.get('no_cache', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'no-cache' in request.headers.get('Cache-Control', '').lower()
+
+def get_upload_conversation(user_id):
+    """读取表单中的conversation_id并验证对话属于当前用户，返回(对话, 错误响应)"""
     # 获取对话ID（必传参数）
     conversation_id = request.form.get('conversation_id')
     if not conversation_id:
-        return jsonify({'error': '缺少conversation_id参数（必须指定对话）'}), 400
+        return None, (jsonify({'error': '缺少conversation_id参数（必须指定对话）'}), 400)
     try:
         conversation_id = int(conversation_id)
     except ValueError:
-        return jsonify({'error': 'conversation_id必须是整数'}), 400
+        return None, (jsonify({'error': 'conversation_id必须是整数'}), 400)
     
     # 验证对话是否属于当前用户
     conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id).first()
     if not conversation:
-        return jsonify({'error': '对话不存在或无权访问'}), 404
-    # 判断是否为首次上传
-    is_first_upload = not UserInfo.query.filter_by(conversation_id=conversation_id).first()
+        return None, (jsonify({'error': '对话不存在或无权访问'}), 404)
+    return conversation, None
+
+@process_bp.route('/upload', methods=['POST'])
+@jwt_required()
+def upload_info():
+    """上传信息并进行分类处理"""
+    user_id = int(get_jwt_identity())
+    
+    # 读取表单前放宽请求体上限，并按剩余配额限制文件大小（文件在解析请求体时就直接写入磁盘）
+    request.max_content_length = current_app.config.get('UPLOAD_MAX_CONTENT_LENGTH')
+    error = apply_upload_limit(user_id)
+    if error:
+        return error
+    
+    conversation, error = get_upload_conversation(user_id)
+    if error:
+        return error
+    conversation_id = conversation.id
     # 检查是否有文件或文本内容
     if 'file' not in request.files and 'text' not in request.form:
         return jsonify({'error': '没有提供文件或文本内容'}), 400
     
-    info_items = []
-    user_infos = []  # 存储待提交的用户信息对象
+    # async=1 时只保存原始内容并返回任务ID，由后台线程调用模型
+    run_async = request.form.get('async', '').lower() in ('1', 'true', 'yes')
+    metadata_info = None
+    blob = None
+    image_bytes = None
     
     # 处理文件上传
     if 'file' in request.files:
         file = request.files['file']
-        if file and allowed_file(file.filename):
-            info_type = 'image' if file.filename.rsplit('.', 1)[1].lower() in ['png', 'jpg', 'jpeg'] else 'other'
-            
-            # 保存文件
-            filename = str(uuid.uuid4()) + '.' + file.filename.rsplit('.', 1)[1].lower()
-            file_path = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), filename)
-            
-            # 确保上传目录存在
-            os.makedirs(os.path.dirname(file_path) if os.path.dirname(file_path) else '.', exist_ok=True)
-            file.save(file_path)
-            
-            # 使用AI处理图片并提取多个信息项
-            try:
-                extracted_items = process_image_with_ai(file_path)
-                
-                # 为每个提取的信息项创建数据库记录（仅保留这一个循环）
-                for item in extracted_items:
-                    user_info = UserInfo(
-                        user_id=user_id,
-                        conversation_id=conversation_id,
-                        info_type=info_type,
-                        content=file_path,
-                        category=item['category'],
-                        title=item['title'],
-                        description=item['description']
-                    )
-                    db.session.add(user_info)
-                    user_infos.append(user_info)
-                    info_items.append({
-                        'title': item['title'],
-                        'category': item['category']
-                    })
-                    
-            except Exception as e:
-                # 如果AI处理失败，创建一个默认记录
-                print(f"AI处理图片时出错: {e}")
-                user_info = UserInfo(
-                    user_id=user_id,
-                    conversation_id=conversation_id,
-                    info_type=info_type,
-                    content=file_path,
-                    category='temporary',
-                    title='图片文件',
-                    description='上传的图片文件'
-                )
-                db.session.add(user_info)
-                user_infos.append(user_info)
-                info_items.append({
-                    'title': '图片文件',
-                    'category': 'temporary'
-                })
-        else:
+        if not (file and allowed_file(file.filename)):
             return jsonify({'error': '文件类型不支持'}), 400
+        extension = file.filename.rsplit('.', 1)[1].lower()
+        info_type = 'image' if extension in ['png', 'jpg', 'jpeg'] else 'other'
+        
+        # 先占用上传配额（检查和累加在同一条UPDATE中完成），超出时文件不会被保存
+        if not record_upload(user_id, uploaded_size(file)):
+            return jsonify({'error': '上传空间不足'}), 413
+        
+        # 按内容哈希保存文件（相同内容只保存一份）
+        upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+        with span('file_save'):
+            digest, file_path, size, image_bytes = save_blob(
+                file, upload_folder, extension,
+                keep_bytes_limit=current_app.config.get('UPLOAD_KEEP_IN_MEMORY_BYTES', 0)
+            )
+        blob = get_or_create_blob(digest, file_path, size)
+        content = blob.file_path
+        metadata_info = {'digest': digest, 'size': size}
     
     # 处理文本内容
-    elif 'text' in request.form:
+    else:
         info_type = 'text'
         content = request.form['text']
-        
-        # 使用AI处理文本并提取多个信息项
-        try:
-            extracted_items = process_text_with_ai(content)
-            
-            # 为每个提取的信息项创建数据库记录（仅保留这一个循环）
-            for item in extracted_items:
-                user_info = UserInfo(
-                    user_id=user_id,
-                    conversation_id=conversation_id,
-                    info_type=info_type,
-                    content=content,
-                    category=item['category'],
-                    title=item['title'],
-                    description=item['description']
-                )
-                db.session.add(user_info)
-                user_infos.append(user_info)
-                info_items.append({
-                    'title': item['title'],
-                    'category': item['category']
-                })
-                
-        except Exception as e:
-            # 如果AI处理失败，创建一个默认记录
-            print(f"AI处理文本时出错: {e}")
-            user_info = UserInfo(
-                user_id=user_id,
-                conversation_id=conversation_id,
-                info_type=info_type,
-                content=content,
-                category='temporary',
-                title='文本内容',
-                description=content
-            )
-            db.session.add(user_info)
-            user_infos.append(user_info)
-            info_items.append({
-                'title': '文本内容',
-                'category': 'temporary'
-            })
-    
-    # 首次上传时，用第一个信息项的标题更新对话标题
-    if is_first_upload and info_items:
-        conversation.title = info_items[0]['title'][:50]  # 限制标题长度
+    
+    if run_async:
+        return submit_process_job(user_id, conversation_id, info_type, content, metadata_info)
+    
+    # 先提交文件记录和上传用量，模型调用期间不占用数据库连接（也不持有上传用量行锁）
     db.session.commit()
     
-    # 提交后更新返回信息中的ID
-    for i, user_info in enumerate(user_infos):
-        info_items[i]['id'] = user_info.id
+    # 使用AI提取多个信息项（相同图片已经提取过时直接复用结果）
+    if info_type == 'text':
+        extracted_items = extract_text_items(content, use_cache=not cache_bypass_requested())
+    else:
+        extracted_items = extract_image_items(content, blob, image_bytes)
+    
+    # 批量写入信息项；首次上传时用第一个信息项的标题更新对话标题
+    info_items = save_info_items(conversation, user_id, info_type, content, extracted_items, metadata_info)
+    db.session.commit()
+    index_user_infos(user_id)
     
     return jsonify({
         'message': '信息上传并分类成功',
         'info_items': info_items
     }), 201
 
+@process_bp.route('/upload/batch', methods=['POST'])
+@jwt_required()
+def upload_batch():
+    """批量上传多个文件和文本，并发调用模型提取信息项后一次性写入"""
+    user_id = int(get_jwt_identity())
+    
+    request.max_content_length = current_app.config.get('BATCH_UPLOAD_MAX_BYTES')
+    error = apply_upload_limit(user_id)
+    if error:
+        return error
+    
+    conversation, error = get_upload_conversation(user_id)
+    if error:
+        return error
+    
+    files = request.files.getlist('files') + request.files.getlist('file')
+    texts = request.form.getlist('texts') + request.form.getlist('text')
+    if not files and not texts:
+        return jsonify({'error': '没有提供文件或文本内容'}), 400
+    max_items = current_app.config.get('BATCH_UPLOAD_MAX_ITEMS', 50)
+    if len(files) + len(texts) > max_items:
+        return jsonify({'error': f'单次最多上传{max_items}条内容'}), 400
+    for file in files:
+        if not (file and allowed_file(file.filename)):
+            return jsonify({'error': f'文件类型不支持: {file.filename}'}), 400
+    
+    # 单个文件已按剩余配额限制大小，这里按所有文件的总大小一次占用配额
+    if files and not record_upload(user_id, sum(uploaded_size(file) for file in files), len(files)):
+        return jsonify({'error': '上传空间不足'}), 413
+    
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+    keep_bytes_limit = current_app.config.get('UPLOAD_KEEP_IN_MEMORY_BYTES', 0)
+    use_cache = not cache_bypass_requested()
+    entries = []
+    for file in files:
+        extension = file.filename.rsplit('.', 1)[1].lower()
+        with span('file_save'):
+            digest, file_path, size, image_bytes = save_blob(file, upload_folder, extension, keep_bytes_limit)
+        blob = get_or_create_blob(digest, file_path, size)
+        entries.append({
+            'name': file.filename,
+            'info_type': 'image' if extension in ['png', 'jpg', 'jpeg'] else 'other',
+            'content': blob.file_path,
+            'blob': blob,
+            'image_bytes': image_bytes,
+            'metadata_info': {'digest': digest, 'size': size}
+        })
+    for text in texts:
+        entries.append({'name': None, 'info_type': 'text', 'content': text, 'blob': None, 'metadata_info': None})
+    
+    # 已提取过的图片直接复用结果，相同内容的文件只调用一次模型
+    tasks = {}
+    for entry in entries:
+        blob = entry['blob']
+        if blob is not None and blob.extracted_items:
+            entry['items'], entry['ok'] = blob.extracted_items, True
+            continue
+        key = blob.digest if blob is not None else ('text', entry['content'])
+        if key not in tasks:
+            tasks[key] = {
+                'info_type': entry['info_type'],
+                'content': entry['content'],
+                'image_bytes': entry.get('image_bytes'),
+                'digest': blob.digest if blob is not None else None,
+                'use_cache': use_cache
+            }
+        entry['task_key'] = key
+    
+    # 先提交文件记录和上传用量，模型调用期间不占用数据库连接
+    db.session.commit()
+    keys = list(tasks)
+    results = dict(zip(keys, extract_items_concurrently(
+        [tasks[key] for key in keys],
+        current_app.config.get('BATCH_UPLOAD_CONCURRENCY', 8)
+    )))
+    
+    for entry in entries:
+        if 'task_key' in entry:
+            entry['items'], entry['ok'] = results[entry['task_key']]
+            # 提取结果只在请求线程中写回，工作线程不接触数据库会话
+            if entry['ok'] and entry['blob'] is not None:
+                entry['blob'].extracted_items = entry['items']
+    
+    # 所有内容的信息项一次写入，财务信息项同时写入财务记录
+    first_upload = is_first_upload(conversation.id)
+    insert_info_items(user_id, conversation.id, [
+        (entry['info_type'], entry['content'], entry['items'], entry['metadata_info']) for entry in entries
+    ], return_ids=False)
+    touch_conversation(conversation, entries[0]['items'] if first_upload else None)
+    db.session.commit()
+    index_user_infos(user_id)
+    
+    return jsonify({
+        'message': '批量上传处理完成',
+        'results': [{
+            'index': index,
+            'type': entry['info_type'],
+            'name': entry['name'],
+            'status': 'ok' if entry['ok'] else 'fallback',
+            'info_items': [{
+                'title': item['title'],
+                'category': item['category']
+            } for item in entry['items']]
+        } for index, entry in enumerate(entries)]
+    }), 201
+
+def submit_process_job(user_id, conversation_id, info_type, content, metadata_info):
+    """保存原始内容为后台任务，立即返回202和任务ID"""
+    job = ProcessJob(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        conversation_id=conversation_id,
+        info_type=info_type,
+        content=content,
+        metadata_info=metadata_info
+    )
+    db.session.add(job)
+    db.session.commit()
+    
+    try:
+        current_app.extensions['job_runner'].submit(job.id)
+    except JobQueueFull:
+        job.status = 'failed'
+        job.error = '任务队列已满'
+        db.session.commit()
+        return jsonify({'error': '服务繁忙，请稍后再试'}), 503
+    
+    return jsonify({
+        'message': '信息已接收，正在后台处理',
+        'job_id': job.id,
+        'status': job.status
+    }), 202
+
+@process_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """查询后台处理任务的状态和结果"""
+    user_id = int(get_jwt_identity())
+    
+    job = ProcessJob.query.filter_by(id=job_id, user_id=user_id).first()
+    if not job:
+        return jsonify({'error': '任务不存在'}), 404
+    
+    return jsonify({
+        'job_id': job.id,
+        'conversation_id': job.conversation_id,
+        'status': job.status,
+        'info_items': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'updated_at': job.updated_at.isoformat() if job.updated_at else None
+    }), 200
+
+
+def info_list_query(user_id, category=None):
+    """信息列表查询：只加载列表需要的字段，不加载可能很大的content"""
+    query = db.session.query(
+        UserInfo.id,
+        UserInfo.info_type,
+        UserInfo.title,
+        UserInfo.description,
+        UserInfo.category,
+        UserInfo.created_at
+    ).filter(UserInfo.user_id == user_id)
+    if category:
+        query = query.filter(UserInfo.category == category)
+    return query
+
+def info_row_to_dict(row):
+    """信息列表行转为接口返回格式"""
+    return {
+        'id': row.id,
+        'info_type': row.info_type,
+        'title': row.title,
+        'description': row.description,
+        'category': row.category,
+        'created_at': row.created_at.isoformat()
+    }
+
+def export_info_rows(user_id, category):
+    """以JSON数组流式输出用户的全部信息，分批从数据库读取，内存占用不随数据量增长"""
+    query = info_list_query(user_id, category)
+    query = query.order_by(UserInfo.created_at.desc(), UserInfo.id.desc()).execution_options(yield_per=1000)
+    yield '['
+    for i, row in enumerate(query):
+        yield (',' if i else '') + json.dumps(info_row_to_dict(row), ensure_ascii=False)
+    yield ']'
 
 @process_bp.route('/info', methods=['GET'])
 @jwt_required()
+@read_replica
 def list_info():
-    """列出用户的所有信息，支持分类筛选"""
+    """
+    列出用户的信息，支持分类筛选
+    按创建时间倒序游标分页：limit指定每页条数，下一页游标在响应头X-Next-Cursor中返回
+    export=1时不分页，以流式JSON数组导出全部信息
+    """
     user_id = int(get_jwt_identity())
     
     # 获取查询参数
     category = request.args.get('category')
     
+    if request.args.get('export', '').lower() in ('1', 'true'):
+        return Response(
+            stream_with_context(export_info_rows(user_id, category)),
+            mimetype='application/json'
+        )
+    
     # 构建查询
-    query = UserInfo.query.filter_by(user_id=user_id)
-    if category:
-        query = query.filter_by(category=category)
+    page_size = get_page_size()
+    try:
+        query = apply_keyset(info_list_query(user_id, category), UserInfo.created_at, UserInfo.id, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    infos = query.order_by(UserInfo.created_at.desc()).all()
+    infos = query.limit(page_size + 1).all()
+    has_more = len(infos) > page_size
+    infos = infos[:page_size]
     
-    return jsonify([{
-        'id': info.id,
-        'info_type': info.info_type,
-        'title': info.title,
-        'description': info.description,
-        'category': info.category,
-        'created_at': info.created_at.isoformat()
-    } for info in infos]), 200
+    response = jsonify([info_row_to_dict(info) for info in infos])
+    if has_more:
+        response.headers['X-Next-Cursor'] = encode_cursor(infos[-1].created_at, infos[-1].id)
+    return response, 200
 
 @process_bp.route('/info/<int:info_id>', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_info(info_id):
     """获取特定信息详情"""
     user_id = int(get_jwt_identity())
@@ -1,11 +1,52 @@
 # app/routes/search.py
-from flask import Blueprint
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models.user_info import UserInfo
+from app.routes.process import info_list_query, info_row_to_dict
+from app.utils.ai_process import VALID_CATEGORIES
+from app.utils.pagination import get_page_size
+from app.utils.search_index import get_search_service
 
 # 创建搜索模块的蓝图（必须命名为 search_bp，与导入时的名称一致）
 search_bp = Blueprint('search', __name__)
 
-# 预留搜索相关的接口，例如：
-# @search_bp.route('/query', methods=['GET'])
-# def search_query():
-#     # 搜索逻辑实现
-#     return jsonify({"result": "搜索结果"}), 200
\ No newline at end of file
+# 检索模式：hybrid（关键词+语义融合）、bm25（关键词）、vector（语义）
+SEARCH_MODES = ('hybrid', 'bm25', 'vector')
+
+@search_bp.route('/query', methods=['GET'])
+@jwt_required()
+def search_query():
+    """
+    检索当前用户的信息项，按相关度排序
+    参数：q（检索词，必填）、category（可选分类）、mode（检索模式，默认hybrid）、limit（返回条数）
+    """
+    user_id = int(get_jwt_identity())
+
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': '缺少检索词q'}), 400
+    category = request.args.get('category')
+    if category and category not in VALID_CATEGORIES:
+        return jsonify({'error': '分类无效'}), 400
+    mode = request.args.get('mode', 'hybrid')
+    if mode not in SEARCH_MODES:
+        return jsonify({'error': f"mode必须是{'、'.join(SEARCH_MODES)}之一"}), 400
+
+    hits = get_search_service().search(user_id, query, get_page_size(), category, mode)
+    if not hits:
+        return jsonify([]), 200
+
+    # 按检索结果的顺序返回（已被删除的信息项不返回）
+    scores = dict(hits)
+    rows = info_list_query(user_id).filter(UserInfo.id.in_(scores)).all()
+    rows.sort(key=lambda row: scores[row.id], reverse=True)
+    return jsonify([dict(info_row_to_dict(row), score=round(scores[row.id], 6)) for row in rows]), 200
+
+@search_bp.route('/indexer', methods=['GET'])
+@jwt_required()
+def indexer_status():
+    """检索索引器的进度和同步延迟"""
+    indexer = current_app.extensions.get('search_indexer')
+    if indexer is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify(dict(indexer.lag(), enabled=True)), 200
@@ -1,18 +1,39 @@
 import json
 from flask import current_app
-import dashscope
-from dashscope import Generation
 import base64
+from app.utils.llm_client import get_llm_client
+from app.utils.tokenizer import count_tokens, count_tokens_batch
+from app.utils.image_prep import prepare_image_for_ocr
+from app.utils.metrics import span
 
-def process_text_with_ai(text):
+# 有效的信息项分类
+VALID_CATEGORIES = ['temporary', 'meeting', 'work', 'finance']
+
+def parse_extracted_items(result_str):
+    """解析模型返回的信息项JSON数组，并校正无效分类"""
+    result_str = result_str.strip()
+    # 移除可能的markdown代码块标记
+    if result_str.startswith("```"):
+        result_str = result_str.split("\n", 1)[1]
+        if result_str.endswith("```"):
+            result_str = result_str[:-3]
+    
+    items = json.loads(result_str)
+    
+    # 验证分类
+    for item in items:
+        if item.get('category') not in VALID_CATEGORIES:
+            item['category'] = 'temporary'
+    
+    return items
+
+def process_text_with_ai(text, use_cache=True):
     """
     使用AI处理文本并提取多个信息项
     返回信息项列表，每个包含内容和分类
+    use_cache为True时，相同（规范化后）文本直接复用之前的提取结果
     """
     try:
-        # Deleted: openai.api_key = current_app.config.get('OPENAI_API_KEY')
-        dashscope.api_key = current_app.config.get('DASHSCOPE_API_KEY')
-        
         prompt = f"""
         请分析以下文本内容，从中提取出多个独立的信息项，并为每个信息项分配适当的分类。
         
@@ -23,18 +44,25 @@ def process_text_with_ai(text):
         4. finance (收入支出) - 费用、收入、预算等
         
         文本内容：
-        "{text}"
+        "{text.strip()}"
         
         请按照以下JSON格式返回结果：
         [
           {{
             "title": "信息项标题",
             "description": "信息项详细描述",
-            "category": "temporary|meeting|work|finance"
+            "category": "temporary|meeting|work|finance",
+            "amount": 金额数字（仅finance分类，无法确定时为null）,
+            "currency": "币种代码，如CNY、USD",
+            "direction": "expense|income",
+            "date": "发生日期YYYY-MM-DD（无法确定时为null）",
+            "counterparty": "交易对方，如商户、付款人（无法确定时为null）"
           }},
           ...
         ]
         
+        amount、currency、direction、date、counterparty只用于finance分类，其他分类不需要这些字段。
+        
         只返回JSON数组，不要包含其他内容。
         """
         
@@ -43,29 +71,15 @@ def process_text_with_ai(text):
             {'role': 'system', 'content': 'You are a helpful assistant that extracts and categorizes information from text.'},
             {'role': 'user', 'content': prompt}
         ]
-        response = Generation.call(
-            model='qwen-plus',
-            messages=messages,
-            result_format='message'
-        )
-        
-        
-        result_str = response.output.choices[0].message.content.strip()
-        # 移除可能的markdown代码块标记
-        if result_str.startswith("```"):
-            result_str = result_str.split("\n", 1)[1]
-            if result_str.endswith("```"):
-                result_str = result_str[:-3]
-        
-        items = json.loads(result_str)
-        
-        # 验证分类
-        valid_categories = ['temporary', 'meeting', 'work', 'finance']
-        for item in items:
-            if item.get('category') not in valid_categories:
-                item['category'] = 'temporary'
-        
-        return items
+        client = get_llm_client()
+        model = current_app.config.get('LLM_TEXT_MODEL', 'qwen-plus')
+        result_str = client.chat(messages, model=model, use_cache=use_cache)
+        try:
+            return parse_extracted_items(result_str)
+        except Exception:
+            # 无法解析的结果不保留在缓存中
+            client.forget(messages, model=model)
+            raise
             
     except Exception as e:
         print(f"AI文本处理错误: {e}")
@@ -76,22 +90,18 @@ def process_text_with_ai(text):
             'category': 'temporary'
         }]
 
-def process_image_with_ai(image_path):
+def process_image_with_ai(image_path, fallback=True, image_bytes=None, digest=None):
     """
     使用AI处理图片并提取多个信息项
     返回信息项列表，每个包含内容和分类
+    fallback为False时处理失败直接抛出异常，由调用方决定如何处理
+    image_bytes为请求中已读入内存的图片内容，digest为内容哈希（用于缓存预处理结果）
     """
     try:
-        
-        dashscope.api_key = current_app.config.get('DASHSCOPE_API_KEY')
-        
-        # 将图片转换为base64
-        
-        # 构建文件路径（根据操作系统）
-        if os.name == 'nt':  # Windows系统
-            file_url = f"file:///{image_path}"
-        else:  # Linux或macOS系统
-            file_url = f"file://{image_path}"
+        # 缩小、去除EXIF后转换为base64 data URL
+        with span('image_prep'):
+            image_data, mime_type = prepare_image_for_ocr(image_path, image_bytes, digest)
+        image_url = f"data:{mime_type};base64,{base64.b64encode(image_data).decode('ascii')}"
         
         prompt = """
         请分析这张图片中的内容，从中提取出多个独立的信息项，并为每个信息项分配适当的分类。
@@ -114,11 +124,18 @@ def process_image_with_ai(image_path):
           {
             "title": "信息项标题",
             "description": "信息项详细描述",
-            "category": "temporary|meeting|work|finance"
+            "category": "temporary|meeting|work|finance",
+            "amount": 金额数字（仅finance分类，无法确定时为null）,
+            "currency": "币种代码，如CNY、USD",
+            "direction": "expense|income",
+            "date": "发生日期YYYY-MM-DD（无法确定时为null）",
+            "counterparty": "交易对方，如商户、付款人（无法确定时为null）"
           },
           ...
         ]
         
+        amount、currency、direction、date、counterparty只用于finance分类，其他分类不需要这些字段。
+        
         只返回JSON数组，不要包含其他内容。
         """
         
@@ -127,42 +144,26 @@ def process_image_with_ai(image_path):
             {
                 "role": "user",
                 "content": [
-                    {"text": prompt},
-                    {"image": file_url}
+                    {"type": "image_url", "image_url": {"url": image_url}},
+                    {"type": "text", "text": prompt}
                 ]
             }
         ]
-        response = Generation.call(
-            model='qwen-vl-ocr',
-            messages=messages,
-            result_format='message',
+        result_str = get_llm_client().chat(
+            messages,
+            model=current_app.config.get('LLM_OCR_MODEL', 'qwen-vl-ocr'),
             temperature=0.7,        # 对于OCR任务，较低的temperature更好
             top_p=0.8,
             top_k=50,
             max_tokens=1500,        # OCR需要更多token
             repetition_penalty=1.05
         )
-        
-        # Deleted: result_str = response.choices[0].message.content.strip()
-        result_str = response.output.choices[0].message.content.strip()
-        # 移除可能的markdown代码块标记
-        if result_str.startswith("```"):
-            result_str = result_str.split("\n", 1)[1]
-            if result_str.endswith("```"):
-                result_str = result_str[:-3]
-        
-        items = json.loads(result_str)
-        
-        # 验证分类
-        valid_categories = ['temporary', 'meeting', 'work', 'finance']
-        for item in items:
-            if item.get('category') not in valid_categories:
-                item['category'] = 'temporary'
-        
-        return items
+        return parse_extracted_items(result_str)
             
     except Exception as e:
         print(f"AI图片处理错误: {e}")
+        if not fallback:
+            raise
         # 出错时返回默认项
         return [{
             'title': '图片内容',
@@ -170,48 +171,117 @@ def process_image_with_ai(image_path):
             'category': 'temporary'
         }]
     
-def detect_savable_info(conversation_text):
-    """检测对话内容中是否包含可保存的关键信息"""
+def summarize_conversation(previous_summary, messages):
+    """
+    把新的对话消息并入已有摘要，返回新的摘要
+    调用失败时返回None，调用方保留原摘要
+    """
     try:
-        dashscope.api_key = current_app.config.get('DASHSCOPE_API_KEY')
-        
+        history = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
         prompt = f"""
-        分析以下对话内容，判断是否包含需要保存的关键信息（会议安排、工作任务、财务收支等）。
-        只需返回"需要保存"或"无需保存"，不要添加其他内容。
+        请把以下新增的对话内容合并到已有摘要中，生成一段新的摘要。
+        保留会议安排、工作任务、财务收支等关键信息和用户的偏好，省略寒暄。
+        摘要不超过{current_app.config.get('CHAT_SUMMARY_MAX_CHARS', 300)}字，只返回摘要内容。
         
-        对话内容：{conversation_text}
+        已有摘要：{previous_summary or '无'}
+        
+        新增对话：
+        {history}
         """
         
-        response = Generation.call(
-            model='qwen-plus',
-            messages=[{'role': 'user', 'content': prompt}],
-            result_format='message'
+        result = get_llm_client().chat(
+            [{'role': 'user', 'content': prompt}],
+            model=current_app.config.get('LLM_TEXT_MODEL', 'qwen-plus')
         )
+        return result.strip()
+    
+    except Exception as e:
+        print(f"对话摘要生成错误: {e}")
+        return None
+
+def summarize_info_items(previous_summary, items, label):
+    """
+    把一批信息项并入已有摘要（没有已有摘要时直接总结），返回摘要
+    items为已格式化的信息项文本列表，label为时间段说明（如“2024-05-06”）
+    调用失败时返回None，调用方不缓存结果
+    """
+    try:
+        prompt = f"""
+        请为用户整理{label}的信息摘要。把以下新增信息项合并到已有摘要中，生成一段新的摘要。
+        按会议安排、工作任务、财务收支等分类概括，保留时间、金额、人名等关键细节，合并重复内容。
+        摘要不超过{current_app.config.get('DIGEST_MAX_CHARS', 500)}字，只返回摘要内容。
+        
+        已有摘要：{previous_summary or '无'}
         
-        result = response.output.choices[0].message.content.strip()
-        return result == "需要保存"
+        新增信息项：
+        {chr(10).join(items)}
+        """
+        
+        result = get_llm_client().chat(
+            [{'role': 'user', 'content': prompt}],
+            model=current_app.config.get('LLM_TEXT_MODEL', 'qwen-plus'),
+            use_cache=True
+        )
+        return result.strip()
     
     except Exception as e:
-        print(f"关键信息检测错误: {e}")
-        return False
+        print(f"信息摘要生成错误: {e}")
+        return None
+
+def merge_digest_summaries(summaries, label):
+    """把多个时间段的摘要合并为一段（如把每天的摘要合并为周摘要），失败时返回None"""
+    try:
+        prompt = f"""
+        以下是用户{label}内各时间段的信息摘要，请合并为一段整体摘要。
+        按会议安排、工作任务、财务收支等分类概括，保留关键时间和金额，合并重复内容。
+        摘要不超过{current_app.config.get('DIGEST_MAX_CHARS', 500)}字，只返回摘要内容。
+        
+        {chr(10).join(summaries)}
+        """
+        
+        result = get_llm_client().chat(
+            [{'role': 'user', 'content': prompt}],
+            model=current_app.config.get('LLM_TEXT_MODEL', 'qwen-plus'),
+            use_cache=True
+        )
+        return result.strip()
     
+    except Exception as e:
+        print(f"摘要合并错误: {e}")
+        return None
+
+def chat_reply(messages):
+    """调用大模型生成完整的对话回复"""
+    return get_llm_client().chat(
+        messages,
+        model=current_app.config.get('LLM_CHAT_MODEL', 'qwen-plus')
+    )
+
+def stream_chat_reply(messages):
+    """流式调用大模型，逐段产出新增的回复文本"""
+    return get_llm_client().stream(
+        messages,
+        model=current_app.config.get('LLM_CHAT_MODEL', 'qwen-plus')
+    )
+
 def estimate_token_length(text):
-    """估算文本的token长度(1个汉字≈1token,1个英文单词≈1token)"""
-    # 简单估算：中文按字符数，英文按空格分割的单词数
-    chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
-    english_words = len(text.split())
-    return chinese_chars + english_words
+    """估算文本的token长度(配置了QWEN_TOKENIZER_PATH时使用真实分词器)"""
+    return count_tokens(text)
+
+def estimate_token_lengths(texts):
+    """批量估算多段文本的token长度"""
+    return count_tokens_batch(texts)
 
 def truncate_context(context, max_tokens=1000):
     """截断对话上下文,确保总token不超过上限"""
+    token_counts = estimate_token_lengths([msg['content'] for msg in context])
     total_tokens = 0
     truncated = []
     # 倒序添加，优先保留最新消息
-    for msg in reversed(context):
-        msg_tokens = estimate_token_length(msg['content'])
+    for msg, msg_tokens in zip(reversed(context), reversed(token_counts)):
         if total_tokens + msg_tokens > max_tokens:
             continue
         truncated.append(msg)
         total_tokens += msg_tokens
     # 恢复正序
-    return list(reversed(truncated))
\ No newline at end of file
+    return list(reversed(truncated))
@@ -0,0 +1,89 @@
+import os
+import hashlib
+import tempfile
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.user_info import UploadBlob
+from app.utils.upload_stream import StreamedUpload
+
+# 每次从上传流读取的字节数
+CHUNK_SIZE = 64 * 1024
+
+def save_blob(file, upload_folder, extension, keep_bytes_limit=0):
+    """
+    边读取边计算SHA-256，将上传文件按内容哈希保存
+    相同内容的文件只在磁盘上保存一份，返回(digest, file_path, size, data)
+    文件不超过keep_bytes_limit字节时，data为文件内容（供后续处理直接使用），否则为None
+    """
+    stream = file.stream
+    if isinstance(stream, StreamedUpload):
+        # 解析请求时已写入上传目录并算好哈希，只需移动到最终位置
+        file_path = os.path.join(upload_folder, f"{stream.digest}.{extension}")
+        data = stream.finalize(file_path)
+        return stream.digest, file_path, stream.size, data
+
+    os.makedirs(upload_folder or '.', exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    chunks = []
+
+    # 先写入同目录下的临时文件，哈希算完后再原子重命名
+    fd, tmp_path = tempfile.mkstemp(dir=upload_folder or '.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+                if chunks is not None:
+                    chunks.append(chunk)
+                    if size > keep_bytes_limit:
+                        chunks = None
+
+        digest = hasher.hexdigest()
+        file_path = os.path.join(upload_folder, f"{digest}.{extension}")
+        if os.path.exists(file_path):
+            # 已存在相同内容的文件，丢弃本次副本
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    data = b''.join(chunks) if chunks is not None else None
+    return digest, file_path, size, data
+
+def discard_duplicate_file(blob, file_path):
+    """
+    相同内容之前以其他扩展名保存过（如.jpg和.jpeg）时，删除本次写入的文件
+    记录中的文件路径才是被引用的那一份
+    """
+    if blob.file_path == file_path:
+        return
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"删除重复上传文件错误: {e}")
+
+def get_or_create_blob(digest, file_path, size):
+    """获取内容哈希对应的记录，不存在则创建（并发上传同一文件时以先写入者为准）"""
+    blob = UploadBlob.query.filter_by(digest=digest).first()
+    if blob:
+        discard_duplicate_file(blob, file_path)
+        return blob
+
+    blob = UploadBlob(digest=digest, file_path=file_path, size=size)
+    try:
+        with db.session.begin_nested():
+            db.session.add(blob)
+    except IntegrityError:
+        blob = UploadBlob.query.filter_by(digest=digest).first()
+        discard_duplicate_file(blob, file_path)
+    return blob
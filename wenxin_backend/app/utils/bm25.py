@@ -0,0 +1,110 @@
+import math
+from collections import Counter, defaultdict
+import numpy as np
+from app.utils.vector_index import top_k
+
+class BM25Index:
+    """
+    BM25倒排索引（词项由tokenizer.search_terms切分）
+    压缩保存时写出的部分按CSR数组存放（terms/indptr/docs/tfs），之后新增的文档记在内存的delta中
+    """
+
+    def __init__(self, k1=1.5, b=0.75, postings=None, doc_lengths=None):
+        self.k1 = k1
+        self.b = b
+        self._postings = postings or {}  # 词项 -> (文档位置数组, 词频数组)
+        self._delta = defaultdict(list)  # 词项 -> [(文档位置, 词频)]
+        self._lengths = np.zeros(max(64, len(doc_lengths) if doc_lengths is not None else 0), dtype=np.float32)
+        self._size = 0
+        self._total_length = 0.0
+        if doc_lengths is not None:
+            self._lengths[:len(doc_lengths)] = doc_lengths
+            self._size = len(doc_lengths)
+            self._total_length = float(np.sum(doc_lengths))
+
+    def __len__(self):
+        return self._size
+
+    def add(self, position, terms):
+        """在指定位置加入一个文档（位置需与向量索引一致，依次递增）"""
+        if position >= len(self._lengths):
+            grown = np.zeros(max(position + 1, len(self._lengths) * 2), dtype=np.float32)
+            grown[:self._size] = self._lengths[:self._size]
+            self._lengths = grown
+        for term, tf in Counter(terms).items():
+            self._delta[term].append((position, tf))
+        self._lengths[position] = len(terms)
+        self._size = max(self._size, position + 1)
+        self._total_length += len(terms)
+
+    def postings(self, term):
+        """词项的全部(文档位置数组, 词频数组)"""
+        docs, tfs = self._postings.get(term, (None, None))
+        extra = self._delta.get(term)
+        if extra:
+            extra_docs = np.fromiter((doc for doc, _ in extra), dtype=np.int64, count=len(extra))
+            extra_tfs = np.fromiter((tf for _, tf in extra), dtype=np.float32, count=len(extra))
+            if docs is None:
+                return extra_docs, extra_tfs
+            return np.concatenate([docs, extra_docs]), np.concatenate([tfs, extra_tfs])
+        return docs, tfs
+
+    def search(self, terms, k, mask=None):
+        """返回BM25分数最高的k个(位置数组, 分数数组)，只返回至少命中一个词项的文档"""
+        if not self._size:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        lengths = self._lengths[:self._size]
+        average = self._total_length / self._size or 1.0
+        scores = np.zeros(self._size, dtype=np.float32)
+        for term in set(terms):
+            docs, tfs = self.postings(term)
+            if docs is None:
+                continue
+            idf = math.log(1 + (self._size - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[docs] / average)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        scores[scores <= 0] = -np.inf
+        if mask is not None:
+            scores[~mask[:self._size]] = -np.inf
+        best = top_k(scores, k)
+        return best, scores[best]
+
+    def to_arrays(self, remap, size):
+        """
+        按remap（旧位置 -> 新位置，-1表示丢弃）导出CSR数组，用于压缩保存
+        返回dict：terms、indptr、docs、tfs、lengths
+        """
+        terms, indptr, all_docs, all_tfs = [], [0], [], []
+        for term in set(self._postings) | set(self._delta):
+            docs, tfs = self.postings(term)
+            docs = remap[docs]
+            keep = docs >= 0
+            if not keep.any():
+                continue
+            order = np.argsort(docs[keep], kind='stable')
+            terms.append(term)
+            all_docs.append(docs[keep][order].astype(np.int32))
+            all_tfs.append(tfs[keep][order].astype(np.float32))
+            indptr.append(indptr[-1] + int(keep.sum()))
+
+        lengths = np.zeros(size, dtype=np.float32)
+        old_positions = np.flatnonzero(remap[:self._size] >= 0)
+        lengths[remap[old_positions]] = self._lengths[old_positions]
+        return {
+            'terms': np.array(terms, dtype=str),
+            'indptr': np.array(indptr, dtype=np.int64),
+            'docs': np.concatenate(all_docs) if all_docs else np.zeros(0, dtype=np.int32),
+            'tfs': np.concatenate(all_tfs) if all_tfs else np.zeros(0, dtype=np.float32),
+            'lengths': lengths
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, **kwargs):
+        """从to_arrays导出的数组恢复索引"""
+        indptr, docs, tfs = arrays['indptr'], arrays['docs'], arrays['tfs']
+        postings = {
+            str(term): (docs[indptr[i]:indptr[i + 1]], tfs[indptr[i]:indptr[i + 1]])
+            for i, term in enumerate(arrays['terms'])
+        }
+        return cls(postings=postings, doc_lengths=arrays['lengths'], **kwargs)
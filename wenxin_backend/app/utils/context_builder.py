@@ -0,0 +1,161 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.extensions import db
+from app.models.user_info import Conversation, Message
+from app.utils.ai_process import estimate_token_length, summarize_conversation
+
+def message_token_count(row):
+    """消息的token数（写入时已保存，旧数据现场估算）"""
+    if row.token_count is not None:
+        return row.token_count
+    return estimate_token_length(row.content)
+
+def build_context(conversation):
+    """
+    构建对话上下文：更早消息的滚动摘要 + 最近的消息，总token控制在上限内
+    只按(conversation_id, created_at)倒序读取最近N条，开销与历史长度无关
+    """
+    window = current_app.config.get('CHAT_CONTEXT_WINDOW', 20)
+    max_tokens = current_app.config.get('CHAT_CONTEXT_MAX_TOKENS', 1000)
+
+    recent = (
+        db.session.query(Message.id, Message.role, Message.content, Message.token_count)
+        .filter(Message.conversation_id == conversation.id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(window)
+        .all()
+    )
+
+    # 窗口之外攒够一批未并入摘要的旧消息时，在后台增量更新摘要，本次先使用已有摘要
+    if len(recent) == window and summary_due(conversation.id, conversation.summary_message_id, recent[-1].id):
+        schedule_summary(conversation.id, before_id=recent[-1].id)
+
+    context = []
+    total_tokens = 0
+    if conversation.summary:
+        context.append({'role': 'system', 'content': f"以下是之前对话的摘要：{conversation.summary}"})
+        total_tokens += estimate_token_length(conversation.summary)
+
+    # 从最新消息开始加入，超出上限的更早消息不再加入
+    kept = []
+    for row in recent:
+        tokens = message_token_count(row)
+        if total_tokens + tokens > max_tokens:
+            break
+        kept.append({'role': row.role, 'content': row.content})
+        total_tokens += tokens
+
+    return context + list(reversed(kept))
+
+def pending_messages_query(conversation_id, summary_message_id, before_id, *columns):
+    """摘要之后、最近窗口之前（ID小于before_id）尚未并入摘要的旧消息"""
+    query = db.session.query(*columns).filter(
+        Message.conversation_id == conversation_id,
+        Message.id < before_id
+    )
+    if summary_message_id is not None:
+        query = query.filter(Message.id > summary_message_id)
+    return query
+
+def summary_due(conversation_id, summary_message_id, before_id):
+    """未并入摘要的旧消息是否已攒够一批（只按主键读取一批ID）"""
+    batch = current_app.config.get('CHAT_SUMMARY_BATCH', 10)
+    ids = pending_messages_query(conversation_id, summary_message_id, before_id, Message.id).limit(batch).all()
+    return len(ids) >= batch
+
+def update_summary(conversation_id, before_id):
+    """把摘要之后、最近窗口之前的旧消息分批并入摘要（攒够一批才调用模型）"""
+    batch = current_app.config.get('CHAT_SUMMARY_BATCH', 10)
+
+    conversation = db.session.query(
+        Conversation.summary, Conversation.summary_message_id
+    ).filter(Conversation.id == conversation_id).first()
+    if conversation is None:
+        return
+
+    query = pending_messages_query(
+        conversation_id, conversation.summary_message_id, before_id,
+        Message.id, Message.role, Message.content
+    )
+    # 每次最多并入4批，历史很长的旧对话会在之后几轮中逐步追上
+    pending = query.order_by(Message.id.asc()).limit(batch * 4).all()
+    if len(pending) < batch:
+        return
+
+    # 调用模型前结束只读事务，生成摘要期间不占用数据库连接
+    db.session.commit()
+    summary = summarize_conversation(
+        conversation.summary,
+        [{'role': row.role, 'content': row.content} for row in pending]
+    )
+    if summary is None:
+        return
+
+    # 只在摘要没有被其他进程更新过时写入；摘要不影响对话的最后更新时间
+    if conversation.summary_message_id is None:
+        unchanged = Conversation.summary_message_id.is_(None)
+    else:
+        unchanged = Conversation.summary_message_id == conversation.summary_message_id
+    db.session.query(Conversation).filter(Conversation.id == conversation_id, unchanged).update({
+        Conversation.summary: summary,
+        Conversation.summary_message_id: pending[-1].id,
+        Conversation.updated_at: Conversation.updated_at
+    }, synchronize_session=False)
+    db.session.commit()
+
+
+class SummaryUpdater:
+    """在后台线程中更新对话摘要，不阻塞回复；同一对话同时只有一个更新任务"""
+
+    def __init__(self, app, workers=1):
+        self.app = app
+        self._running = set()
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summary')
+
+    def _update(self, conversation_id, before_id):
+        with self.app.app_context():
+            try:
+                update_summary(conversation_id, before_id)
+            except Exception as e:
+                print(f"对话摘要更新错误: {e}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._running.discard(conversation_id)
+
+    def submit(self, conversation_id, before_id):
+        """提交摘要更新，该对话已有更新在进行时返回None"""
+        with self._lock:
+            if conversation_id in self._running:
+                return None
+            self._running.add(conversation_id)
+        try:
+            return self.executor.submit(self._update, conversation_id, before_id)
+        except RuntimeError:
+            # 进程退出中，线程池已关闭
+            with self._lock:
+                self._running.discard(conversation_id)
+            return None
+
+    def shutdown(self):
+        """放弃排队中的更新，等待进行中的模型调用结束"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+def schedule_summary(conversation_id, before_id):
+    """安排更新摘要：启用后台更新时交给后台线程，否则在当前请求中更新"""
+    updater = current_app.extensions.get('summary_updater')
+    if updater is not None:
+        return updater.submit(conversation_id, before_id)
+    update_summary(conversation_id, before_id)
+    return None
+
+def init_summary_updater(app):
+    """根据配置创建后台摘要更新线程池，保存在app.extensions中"""
+    if not app.config.get('CHAT_SUMMARY_ASYNC', True):
+        return None
+    updater = SummaryUpdater(app, workers=app.config.get('CHAT_SUMMARY_WORKERS', 1))
+    app.extensions['summary_updater'] = updater
+    return updater
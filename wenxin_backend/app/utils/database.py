@@ -0,0 +1,67 @@
+import importlib.util
+from functools import wraps
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+# 只读副本在SQLALCHEMY_BINDS中的名称
+REPLICA_BIND = 'replica'
+
+MYSQL_DRIVERS = {'pymysql': 'pymysql', 'mysqlclient': 'mysqldb'}
+
+def resolve_driver(uri, driver):
+    """
+    按DB_DRIVER替换MySQL连接串中的驱动：mysqlclient为C实现，解析结果集更快
+    auto表示已安装mysqlclient时使用，否则保持连接串中的驱动
+    """
+    if not uri or not driver:
+        return uri
+    url = make_url(uri)
+    if url.get_backend_name() != 'mysql':
+        return uri
+    if driver == 'auto':
+        driver = 'mysqlclient' if importlib.util.find_spec('MySQLdb') else None
+    if driver not in MYSQL_DRIVERS:
+        return uri
+    return url.set(drivername=f"mysql+{MYSQL_DRIVERS[driver]}").render_as_string(hide_password=False)
+
+def configure_engines(app):
+    """根据配置设置连接池参数、MySQL驱动和只读副本（在db.init_app之前调用）"""
+    driver = app.config.get('DB_DRIVER')
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    app.config['SQLALCHEMY_DATABASE_URI'] = resolve_driver(uri, driver)
+
+    # SQLite没有服务端连接数限制和空闲断开，使用默认连接池
+    if not uri.startswith('sqlite'):
+        engine_options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        engine_options.setdefault('pool_size', app.config.get('DB_POOL_SIZE', 10))
+        engine_options.setdefault('max_overflow', app.config.get('DB_MAX_OVERFLOW', 5))
+        engine_options.setdefault('pool_recycle', app.config.get('DB_POOL_RECYCLE', 1800))
+        engine_options.setdefault('pool_pre_ping', app.config.get('DB_POOL_PRE_PING', True))
+        engine_options.setdefault('pool_timeout', app.config.get('DB_POOL_TIMEOUT', 10))
+
+    # 只读副本作为单独的bind，连接池参数与主库相同（SQLALCHEMY_ENGINE_OPTIONS对所有bind生效）
+    replica_uri = app.config.get('DATABASE_REPLICA_URI')
+    if replica_uri:
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(REPLICA_BIND, resolve_driver(replica_uri, driver))
+
+
+class RoutingSession(Session):
+    """标记为只读的请求中，查询从只读副本读取；flush等写操作始终使用主库"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('use_replica'):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(view):
+    """只读接口的装饰器：配置了只读副本时从副本查询（可能读到秒级延迟之前的数据）"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,225 @@
+import hashlib
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.user_info import UserInfo, DigestCache
+from app.utils.ai_process import summarize_info_items, merge_digest_summaries
+
+# 支持的摘要时间段
+PERIODS = ('day', 'week', 'month')
+
+def period_range(period, day):
+    """返回包含day的时间段的[开始日期, 结束日期)"""
+    if period == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == 'month':
+        start = day.replace(day=1)
+        return start, (start + timedelta(days=32)).replace(day=1)
+    return day, day + timedelta(days=1)
+
+def fingerprint(count, id_sum, max_updated):
+    """
+    时间段内信息项的指纹：新增或删除会改变数量和ID之和，修改会改变最大更新时间
+    """
+    return f"{count}:{id_sum or 0}:{max_updated or ''}"
+
+def filter_items(query, user_id, category):
+    query = query.filter(UserInfo.user_id == user_id)
+    if category:
+        query = query.filter(UserInfo.category == category)
+    return query
+
+def day_stats(user_id, category, start, end, max_id=None):
+    """
+    一次GROUP BY查询各天的信息项统计，返回{日期: (条数, 指纹, 最大ID)}
+    max_id用于计算已并入摘要的那部分信息项的指纹
+    """
+    day_column = func.date(UserInfo.created_at)
+    query = filter_items(db.session.query(
+        day_column.label('day'),
+        func.count(UserInfo.id),
+        func.sum(UserInfo.id),
+        func.max(UserInfo.id),
+        func.max(UserInfo.updated_at)
+    ), user_id, category).filter(
+        UserInfo.created_at >= datetime.combine(start, datetime.min.time()),
+        UserInfo.created_at < datetime.combine(end, datetime.min.time())
+    )
+    if max_id is not None:
+        query = query.filter(UserInfo.id <= max_id)
+
+    stats = {}
+    for day, count, id_sum, last_id, max_updated in query.group_by(day_column).all():
+        stats[date.fromisoformat(str(day)[:10])] = (count, fingerprint(count, id_sum, max_updated), last_id)
+    return stats
+
+def format_item(row):
+    """信息项在提示词中的格式"""
+    description = (row.description or '').strip()
+    return f"- {row.created_at.strftime('%H:%M')} [{row.category}] {row.title or '未命名'}：{description[:200]}"
+
+def load_items(user_id, category, day, after_id=None):
+    """读取某一天的信息项（after_id之后的部分），按ID顺序"""
+    query = filter_items(db.session.query(
+        UserInfo.id, UserInfo.title, UserInfo.description, UserInfo.category, UserInfo.created_at
+    ), user_id, category).filter(
+        UserInfo.created_at >= datetime.combine(day, datetime.min.time()),
+        UserInfo.created_at < datetime.combine(day + timedelta(days=1), datetime.min.time())
+    )
+    if after_id is not None:
+        query = query.filter(UserInfo.id > after_id)
+    return [format_item(row) for row in query.order_by(UserInfo.id).all()]
+
+def summarize_bucket(previous_summary, items, label):
+    """
+    生成一个时间段的摘要：条数不多时一次调用并入已有摘要；
+    条数较多时先分批各自总结（map），再与已有摘要合并（reduce）
+    """
+    batch = current_app.config.get('DIGEST_MAP_BATCH', 50)
+    if len(items) <= batch:
+        return summarize_info_items(previous_summary, items, label)
+    partials = [previous_summary] if previous_summary else []
+    for i in range(0, len(items), batch):
+        partial = summarize_info_items(None, items[i:i + batch], label)
+        if partial is None:
+            return None
+        partials.append(partial)
+    return merge_digest_summaries(partials, label)
+
+def save_digest(user_id, category_key, kind, period_start, **values):
+    """写入或更新缓存的摘要（并发生成同一摘要时以后写入者为准）"""
+    cached = DigestCache.query.filter_by(
+        user_id=user_id, category=category_key, kind=kind, period_start=period_start
+    ).first()
+    if cached is None:
+        cached = DigestCache(user_id=user_id, category=category_key, kind=kind, period_start=period_start, **values)
+        try:
+            with db.session.begin_nested():
+                db.session.add(cached)
+            return cached
+        except IntegrityError:
+            cached = DigestCache.query.filter_by(
+                user_id=user_id, category=category_key, kind=kind, period_start=period_start
+            ).first()
+    for key, value in values.items():
+        setattr(cached, key, value)
+    return cached
+
+def run_concurrently(func, jobs):
+    """在线程池中并发调用模型（工作线程不访问数据库会话），结果与jobs一一对应"""
+    app = current_app._get_current_object()
+
+    def run(job):
+        with app.app_context():
+            return func(*job)
+
+    if len(jobs) <= 1:
+        return [func(*job) for job in jobs]
+    workers = min(current_app.config.get('DIGEST_CONCURRENCY', 4), len(jobs))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, jobs))
+
+def day_digests(user_id, category, start, end):
+    """
+    生成时间段内每天的摘要，返回[(日期, 条数, 摘要, 指纹, 是否来自缓存)]
+    指纹未变的天直接使用缓存；只新增了信息项的天只把新增部分并入缓存的摘要；其他情况整天重新生成
+    """
+    category_key = category or 'all'
+    stats = day_stats(user_id, category, start, end)
+    cached = {
+        row.period_start: row for row in DigestCache.query.filter(
+            DigestCache.user_id == user_id,
+            DigestCache.category == category_key,
+            DigestCache.kind == 'day',
+            DigestCache.period_start >= start,
+            DigestCache.period_start < end
+        )
+    }
+
+    results = {}
+    jobs, job_days = [], []
+    for day, (count, day_fingerprint, last_id) in sorted(stats.items()):
+        row = cached.get(day)
+        if row is not None and row.fingerprint == day_fingerprint:
+            results[day] = (count, row.summary, day_fingerprint, True)
+            continue
+        previous, after_id = None, None
+        if row is not None and row.last_item_id is not None:
+            # 已并入摘要的那部分信息项没有变化时，只需要并入新增的信息项
+            old = day_stats(user_id, category, day, day + timedelta(days=1), max_id=row.last_item_id).get(day)
+            if old is not None and old[1] == row.fingerprint:
+                previous, after_id = row.summary, row.last_item_id
+        jobs.append((previous, load_items(user_id, category, day, after_id), day.isoformat()))
+        job_days.append((day, count, day_fingerprint, last_id))
+
+    # 此前只有查询，先结束只读事务，调用模型期间不占用数据库连接
+    if jobs:
+        db.session.commit()
+    for (day, count, day_fingerprint, last_id), summary in zip(job_days, run_concurrently(summarize_bucket, jobs)):
+        if summary is None:
+            # 生成失败时列出标题，不写入缓存
+            results[day] = (count, '；'.join(item.split('] ', 1)[-1] for item in load_items(user_id, category, day)), None, False)
+            continue
+        save_digest(
+            user_id, category_key, 'day', day,
+            fingerprint=day_fingerprint, summary=summary, item_count=count, last_item_id=last_id
+        )
+        results[day] = (count, summary, day_fingerprint, False)
+
+    return [(day,) + results[day] for day in sorted(results)]
+
+def build_digest(user_id, category, period, day):
+    """
+    生成（或从缓存读取）用户在某时间段的信息摘要
+    先得到每天的摘要（map），再合并为整个时间段的摘要（reduce）；各层都按指纹缓存
+    """
+    start, end = period_range(period, day)
+    label = start.isoformat() if period == 'day' else f"{start.isoformat()}至{(end - timedelta(days=1)).isoformat()}"
+    days = day_digests(user_id, category, start, end)
+    item_count = sum(count for _, count, _, _, _ in days)
+    from_cache = all(cached for _, _, _, _, cached in days)
+
+    if not days:
+        summary = '该时间段没有记录的信息'
+    elif len(days) == 1 or any(day_fingerprint is None for _, _, _, day_fingerprint, _ in days):
+        summary = days[0][2] if len(days) == 1 else '\n'.join(f"{d.isoformat()}：{s}" for d, _, s, _, _ in days)
+    else:
+        period_fingerprint = hashlib.sha1(
+            '|'.join(f"{d.isoformat()}={f}" for d, _, _, f, _ in days).encode('utf-8')
+        ).hexdigest()
+        cached = DigestCache.query.filter_by(
+            user_id=user_id, category=category or 'all', kind=period, period_start=start
+        ).first()
+        if cached is not None and cached.fingerprint == period_fingerprint:
+            summary = cached.summary
+        else:
+            from_cache = False
+            db.session.commit()  # 先提交每天的摘要，合并期间不占用数据库连接
+            summary = merge_digest_summaries([f"{d.isoformat()}：{s}" for d, _, s, _, _ in days], label)
+            if summary is None:
+                summary = '\n'.join(f"{d.isoformat()}：{s}" for d, _, s, _, _ in days)
+            else:
+                save_digest(
+                    user_id, category or 'all', period, start,
+                    fingerprint=period_fingerprint, summary=summary, item_count=item_count
+                )
+    db.session.commit()
+
+    return {
+        'period': period,
+        'category': category,
+        'start': start.isoformat(),
+        'end': (end - timedelta(days=1)).isoformat(),
+        'item_count': item_count,
+        'summary': summary,
+        'cached': from_cache,
+        'days': [{
+            'date': d.isoformat(),
+            'item_count': count,
+            'summary': s
+        } for d, count, s, _, _ in days]
+    }
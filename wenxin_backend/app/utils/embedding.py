@@ -0,0 +1,38 @@
+import math
+import zlib
+from collections import Counter
+import numpy as np
+from app.utils.tokenizer import search_terms
+
+class HashingEmbedder:
+    """
+    本地哈希嵌入（离线可用的向量化替代方案）
+    把检索词项按CRC32哈希到固定维度并带符号累加，再做L2归一化，内积即余弦相似度
+    相同输入在任何进程中都得到相同向量，索引可以持久化并跨进程复用
+    """
+
+    name = 'hashing'
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self._slots = {}  # 词项 -> (维度下标, 符号)，避免重复计算哈希
+
+    def _slot(self, term):
+        slot = self._slots.get(term)
+        if slot is None:
+            h = zlib.crc32(term.encode('utf-8'))
+            slot = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+            if len(self._slots) < 200000:
+                self._slots[term] = slot
+        return slot
+
+    def embed(self, texts):
+        """批量嵌入文本，返回形状为(len(texts), dim)的float32数组"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term, tf in Counter(search_terms(text)).items():
+                index, sign = self._slot(term)
+                vectors[row, index] += sign * (1.0 + math.log(tf))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.maximum(norms, 1e-12)
+        return vectors
@@ -0,0 +1,30 @@
+import json
+import time
+
+def message_text(content):
+    """取出消息中的文本（兼容图文混合的content列表）"""
+    if isinstance(content, str):
+        return content
+    return ''.join(part.get('text', '') for part in content if isinstance(part, dict))
+
+def fake_reply(messages):
+    """本地模拟回复（不访问网络），用于离线测试对话和信息提取接口"""
+    last_user = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+    text = message_text(last_user)
+
+    # 信息提取类提示词：返回一个合法的信息项JSON数组
+    if '只返回JSON数组' in text:
+        return json.dumps([{
+            'title': '模拟信息项',
+            'description': text.strip()[-100:],
+            'category': 'temporary'
+        }], ensure_ascii=False)
+    return f"你好，我是问心智能体（本地模拟）。你刚才说：{text}"
+
+def fake_stream_reply(messages, latency=0.0, chunk_size=2):
+    """逐段产出模拟回复，每段之间等待latency秒，用于测试流式输出的延迟和正确性"""
+    reply = fake_reply(messages)
+    for i in range(0, len(reply), chunk_size):
+        if latency:
+            time.sleep(latency)
+        yield reply[i:i + chunk_size]
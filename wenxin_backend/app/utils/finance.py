@@ -0,0 +1,184 @@
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, extract, insert
+from app.extensions import db
+from app.models.user_info import UserInfo, FinanceRecord
+
+# 汇总维度
+FINANCE_GROUPS = ('total', 'day', 'month', 'counterparty')
+FINANCE_DIRECTIONS = ('expense', 'income')
+
+# 币种的常见写法
+CURRENCY_ALIASES = {
+    '元': 'CNY', '人民币': 'CNY', 'RMB': 'CNY', '¥': 'CNY', '￥': 'CNY', '块': 'CNY',
+    '美元': 'USD', '$': 'USD', '欧元': 'EUR', '€': 'EUR', '港币': 'HKD', '港元': 'HKD', '日元': 'JPY'
+}
+
+# 描述中带币种标记的金额，如“¥1,200.50”“3.5万元”“20美元”
+AMOUNT_PATTERN = re.compile(
+    r'([¥￥$€])\s*(\d[\d,]*(?:\.\d+)?)'
+    r'|(\d[\d,]*(?:\.\d+)?)\s*(万)?\s*(元|块|人民币|RMB|美元|欧元|港币|港元|日元)'
+)
+INCOME_KEYWORDS = ('收入', '工资', '薪资', '奖金', '收到', '到账', '退款', '报销款')
+
+def parse_amount(value):
+    """把模型返回的金额（数字或带符号、千分位的字符串）转换为Decimal，无法解析时返回None"""
+    if value is None or isinstance(value, bool):
+        return None
+    text = re.sub(r'[^\d.\-]', '', str(value))
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+def amount_from_text(text):
+    """从描述文本中找出第一个带币种标记的金额，返回(金额, 币种)或(None, None)"""
+    match = AMOUNT_PATTERN.search(text or '')
+    if not match:
+        return None, None
+    if match.group(1):
+        return parse_amount(match.group(2)), CURRENCY_ALIASES[match.group(1)]
+    amount = parse_amount(match.group(3))
+    if amount is not None and match.group(4):
+        amount *= 10000
+    return amount, CURRENCY_ALIASES.get(match.group(5))
+
+def normalize_currency(value):
+    if not value:
+        return None
+    value = str(value).strip()
+    return CURRENCY_ALIASES.get(value, value.upper()[:8])
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+def finance_fields(item, default_date):
+    """
+    从提取的信息项得到财务记录字段，不是财务信息或没有金额时返回None
+    模型没有给出金额时从标题和描述中按币种标记查找
+    """
+    if item.get('category') != 'finance':
+        return None
+    text = f"{item.get('title') or ''} {item.get('description') or ''}"
+    amount = parse_amount(item.get('amount'))
+    currency = normalize_currency(item.get('currency'))
+    if amount is None:
+        amount, currency = amount_from_text(text)
+        if amount is None:
+            return None
+
+    direction = item.get('direction')
+    if direction not in FINANCE_DIRECTIONS:
+        direction = 'income' if amount > 0 and any(word in text for word in INCOME_KEYWORDS) else 'expense'
+    counterparty = str(item.get('counterparty') or '').strip()
+    return {
+        'amount': abs(amount).quantize(Decimal('0.01')),
+        'currency': currency or current_app.config.get('FINANCE_DEFAULT_CURRENCY', 'CNY'),
+        'direction': direction,
+        'occurred_on': parse_date(item.get('date')) or default_date,
+        'counterparty': counterparty[:255] or None
+    }
+
+def insert_finance_records(user_id, info_ids, records):
+    """批量写入财务记录（records与info_ids一一对应，None表示该信息项没有金额），由调用方提交"""
+    rows = [dict(record, user_id=user_id, info_id=info_id) for info_id, record in zip(info_ids, records) if record]
+    if rows:
+        db.session.execute(insert(FinanceRecord), rows)
+    return len(rows)
+
+def finance_summary(user_id, group_by='total', start=None, end=None, direction=None, currency=None, limit=None):
+    """
+    在数据库中汇总用户的收支，按币种和收支方向分开统计
+    group_by为day/month/counterparty时另外按该维度分组；start、end为包含两端的日期范围
+    """
+    amount_sum = func.sum(FinanceRecord.amount)
+    record_count = func.count(FinanceRecord.id)
+    columns = []
+    if group_by == 'day':
+        columns = [FinanceRecord.occurred_on.label('day')]
+    elif group_by == 'month':
+        columns = [
+            extract('year', FinanceRecord.occurred_on).label('year'),
+            extract('month', FinanceRecord.occurred_on).label('month')
+        ]
+    elif group_by == 'counterparty':
+        columns = [FinanceRecord.counterparty.label('counterparty')]
+
+    query = db.session.query(
+        *columns, FinanceRecord.currency, FinanceRecord.direction, amount_sum, record_count
+    ).filter(FinanceRecord.user_id == user_id)
+    if start:
+        query = query.filter(FinanceRecord.occurred_on >= start)
+    if end:
+        query = query.filter(FinanceRecord.occurred_on <= end)
+    if direction:
+        query = query.filter(FinanceRecord.direction == direction)
+    if currency:
+        query = query.filter(FinanceRecord.currency == currency)
+    query = query.group_by(*columns, FinanceRecord.currency, FinanceRecord.direction)
+
+    # 按时间分组时按时间顺序，按交易对方分组时按金额从大到小
+    if group_by == 'counterparty':
+        query = query.order_by(amount_sum.desc())
+    else:
+        query = query.order_by(*columns, FinanceRecord.currency, FinanceRecord.direction)
+    if limit:
+        query = query.limit(limit)
+
+    groups = []
+    for row in query.all():
+        group = {
+            'currency': row.currency,
+            'direction': row.direction,
+            'amount': str(Decimal(str(row[-2])).quantize(Decimal('0.01'))),
+            'count': row[-1]
+        }
+        if group_by == 'day':
+            group['date'] = str(row.day)[:10]
+        elif group_by == 'month':
+            group['month'] = f"{int(row.year):04d}-{int(row.month):02d}"
+        elif group_by == 'counterparty':
+            group['counterparty'] = row.counterparty
+        groups.append(group)
+    return groups
+
+
+@click.command('finance-backfill')
+@click.option('--batch', default=1000, help='每批处理的信息项数')
+@with_appcontext
+def finance_backfill_command(batch):
+    """为已有的财务信息项从描述中解析金额，写入财务记录（可重复执行）"""
+    last_id, created = 0, 0
+    while True:
+        rows = db.session.query(
+            UserInfo.id, UserInfo.user_id, UserInfo.title, UserInfo.description, UserInfo.created_at
+        ).outerjoin(FinanceRecord, FinanceRecord.info_id == UserInfo.id).filter(
+            UserInfo.category == 'finance',
+            UserInfo.id > last_id,
+            FinanceRecord.id.is_(None)
+        ).order_by(UserInfo.id).limit(batch).all()
+        if not rows:
+            break
+        for row in rows:
+            record = finance_fields({
+                'category': 'finance', 'title': row.title, 'description': row.description
+            }, row.created_at.date())
+            if record:
+                db.session.add(FinanceRecord(user_id=row.user_id, info_id=row.id, **record))
+                created += 1
+        db.session.commit()
+        last_id = rows[-1].id
+        click.echo(f"已处理到信息项 {last_id}，新增财务记录 {created} 条")
+    click.echo(f"完成，共新增财务记录 {created} 条")
+
+def init_finance(app):
+    """注册财务记录相关的命令"""
+    app.cli.add_command(finance_backfill_command)
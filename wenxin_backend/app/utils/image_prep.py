@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+from flask import current_app
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # 未安装Pillow时直接发送原图
+    Image = None
+
+# 图片扩展名对应的MIME类型
+IMAGE_MIME_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif'
+}
+
+def derived_path(digest, max_side):
+    """预处理后图片的缓存路径（按内容哈希和目标尺寸区分）"""
+    folder = current_app.config.get('OCR_DERIVED_FOLDER') or os.path.join(
+        current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'derived'
+    )
+    return os.path.join(folder, f"{digest}_{max_side}.jpg")
+
+def shrink_image(image_bytes, max_side, quality):
+    """
+    缩小到OCR模型够用的分辨率并重新编码为JPEG（按EXIF方向摆正，不保留EXIF）
+    返回新的图片字节；无需处理或处理后反而更大时返回None
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        needs_resize = max(image.size) > max_side
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        if needs_resize:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+    data = output.getvalue()
+    if not needs_resize and len(data) >= len(image_bytes):
+        return None
+    return data
+
+def write_atomic(path, data):
+    """先写临时文件再重命名，避免并发读到不完整的文件"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def prepare_image_for_ocr(image_path, image_bytes=None, digest=None):
+    """
+    准备发送给OCR模型的图片，返回(图片字节, MIME类型)
+    优先使用请求中已读入内存的字节，并按内容哈希缓存预处理结果
+    """
+    max_side = current_app.config.get('OCR_MAX_SIDE', 1600)
+    if digest:
+        cached = derived_path(digest, max_side)
+        if os.path.exists(cached):
+            with open(cached, 'rb') as f:
+                return f.read(), 'image/jpeg'
+
+    if image_bytes is None:
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+    extension = os.path.splitext(image_path)[1].lstrip('.').lower()
+    mime_type = IMAGE_MIME_TYPES.get(extension, 'image/jpeg')
+
+    if Image is None:
+        return image_bytes, mime_type
+    try:
+        data = shrink_image(image_bytes, max_side, current_app.config.get('OCR_JPEG_QUALITY', 85))
+    except Exception as e:
+        print(f"图片预处理错误: {e}")
+        return image_bytes, mime_type
+    if data is None:
+        return image_bytes, mime_type
+
+    if digest:
+        try:
+            write_atomic(derived_path(digest, max_side), data)
+        except OSError as e:
+            print(f"预处理图片缓存写入错误: {e}")
+    return data, 'image/jpeg'
@@ -0,0 +1,165 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import insert, text
+from app.extensions import db
+from app.models.user_info import UserInfo, beijing_time
+from app.utils.ai_process import process_text_with_ai, process_image_with_ai
+from app.utils.finance import finance_fields, insert_finance_records
+
+def extract_image_items(file_path, blob=None, image_bytes=None):
+    """
+    提取图片中的信息项
+    相同内容的图片已经提取过时直接复用结果，不再调用模型
+    image_bytes为请求中已读入内存的图片内容，避免再从磁盘读取
+    """
+    if blob is not None and blob.extracted_items is not None:
+        return blob.extracted_items
+
+    try:
+        extracted_items = process_image_with_ai(
+            file_path,
+            fallback=False,
+            image_bytes=image_bytes,
+            digest=blob.digest if blob is not None else None
+        )
+        if blob is not None:
+            blob.extracted_items = extracted_items
+        return extracted_items
+    except Exception as e:
+        # 如果AI处理失败，返回一个默认信息项（不缓存失败结果）
+        print(f"AI处理图片时出错: {e}")
+        return default_image_items()
+
+def default_image_items():
+    """图片处理失败时的默认信息项"""
+    return [{
+        'title': '图片文件',
+        'description': '上传的图片文件',
+        'category': 'temporary'
+    }]
+
+def extract_text_items(text, use_cache=True):
+    """提取文本中的信息项"""
+    try:
+        return process_text_with_ai(text, use_cache=use_cache)
+    except Exception as e:
+        # 如果AI处理失败，返回一个默认信息项
+        print(f"AI处理文本时出错: {e}")
+        return [{
+            'title': '文本内容',
+            'description': text,
+            'category': 'temporary'
+        }]
+
+def build_info_rows(user_id, conversation_id, info_type, content, items, metadata_info=None):
+    """把提取的信息项转换为批量INSERT使用的字段字典"""
+    return [{
+        'user_id': user_id,
+        'conversation_id': conversation_id,
+        'info_type': info_type,
+        'content': content,
+        'metadata_info': metadata_info,
+        'category': item['category'],
+        'title': item['title'],
+        'description': item['description']
+    } for item in items]
+
+def autoincrement_step(bind):
+    """自增ID的步长（MySQL多主复制等场景下auto_increment_increment可能大于1）"""
+    if bind.dialect.name != 'mysql':
+        return 1
+    return int(db.session.execute(text('SELECT @@auto_increment_increment')).scalar() or 1)
+
+def insert_info_rows(rows, return_ids=True):
+    """
+    批量写入信息项，返回与rows一一对应的ID列表（只写入会话，由调用方提交）
+    不需要ID时用executemany一次写入；需要ID且数据库支持时用 INSERT ... RETURNING 同时拿回ID（SQLite、PostgreSQL、MariaDB）
+    不支持RETURNING时（MySQL），用一条多行INSERT写入，再由lastrowid和rowcount推算ID：
+    行数已知的多行INSERT由InnoDB一次分配连续的自增值，按VALUES的顺序递增
+    """
+    if not rows:
+        return []
+    if not return_ids:
+        db.session.execute(insert(UserInfo), rows)
+        return [None] * len(rows)
+    bind = db.session.get_bind()
+    if bind.dialect.insert_executemany_returning:
+        statement = insert(UserInfo).returning(UserInfo.id, sort_by_parameter_order=True)
+        return list(db.session.scalars(statement, rows))
+    result = db.session.execute(insert(UserInfo).values(rows))
+    if result.rowcount != len(rows):
+        raise RuntimeError(f"批量写入信息项行数不符: {result.rowcount} != {len(rows)}")
+    step = autoincrement_step(bind)
+    # MySQL的lastrowid是本条语句第一行的ID，SQLite是最后一行的ID
+    first_id = result.lastrowid
+    if bind.dialect.name == 'sqlite':
+        first_id -= (len(rows) - 1) * step
+    return [first_id + index * step for index in range(len(rows))]
+
+def insert_info_items(user_id, conversation_id, entries, return_ids=True):
+    """
+    一次写入多个上传内容的信息项（只写入会话，由调用方提交），返回[(信息项ID, 字段字典)]
+    entries为[(info_type, content, items, metadata_info)]，所有信息项合并为一次批量INSERT
+    带金额的财务信息项同时写入财务记录（此时需要拿回信息项ID）
+    """
+    rows, records = [], []
+    today = beijing_time().date()
+    for info_type, content, items, metadata_info in entries:
+        rows.extend(build_info_rows(user_id, conversation_id, info_type, content, items, metadata_info))
+        records.extend(finance_fields(item, today) for item in items)
+    ids = insert_info_rows(rows, return_ids or any(records))
+    insert_finance_records(user_id, ids, records)
+    return list(zip(ids, rows))
+
+def save_info_items(conversation, user_id, info_type, content, items, metadata_info=None, return_ids=True):
+    """
+    写入提取的信息项并更新对话，返回[{'id', 'title', 'category'}]（由调用方提交）
+    首次写入信息项时用第一个标题作为对话标题，对话的修改与信息项在同一次提交中写入
+    """
+    first_upload = is_first_upload(conversation.id)
+    saved = insert_info_items(user_id, conversation.id, [(info_type, content, items, metadata_info)], return_ids)
+    touch_conversation(conversation, items if first_upload else None)
+    return [{
+        'id': info_id,
+        'title': row['title'],
+        'category': row['category']
+    } for info_id, row in saved]
+
+def extract_items_concurrently(tasks, max_workers):
+    """
+    并发调用模型提取多个上传内容的信息项，返回与tasks一一对应的(信息项列表, 是否成功)
+    每个task为dict：info_type、content，图片另有image_bytes、digest，文本另有use_cache
+    工作线程中不访问数据库会话，结果由调用方在请求线程中写入
+    """
+    app = current_app._get_current_object()
+
+    def run(task):
+        with app.app_context():
+            if task['info_type'] == 'text':
+                return process_text_with_ai(task['content'], use_cache=task.get('use_cache', True)), True
+            try:
+                items = process_image_with_ai(
+                    task['content'],
+                    fallback=False,
+                    image_bytes=task.get('image_bytes'),
+                    digest=task.get('digest')
+                )
+                return items, True
+            except Exception as e:
+                print(f"AI处理图片时出错: {e}")
+                return default_image_items(), False
+
+    if not tasks:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+        return list(executor.map(run, tasks))
+
+def is_first_upload(conversation_id):
+    """判断对话下是否还没有任何信息项"""
+    return not UserInfo.query.filter_by(conversation_id=conversation_id).first()
+
+def touch_conversation(conversation, title_items=None):
+    """更新对话的最后更新时间；传入title_items时用第一个信息项的标题作为对话标题"""
+    if title_items:
+        conversation.title = title_items[0]['title'][:50]  # 限制标题长度
+    conversation.updated_at = beijing_time()
@@ -0,0 +1,194 @@
+import os
+import queue
+import sqlite3
+import threading
+from app.extensions import db
+from app.models.user_info import ProcessJob, Conversation, UploadBlob
+from app.utils.search_index import index_user_infos
+from app.utils.info_store import (
+    extract_image_items, extract_text_items, save_info_items
+)
+
+class JobQueueFull(Exception):
+    """任务队列已满"""
+
+
+class MemoryJobQueue:
+    """进程内任务队列（只保存任务ID，任务内容持久化在process_jobs表中）"""
+
+    def __init__(self, maxsize):
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, job_id):
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            raise JobQueueFull()
+
+    def get(self, timeout=1.0):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class SQLiteJobQueue:
+    """基于SQLite文件的任务队列（进程重启后未处理的任务不会丢失）"""
+
+    def __init__(self, path, maxsize):
+        self.path = path
+        self.maxsize = maxsize
+        self._wakeup = threading.Condition()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS job_queue '
+                '(seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL)'
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def put(self, job_id):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            (count,) = conn.execute('SELECT COUNT(*) FROM job_queue').fetchone()
+            if count >= self.maxsize:
+                conn.execute('ROLLBACK')
+                raise JobQueueFull()
+            conn.execute('INSERT INTO job_queue (job_id) VALUES (?)', (job_id,))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def get(self, timeout=1.0):
+        job_id = self._pop()
+        if job_id is None:
+            # 队列为空时等待本进程的新任务通知，超时后再轮询一次（兼顾其他进程写入的任务）
+            with self._wakeup:
+                self._wakeup.wait(timeout)
+            job_id = self._pop()
+        return job_id
+
+    def _pop(self):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT seq, job_id FROM job_queue ORDER BY seq LIMIT 1').fetchone()
+            if row is None:
+                conn.execute('ROLLBACK')
+                return None
+            conn.execute('DELETE FROM job_queue WHERE seq = ?', (row[0],))
+            conn.execute('COMMIT')
+            return row[1]
+        finally:
+            conn.close()
+
+    def qsize(self):
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM job_queue').fetchone()[0]
+        finally:
+            conn.close()
+
+
+class JobRunner:
+    """有界的后台任务线程池"""
+
+    def __init__(self, app, job_queue, workers):
+        self.app = app
+        self.queue = job_queue
+        self.workers = workers
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        """启动工作线程（重复调用无副作用）"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'process-job-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job_id):
+        """提交任务，队列已满时抛出JobQueueFull"""
+        self.start()
+        self.queue.put(job_id)
+
+    def shutdown(self, timeout=None):
+        """停止接收新任务，等待工作线程处理完当前任务后退出"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job_id = self.queue.get(timeout=1.0)
+            if job_id is None:
+                continue
+            with self.app.app_context():
+                try:
+                    run_process_job(job_id)
+                except Exception as e:
+                    print(f"后台任务执行错误: {e}")
+                finally:
+                    db.session.remove()
+
+
+def run_process_job(job_id):
+    """执行单个信息处理任务：调用模型提取信息项并写入UserInfo"""
+    job = db.session.get(ProcessJob, job_id)
+    if job is None or job.status != 'pending':
+        return
+
+    job.status = 'running'
+    db.session.commit()
+
+    try:
+        if job.info_type == 'text':
+            extracted_items = extract_text_items(job.content)
+        else:
+            digest = (job.metadata_info or {}).get('digest')
+            blob = UploadBlob.query.filter_by(digest=digest).first() if digest else None
+            extracted_items = extract_image_items(job.content, blob)
+
+        conversation = db.session.get(Conversation, job.conversation_id)
+        job.result = save_info_items(
+            conversation, job.user_id, job.info_type, job.content,
+            extracted_items, job.metadata_info
+        )
+        job.status = 'done'
+        db.session.commit()
+        index_user_infos(job.user_id)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(ProcessJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        db.session.commit()
+        raise
+
+def init_job_runner(app):
+    """根据配置创建后台任务线程池，保存在app.extensions中"""
+    backend = app.config.get('JOB_QUEUE_BACKEND', 'memory')
+    maxsize = app.config.get('JOB_QUEUE_SIZE', 100)
+    if backend == 'sqlite':
+        job_queue = SQLiteJobQueue(app.config.get('JOB_QUEUE_PATH', 'jobs.sqlite3'), maxsize)
+    else:
+        job_queue = MemoryJobQueue(maxsize)
+
+    # 工作线程在提交第一个任务时启动；SQLite队列遗留的任务由服务进程启动时处理（lifecycle.start_background）
+    runner = JobRunner(app, job_queue, app.config.get('JOB_WORKERS', 4))
+    app.extensions['job_runner'] = runner
+    return runner
@@ -0,0 +1,38 @@
+import time
+
+def start_background(app):
+    """
+    在服务进程中启动后台工作（gunicorn的post_worker_init钩子和run.py中调用）
+    create_app本身不启动后台线程，flask命令行、迁移和测试等进程中不会运行
+    """
+    runner = app.extensions.get('job_runner')
+    if runner is not None and app.config.get('JOB_QUEUE_BACKEND') == 'sqlite':
+        # SQLite队列中可能有上次进程遗留的任务，立即开始处理
+        runner.start()
+    indexer = app.extensions.get('search_indexer')
+    if indexer is not None and app.config.get('SEARCH_INDEXER_IN_WORKERS', True):
+        indexer.start()
+
+def drain(app, timeout=30.0):
+    """
+    进程退出前停止后台工作（gunicorn的worker_exit钩子中调用）
+    进行中的请求由gunicorn在graceful_timeout内等待完成；这里等待后台线程中进行中的模型调用，
+    放弃排队中的预提取和摘要更新，最后保存检索索引的改动
+    """
+    deadline = time.monotonic() + timeout
+
+    def remaining():
+        return max(0.0, deadline - time.monotonic())
+
+    for name in ('job_runner', 'search_indexer'):
+        worker = app.extensions.get(name)
+        if worker is not None:
+            worker.shutdown(remaining())
+    for name in ('speculative', 'summary_updater', 'savable'):
+        executor = app.extensions.get(name)
+        if executor is not None:
+            executor.shutdown()
+
+    search = app.extensions.get('search')
+    if search is not None:
+        search.save_all()
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+def normalize_content(content):
+    """规范化消息内容：合并空白字符，使仅有空格/换行差异的提示词命中同一缓存"""
+    if isinstance(content, str):
+        return ' '.join(content.split())
+    return [
+        dict(part, text=' '.join(part['text'].split())) if isinstance(part, dict) and 'text' in part else part
+        for part in content
+    ]
+
+def make_cache_key(model, messages, params):
+    """根据模型、规范化后的消息和调用参数生成缓存键"""
+    payload = {
+        'model': model,
+        'messages': [
+            {'role': m['role'], 'content': normalize_content(m['content'])} for m in messages
+        ],
+        'params': params
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    模型回复缓存
+    第一级为进程内LRU（有条目上限和过期时间），可选第二级SQLite文件供多个工作进程共享
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, persistent_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persistent_path = persistent_path
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        if persistent_path:
+            directory = os.path.dirname(persistent_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS llm_cache '
+                    '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+                )
+
+    @contextmanager
+    def _connect(self):
+        """打开SQLite连接，块内语句作为一个事务提交，结束后关闭连接"""
+        conn = sqlite3.connect(self.persistent_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """读取缓存，未命中或已过期返回None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.persistent_path:
+            value = self._get_persistent(key, now)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.persistent_hits += 1
+                self._set_memory(key, value, now)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        """写入缓存"""
+        now = time.time()
+        self._set_memory(key, value, now)
+        if self.persistent_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                        (key, value, now + self.ttl)
+                    )
+            except sqlite3.Error as e:
+                print(f"模型缓存写入错误: {e}")
+
+    def _set_memory(self, key, value, now):
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_persistent(self, key, now):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT value, expires_at FROM llm_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                    return None
+                return row[0]
+        except sqlite3.Error as e:
+            print(f"模型缓存读取错误: {e}")
+            return None
+
+    def delete(self, key):
+        """删除一条缓存"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.persistent_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+            except sqlite3.Error as e:
+                print(f"模型缓存删除错误: {e}")
+
+    def clear(self):
+        """清空缓存（包括持久化部分）"""
+        with self._lock:
+            self._entries.clear()
+        if self.persistent_path:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM llm_cache')
+
+    def stats(self):
+        """缓存命中统计"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'entries': len(self._entries)
+            }
@@ -0,0 +1,288 @@
+import json
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from app.utils.fake_llm import fake_reply, fake_stream_reply
+from app.utils.llm_cache import ResponseCache, make_cache_key
+from app.utils.metrics import record_llm_call, record_llm_usage, record_stage
+
+class LLMError(Exception):
+    """大模型调用失败"""
+
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        self.transient = transient  # 是否为可重试的临时错误（超时、限流、服务端错误）
+
+
+class LLMUnavailable(LLMError):
+    """上游服务异常，熔断器已打开，暂停调用"""
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，冷却期结束后放行一次试探请求"""
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            # 半开状态：只放行一个试探请求
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+
+class DashScopeBackend:
+    """通过DashScope的OpenAI兼容接口调用模型，进程内复用keep-alive连接池"""
+
+    def __init__(self, api_key, base_url, pool_size=20, connect_timeout=5.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _post(self, payload, timeout, stream=False):
+        try:
+            response = self.session.post(
+                f"{self.base_url}/chat/completions",
+                headers={'Authorization': f"Bearer {self.api_key}"},
+                json=payload,
+                timeout=(min(self.connect_timeout, timeout), timeout),
+                stream=stream
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise LLMError(f"请求模型服务失败: {e}", transient=True)
+
+        if response.status_code != 200:
+            transient = response.status_code == 429 or response.status_code >= 500
+            message = response.text[:200]
+            response.close()
+            raise LLMError(f"模型服务返回{response.status_code}: {message}", transient=transient)
+        return response
+
+    def chat(self, model, messages, timeout, **params):
+        payload = dict(params, model=model, messages=messages)
+        response = self._post(payload, timeout)
+        try:
+            result = response.json()
+            content = result['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError) as e:
+            raise LLMError(f"模型返回格式错误: {e}")
+        record_llm_usage(model, result.get('usage'))
+        return content
+
+    def stream(self, model, messages, timeout, **params):
+        # include_usage：最后一段返回本次调用的token用量
+        payload = dict(params, model=model, messages=messages, stream=True, stream_options={'include_usage': True})
+        response = self._post(payload, timeout, stream=True)
+        try:
+            for raw_line in response.iter_lines():
+                line = raw_line.decode('utf-8')
+                if not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                record_llm_usage(model, chunk.get('usage'))
+                choices = chunk.get('choices') or []
+                delta = choices[0].get('delta', {}).get('content') if choices else None
+                if delta:
+                    yield delta
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise LLMError(f"模型流式输出中断: {e}", transient=True)
+        finally:
+            response.close()
+
+
+class FakeBackend:
+    """本地模拟后端（不访问网络），可注入延迟，用于离线测试和压测"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def chat(self, model, messages, timeout, **params):
+        if self.latency:
+            time.sleep(self.latency)
+        return fake_reply(messages)
+
+    def stream(self, model, messages, timeout, **params):
+        yield from fake_stream_reply(messages, self.latency)
+
+
+def error_type(error):
+    """调用失败的类型（用于错误计数）"""
+    if isinstance(error, LLMUnavailable):
+        return 'unavailable'
+    return 'transient' if error.transient else 'error'
+
+
+class LLMClient:
+    """统一的大模型客户端：调用超时、带抖动的指数退避重试、熔断和回复缓存"""
+
+    def __init__(self, backend, timeout=30.0, max_retries=2, backoff_base=0.5,
+                 backoff_max=8.0, breaker=None, cache=None):
+        self.backend = backend
+        self.cache = cache
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(threshold=5, cooldown=30.0)
+
+    def _backoff(self, attempt):
+        """第attempt次重试前的等待时间（full jitter）"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _call(self, func, timeout):
+        """在截止时间内调用func(剩余时间)，临时错误时重试"""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise LLMUnavailable('模型服务暂不可用，请稍后再试')
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMError('模型调用超时', transient=True)
+            try:
+                result = func(remaining)
+            except LLMError as e:
+                if not e.transient:
+                    # 请求本身有误，不计入熔断
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def chat(self, messages, model, timeout=None, use_cache=False, **params):
+        """调用模型生成完整回复，返回文本（use_cache为True时相同提示词直接返回缓存结果）"""
+        start = time.perf_counter()
+        key = None
+        if use_cache and self.cache is not None:
+            key = make_cache_key(model, messages, params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                record_llm_call(model, 'chat', time.perf_counter() - start, cache='hit')
+                return cached
+
+        try:
+            result = self._call(
+                lambda remaining: self.backend.chat(model, messages, remaining, **params),
+                timeout
+            )
+        except LLMError as e:
+            record_llm_call(model, 'chat', time.perf_counter() - start, error=error_type(e))
+            raise
+        record_llm_call(model, 'chat', time.perf_counter() - start)
+        if key is not None:
+            self.cache.set(key, result)
+        return result
+
+    def forget(self, messages, model, **params):
+        """删除某次调用的缓存结果（如模型返回内容无法解析时）"""
+        if self.cache is not None:
+            self.cache.delete(make_cache_key(model, messages, params))
+
+    def stream(self, messages, model, timeout=None, **params):
+        """流式调用模型，逐段产出回复文本（只在产出第一段之前重试）"""
+        def first_chunk(remaining):
+            chunks = self.backend.stream(model, messages, remaining, **params)
+            try:
+                return chunks, next(chunks)
+            except StopIteration:
+                return chunks, None
+
+        start = time.perf_counter()
+        try:
+            chunks, first = self._call(first_chunk, timeout)
+        except LLMError as e:
+            record_llm_call(model, 'stream', time.perf_counter() - start, error=error_type(e))
+            raise
+        record_stage('llm_first_chunk', time.perf_counter() - start)
+        if first is None:
+            record_llm_call(model, 'stream', time.perf_counter() - start)
+            return
+        yield first
+        try:
+            yield from chunks
+        except LLMError as e:
+            self.breaker.record_failure()
+            record_llm_call(model, 'stream', time.perf_counter() - start, error=error_type(e))
+            raise
+        record_llm_call(model, 'stream', time.perf_counter() - start)
+
+
+def init_llm_client(app):
+    """根据配置创建大模型客户端，保存在app.extensions中"""
+    if app.config.get('LLM_BACKEND') == 'fake':
+        backend = FakeBackend(app.config.get('LLM_FAKE_LATENCY', 0.0))
+    else:
+        backend = DashScopeBackend(
+            api_key=app.config.get('DASHSCOPE_API_KEY'),
+            base_url=app.config.get('LLM_BASE_URL'),
+            pool_size=app.config.get('LLM_POOL_SIZE', 20)
+        )
+
+    cache = None
+    if app.config.get('LLM_CACHE_ENABLED', True):
+        cache = ResponseCache(
+            max_entries=app.config.get('LLM_CACHE_MAX_ENTRIES', 1024),
+            ttl=app.config.get('LLM_CACHE_TTL', 3600),
+            persistent_path=app.config.get('LLM_CACHE_PATH')
+        )
+
+    client = LLMClient(
+        backend,
+        timeout=app.config.get('LLM_TIMEOUT', 30.0),
+        max_retries=app.config.get('LLM_MAX_RETRIES', 2),
+        backoff_base=app.config.get('LLM_BACKOFF_BASE', 0.5),
+        breaker=CircuitBreaker(
+            threshold=app.config.get('LLM_BREAKER_THRESHOLD', 5),
+            cooldown=app.config.get('LLM_BREAKER_COOLDOWN', 30.0)
+        ),
+        cache=cache
+    )
+    app.extensions['llm_client'] = client
+    return client
+
+def get_llm_client():
+    """获取当前应用的大模型客户端"""
+    return current_app.extensions['llm_client']
@@ -0,0 +1,249 @@
+import hmac
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# 耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+timing_logger = logging.getLogger('wenxin.timing')
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labelnames, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """只增计数器（按标签分别计数）"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """耗时直方图：按标签记录各分桶的次数、总和与总次数"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # 标签值 -> [各分桶次数（不累计）, 总和, 总次数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, [list(state[0]), state[1], state[2]]) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            labels = format_labels(self.labelnames, key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """进程内指标注册表，按Prometheus文本格式输出（多进程部署时每个工作进程各自统计）"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+REQUEST_DURATION = REGISTRY.histogram(
+    'wenxin_http_request_duration_seconds', '请求处理耗时（含响应体输出）', ('method', 'endpoint', 'status'))
+STAGE_DURATION = REGISTRY.histogram(
+    'wenxin_stage_duration_seconds', '请求内各阶段耗时（文件读写、数据库、Token校验等）', ('stage',))
+LLM_DURATION = REGISTRY.histogram(
+    'wenxin_llm_request_duration_seconds', '大模型调用耗时（含重试）', ('model', 'kind', 'cache'))
+LLM_ERRORS = REGISTRY.counter(
+    'wenxin_llm_errors_total', '大模型调用失败次数', ('model', 'kind', 'error'))
+LLM_TOKENS = REGISTRY.counter(
+    'wenxin_llm_tokens_total', '大模型用量（服务端返回的token数）', ('model', 'type'))
+
+
+def record_stage(stage, seconds):
+    """记录一个阶段的耗时；在请求中时同时计入该请求的耗时明细"""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    if has_request_context():
+        timings = g.setdefault('stage_timings', {})
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def span(stage):
+    """统计代码块的耗时（按stage分别汇总）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+def record_llm_call(model, kind, seconds, cache='miss', error=None):
+    """记录一次大模型调用的耗时和结果"""
+    LLM_DURATION.observe(seconds, model=model, kind=kind, cache=cache)
+    if error is not None:
+        LLM_ERRORS.inc(model=model, kind=kind, error=error)
+    if has_request_context() and cache != 'hit':
+        timings = g.setdefault('stage_timings', {})
+        timings['llm'] = timings.get('llm', 0.0) + seconds
+
+def record_llm_usage(model, usage):
+    """记录服务端返回的token用量（OpenAI兼容格式的usage字段）"""
+    if not usage:
+        return
+    for field, label in (('prompt_tokens', 'prompt'), ('completion_tokens', 'completion')):
+        if usage.get(field):
+            LLM_TOKENS.inc(usage[field], model=model, type=label)
+
+
+def _session_timer(stage):
+    """生成一对会话事件回调，统计flush或commit的耗时（计时起点保存在session.info中）"""
+    key = f"_{stage}_started"
+
+    def before(session, *args):
+        session.info[key] = time.perf_counter()
+
+    def after(session, *args):
+        started = session.info.pop(key, None)
+        if started is not None:
+            record_stage(stage, time.perf_counter() - started)
+
+    return before, after
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('_query_started')
+    if started:
+        record_stage('db_query', time.perf_counter() - started.pop())
+
+def instrument_sqlalchemy():
+    """统计所有会话的flush、commit耗时和所有连接的SQL执行耗时"""
+    if event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        return
+    before_flush, after_flush = _session_timer('db_flush')
+    before_commit, after_commit = _session_timer('db_commit')
+    event.listen(Session, 'before_flush', before_flush)
+    event.listen(Session, 'after_flush_postexec', after_flush)
+    event.listen(Session, 'before_commit', before_commit)
+    event.listen(Session, 'after_commit', after_commit)
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+def _finish_request_timer(response):
+    """响应体输出完成后记录请求耗时（流式响应包含整个输出过程）"""
+    started = g.get('request_started')
+    if started is None:
+        return response
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    method, path, status = request.method, request.path, response.status_code
+    timings = g.setdefault('stage_timings', {})
+    app = current_app._get_current_object()
+
+    def finish():
+        duration = time.perf_counter() - started
+        REQUEST_DURATION.observe(duration, method=method, endpoint=endpoint, status=str(status))
+        if app.config.get('METRICS_TIMING_LOG') and duration * 1000 >= app.config.get('METRICS_SLOW_REQUEST_MS', 0):
+            timing_logger.info(json.dumps({
+                'method': method,
+                'path': path,
+                'endpoint': endpoint,
+                'status': status,
+                'duration_ms': round(duration * 1000, 2),
+                'stages_ms': {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+            }, ensure_ascii=False))
+
+    response.call_on_close(finish)
+    return response
+
+def metrics_view():
+    """以Prometheus文本格式输出本进程的指标（需要携带METRICS_TOKEN作为Bearer Token）"""
+    token = current_app.config.get('METRICS_TOKEN')
+    provided = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(provided.encode(), f"Bearer {token}".encode()):
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def init_metrics(app):
+    """注册请求耗时统计、数据库耗时统计和/metrics接口（未配置METRICS_TOKEN时不提供/metrics接口）"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return None
+    instrument_sqlalchemy()
+    app.before_request(_start_request_timer)
+    app.after_request(_finish_request_timer)
+    if app.config.get('METRICS_TOKEN'):
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
+    if app.config.get('METRICS_TIMING_LOG') and not timing_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        timing_logger.addHandler(handler)
+        timing_logger.setLevel(logging.INFO)
+        timing_logger.propagate = False
+    app.extensions['metrics'] = REGISTRY
+    return REGISTRY
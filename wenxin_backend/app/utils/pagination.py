@@ -0,0 +1,50 @@
+import json
+import base64
+from datetime import datetime
+from flask import request, current_app
+from sqlalchemy import or_, and_
+
+def encode_cursor(sort_value, row_id):
+    """把最后一条记录的(排序字段值, id)编码为不透明的分页游标"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """解析分页游标，返回(排序字段值, id)，格式错误时抛出ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('分页游标无效') from e
+
+def get_page_size():
+    """读取limit参数，缺省使用配置的每页条数，并限制最大值"""
+    default = current_app.config.get('PAGE_SIZE', 50)
+    max_size = current_app.config.get('MAX_PAGE_SIZE', 200)
+    try:
+        page_size = int(request.args.get('limit', default))
+    except ValueError:
+        page_size = default
+    return max(1, min(page_size, max_size))
+
+def apply_keyset(query, sort_column, id_column, cursor):
+    """
+    按(sort_column desc, id desc)做游标分页：只取游标之后的记录
+    sort_column可能为NULL（MySQL/SQLite倒序时NULL排在最后）
+    """
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        if sort_value is None:
+            query = query.filter(sort_column.is_(None), id_column < last_id)
+        else:
+            query = query.filter(or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < last_id),
+                sort_column.is_(None)
+            ))
+    return query.order_by(sort_column.desc(), id_column.desc())
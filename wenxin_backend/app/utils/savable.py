@@ -0,0 +1,92 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from flask import current_app
+from app.utils.embedding import HashingEmbedder
+from app.utils.finance import AMOUNT_PATTERN
+
+# 日期、时间表达，如“3月5日”“14:30”“明天下午3点”
+TIME_PATTERN = re.compile(
+    r'\d{1,2}\s*[:：]\s*\d{2}'
+    r'|\d{1,2}\s*月\s*\d{1,2}\s*[日号]'
+    r'|\d{4}[-/.]\d{1,2}[-/.]\d{1,2}'
+    r'|(?:今天|明天|后天|大后天|下周|本周|下个?月|周[一二三四五六日天]|星期[一二三四五六日天])'
+    r'|(?:上午|下午|晚上|早上|中午)\s*[\d一二三四五六七八九十两]+\s*点'
+)
+# 会议、任务、收支等需要记录的事项
+KEYWORD_PATTERN = re.compile(
+    r'会议|开会|例会|周会|面试|约见|拜访|截止|deadline|提交|交付|上线|待办|任务|安排|计划|提醒|记得|别忘'
+    r'|报销|付款|转账|发票|账单|预算|工资|房租|还款|收款',
+    re.IGNORECASE
+)
+
+class SavableClassifier:
+    """
+    本地判断消息是否包含值得保存的信息（不调用大模型）
+    规则：出现金额，或同时出现时间和事项关键词时判定为可保存
+    配置了SAVABLE_MODEL_PATH时另外加载磁盘上的小模型（哈希特征上的逻辑回归），任一方判定即可
+    """
+
+    def __init__(self, model_path=None, threshold=0.5, workers=2):
+        self.threshold = threshold
+        self.weights = None
+        self.bias = 0.0
+        self.embedder = None
+        if model_path and os.path.exists(model_path):
+            self.load(model_path)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='savable')
+
+    def load(self, model_path):
+        """加载scripts/train_savable.py训练得到的模型（weights、bias、threshold），失败时只使用规则"""
+        try:
+            with np.load(model_path) as model:
+                self.weights = model['weights'].astype(np.float32)
+                self.bias = float(model['bias'])
+                if 'threshold' in model:
+                    self.threshold = float(model['threshold'])
+            self.embedder = HashingEmbedder(len(self.weights))
+        except Exception as e:
+            print(f"加载可保存信息模型错误: {e}")
+            self.weights = None
+
+    def rule_match(self, text):
+        if AMOUNT_PATTERN.search(text):
+            return True
+        return bool(TIME_PATTERN.search(text) and KEYWORD_PATTERN.search(text))
+
+    def score(self, text):
+        """模型给出的可保存概率，没有模型时返回None"""
+        if self.weights is None:
+            return None
+        vector = self.embedder.embed([text])[0]
+        return float(1.0 / (1.0 + np.exp(-(vector @ self.weights + self.bias))))
+
+    def classify(self, text):
+        text = (text or '').strip()
+        if not text:
+            return False
+        if self.rule_match(text):
+            return True
+        probability = self.score(text)
+        return probability is not None and probability >= self.threshold
+
+    def submit(self, text):
+        """在后台线程中判断，与生成回复并行，返回Future"""
+        return self.executor.submit(self.classify, text)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+def get_savable_classifier():
+    return current_app.extensions['savable']
+
+def init_savable(app):
+    """根据配置创建可保存信息分类器，保存在app.extensions中"""
+    classifier = SavableClassifier(
+        model_path=app.config.get('SAVABLE_MODEL_PATH'),
+        threshold=app.config.get('SAVABLE_THRESHOLD', 0.5),
+        workers=app.config.get('SAVABLE_WORKERS', 2)
+    )
+    app.extensions['savable'] = classifier
+    return classifier
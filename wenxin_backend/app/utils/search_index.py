@@ -0,0 +1,553 @@
+import os
+import json
+import math
+import time
+import uuid
+import atexit
+import shutil
+import weakref
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import and_, or_, update, bindparam
+from app.extensions import db
+from app.models.user_info import UserInfo
+from app.utils.bm25 import BM25Index
+from app.utils.embedding import HashingEmbedder
+from app.utils.tokenizer import search_terms
+from app.utils.vector_index import VectorIndex, train_centroids, assign_lists
+from app.utils.vector_store import QdrantStore, VectorStoreError
+
+# 混合排序时倒数排名融合（RRF）的平滑常数
+RRF_K = 60
+# 向量召回的最低相似度，低于此值视为不相关
+VECTOR_MIN_SCORE = 0.05
+# 从数据库同步新信息项时每批读取的行数
+SYNC_BATCH = 1000
+
+def search_depth(limit, mode):
+    """每一路召回的条数（hybrid时多取一些再融合）"""
+    return max(limit * 4, 50) if mode == 'hybrid' else limit
+
+def info_version(updated_at):
+    """信息项版本：updated_at的时间戳（旧数据没有updated_at时为0）"""
+    return updated_at.timestamp() if updated_at else 0.0
+
+def info_text(title, description):
+    """参与检索的文本：标题和描述"""
+    return f"{title or ''}\n{description or ''}"
+
+def index_rows_query():
+    """建索引需要的字段（不加载content）"""
+    return db.session.query(
+        UserInfo.id, UserInfo.user_id, UserInfo.category, UserInfo.title,
+        UserInfo.description, UserInfo.updated_at, UserInfo.vector_id
+    )
+
+
+class GrowingArray:
+    """按容量倍增追加元素的一维NumPy数组"""
+
+    def __init__(self, dtype, data=None):
+        data = np.asarray(data if data is not None else [], dtype=dtype)
+        self._data = np.zeros(max(64, len(data)), dtype=dtype)
+        self._data[:len(data)] = data
+        self.size = len(data)
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self._data):
+            grown = np.zeros(max(needed, len(self._data) * 2), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = values
+        self.size = needed
+
+    def view(self):
+        return self._data[:self.size]
+
+
+class UserSearchIndex:
+    """
+    单个用户的检索索引：向量索引 + BM25倒排索引，两者按相同的文档位置对齐
+    ids/categories/alive也按位置存放；删除只标记alive，压缩保存时才真正移除
+    versions记录每个文档建索引时信息项的updated_at，用于跳过已是最新的行（同步可以重复执行）
+    """
+
+    def __init__(self, dim, watermark=0):
+        self.reset(VectorIndex(dim), BM25Index())
+        self.watermark = watermark  # 已建索引的最大信息项ID
+        self.unsaved = 0  # 上次保存之后新增或删除的条数
+        self.synced_at = 0.0
+        self.snapshot = None  # 当前对应的磁盘快照目录名
+        self.lock = threading.RLock()
+
+    def reset(self, vectors, bm25, ids=None, categories=None, versions=None):
+        """替换索引内容（加载快照或压缩保存之后）"""
+        self.vectors = vectors
+        self.bm25 = bm25
+        self.ids = GrowingArray(np.int64, ids)
+        self.categories = GrowingArray('<U16', categories)
+        self.versions = GrowingArray(np.float64, versions if versions is not None else np.zeros(self.ids.size))
+        self.alive = GrowingArray(bool, np.ones(self.ids.size, dtype=bool))
+        self.positions = {int(info_id): position for position, info_id in enumerate(self.ids.view())}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def version_watermark(self):
+        """已建索引的信息项中最新的updated_at（没有时返回None）"""
+        versions = self.versions.view()
+        latest = float(versions.max()) if len(versions) else 0.0
+        return datetime.fromtimestamp(latest) if latest > 0 else None
+
+    def stale(self, ids, versions):
+        """返回每个信息项是否需要（重新）建索引"""
+        indexed = self.versions.view()
+        result = []
+        for info_id, version in zip(ids, versions):
+            position = self.positions.get(int(info_id))
+            result.append(position is None or indexed[position] < version)
+        return result
+
+    def add(self, ids, categories, texts, vectors, versions=None):
+        """加入一批信息项（已存在的ID视为更新，旧版本标记为删除）"""
+        self.remove(ids)
+        start = self.vectors.add(vectors)
+        for offset, text in enumerate(texts):
+            self.bm25.add(start + offset, search_terms(text))
+        self.ids.extend(ids)
+        self.categories.extend(categories)
+        self.versions.extend(versions if versions is not None else np.zeros(len(ids)))
+        self.alive.extend(np.ones(len(ids), dtype=bool))
+        for offset, info_id in enumerate(ids):
+            self.positions[int(info_id)] = start + offset
+        self.watermark = max(self.watermark, max(ids))
+        self.unsaved += len(ids)
+
+    def remove(self, ids):
+        """删除信息项（只做标记）"""
+        alive = self.alive.view()
+        for info_id in ids:
+            position = self.positions.pop(int(info_id), None)
+            if position is not None:
+                alive[position] = False
+                self.unsaved += 1
+
+    def _mask(self, category=None):
+        mask = self.alive.view()
+        if category:
+            mask = mask & (self.categories.view() == category)
+        return mask
+
+    def search(self, terms, vector, limit, category=None, mode='hybrid', nprobe=8, vector_hits=None):
+        """
+        检索并返回[(信息项ID, 分数)]
+        hybrid模式下分别取BM25和向量的前若干名，用RRF按名次融合
+        vector_hits为外部向量库的召回结果[(信息项ID, 相似度)]，提供时代替本地向量检索
+        """
+        mask = self._mask(category)
+        depth = search_depth(limit, mode)
+        ids = self.ids.view()
+        ranked = []
+        if mode in ('hybrid', 'bm25'):
+            positions, scores = self.bm25.search(terms, depth, mask)
+            ranked.append([(int(ids[p]), float(s)) for p, s in zip(positions, scores)])
+        if mode in ('hybrid', 'vector'):
+            if vector_hits is None:
+                positions, scores = self.vectors.search(vector, depth, mask, nprobe)
+                vector_hits = [(int(ids[p]), float(s)) for p, s in zip(positions, scores)]
+            ranked.append([(info_id, score) for info_id, score in vector_hits if score > VECTOR_MIN_SCORE])
+
+        if mode != 'hybrid':
+            return ranked[0][:limit]
+
+        fused = defaultdict(float)
+        for hits in ranked:
+            for rank, (info_id, _) in enumerate(hits):
+                fused[info_id] += 1.0 / (RRF_K + rank + 1)
+        return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def compact(self, ivf_min_items):
+        """
+        移除已删除的文档，数量足够时训练IVF聚类并按倒排列表重排，返回保存用的数组
+        """
+        alive_positions = np.flatnonzero(self.alive.view())
+        vectors = self.vectors.vectors()[alive_positions]
+        count = len(alive_positions)
+        order = np.arange(count)
+        centroids = np.zeros((0, self.vectors.dim), dtype=np.float32)
+        offsets = np.zeros(0, dtype=np.int64)
+        if count >= ivf_min_items:
+            nlist = int(math.sqrt(count))
+            centroids = train_centroids(vectors, nlist, sample_size=min(count, nlist * 64))
+            assign = assign_lists(vectors, centroids)
+            order = np.argsort(assign, kind='stable')
+            offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+
+        remap = np.full(self.ids.size, -1, dtype=np.int64)
+        remap[alive_positions[order]] = np.arange(count)
+        arrays = {
+            'vectors': vectors[order],
+            'ids': self.ids.view()[alive_positions[order]],
+            'categories': self.categories.view()[alive_positions[order]],
+            'versions': self.versions.view()[alive_positions[order]],
+            'centroids': centroids,
+            'offsets': offsets
+        }
+        for key, value in self.bm25.to_arrays(remap, count).items():
+            arrays[f'bm25_{key}'] = value
+        return arrays
+
+
+class SearchService:
+    """
+    管理各用户的检索索引：按需从磁盘加载（向量以内存映射方式打开），按最近使用淘汰，
+    从数据库增量同步ID水位线之后的新信息项和更新时间水位线之后修改过的信息项，新增条数达到save_every时压缩保存
+    索引文件可以随时删除，下次加载时会从数据库重建
+
+    启用检索索引器（SearchIndexer）时由它负责写索引：leader为True的进程（持有租约）写索引并保存快照，
+    leader为False的进程只读，磁盘上的快照更新后重新加载，并按ID水位线补上快照之后的新信息项
+    store为外部向量库（VECTOR_DB_URL），配置时语义召回改为查询向量库
+    """
+
+    def __init__(self, path, dim=256, max_loaded=32, ivf_min_items=20000, nprobe=8,
+                 save_every=2000, sync_interval=1.0, overlap=5.0, store=None):
+        self.path = path
+        self.store = store
+        self.leader = None  # None表示未启用索引器
+        self.embedder = HashingEmbedder(dim)
+        self.max_loaded = max_loaded
+        self.ivf_min_items = ivf_min_items
+        self.nprobe = nprobe
+        self.save_every = save_every
+        self.sync_interval = sync_interval
+        self.overlap = overlap
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _meta_path(self, user_id):
+        return os.path.join(self.path, f"user_{user_id}.json")
+
+    def _open_snapshot(self, name):
+        """打开快照目录，返回UserSearchIndex.reset所需的参数（向量以内存映射方式打开）"""
+        snapshot = os.path.join(self.path, name)
+        vectors = np.load(os.path.join(snapshot, 'vectors.npy'), mmap_mode='r')
+        with np.load(os.path.join(snapshot, 'index.npz')) as data:
+            arrays = {key: data[key] for key in data.files}
+        centroids = arrays['centroids'] if len(arrays['centroids']) else None
+        offsets = arrays['offsets'] if centroids is not None else None
+        bm25 = BM25Index.from_arrays({
+            key[len('bm25_'):]: value for key, value in arrays.items() if key.startswith('bm25_')
+        })
+        return (
+            VectorIndex(self.embedder.dim, vectors, centroids, offsets), bm25,
+            arrays['ids'], arrays['categories'], arrays['versions']
+        )
+
+    def _disk_snapshot(self, user_id):
+        """磁盘上当前的快照目录名（没有时返回None）"""
+        try:
+            with open(self._meta_path(user_id), encoding='utf-8') as f:
+                return json.load(f).get('snapshot')
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def writer(self):
+        """当前进程是否负责保存索引快照"""
+        return self.leader is not False
+
+    def load(self, user_id):
+        """从磁盘加载用户索引；不存在、损坏或嵌入方式变化时返回None（随后从数据库重建）"""
+        if not self.path or not os.path.exists(self._meta_path(user_id)):
+            return None
+        try:
+            with open(self._meta_path(user_id), encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('embedder') != self.embedder.name or meta.get('dim') != self.embedder.dim:
+                return None
+            index = UserSearchIndex(self.embedder.dim, watermark=meta['watermark'])
+            index.reset(*self._open_snapshot(meta['snapshot']))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"加载检索索引错误: {e}")
+            return None
+        index.snapshot = meta['snapshot']
+        return index
+
+    def save(self, user_id, index):
+        """压缩并保存用户索引：先写新的快照目录，再原子替换指向它的元数据文件"""
+        if not self.path or not self.writer:
+            return
+        with index.lock:
+            arrays = index.compact(self.ivf_min_items)
+            name = f"user_{user_id}-{uuid.uuid4().hex[:8]}"
+            snapshot = os.path.join(self.path, name)
+            os.makedirs(snapshot, exist_ok=True)
+            np.save(os.path.join(snapshot, 'vectors.npy'), arrays.pop('vectors'))
+            np.savez(os.path.join(snapshot, 'index.npz'), **arrays)
+
+            meta = {
+                'snapshot': name,
+                'embedder': self.embedder.name,
+                'dim': self.embedder.dim,
+                'watermark': index.watermark,
+                'count': len(arrays['ids'])
+            }
+            tmp_path = f"{self._meta_path(user_id)}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._meta_path(user_id))
+
+            # 换成压缩后的快照（已删除的文档被移除，数量足够时启用IVF）
+            index.reset(*self._open_snapshot(name))
+            if index.snapshot and index.snapshot != name:
+                shutil.rmtree(os.path.join(self.path, index.snapshot), ignore_errors=True)
+            index.snapshot = name
+            index.unsaved = 0
+
+    def get_index(self, user_id):
+        """获取用户索引（加载到内存的索引超过max_loaded时淘汰最久未用的）"""
+        evicted = []
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+            index = self.load(user_id) or UserSearchIndex(self.embedder.dim)
+            self._indexes[user_id] = index
+            while len(self._indexes) > self.max_loaded:
+                evicted.append(self._indexes.popitem(last=False))
+        for evicted_user_id, evicted_index in evicted:
+            if evicted_index.unsaved:
+                self.save(evicted_user_id, evicted_index)
+        return index
+
+    def _reload_if_changed(self, user_id, index):
+        """只读进程：其他进程保存了新的快照时重新加载"""
+        if self.leader is not False or not self.path:
+            return index
+        snapshot = self._disk_snapshot(user_id)
+        if snapshot is None or snapshot == index.snapshot:
+            return index
+        fresh = self.load(user_id)
+        if fresh is None:
+            return index
+        with self._lock:
+            if user_id in self._indexes:
+                self._indexes[user_id] = fresh
+        return fresh
+
+    def sync_user(self, user_id, force=False):
+        """
+        把数据库中新增（ID大于水位线）或修改过（updated_at晚于已建索引的最新版本，回退overlap秒）的信息项加入索引
+        非force时按sync_interval限流；持有索引器租约的进程不在这里写索引，由索引器按更新时间统一同步
+        """
+        index = self.get_index(user_id)
+        if not force and time.monotonic() - index.synced_at < self.sync_interval:
+            return index
+        index = self._reload_if_changed(user_id, index)
+        with index.lock:
+            index.synced_at = time.monotonic()
+            if self.leader is True:
+                return index
+            changed = UserInfo.id > index.watermark
+            since = index.version_watermark()
+            if since is not None:
+                # 回退overlap秒，覆盖提交较晚的事务；已是最新的行在_add_rows中跳过
+                changed = or_(changed, UserInfo.updated_at > since - timedelta(seconds=self.overlap))
+            cursor = 0
+            while True:
+                rows = index_rows_query().filter(
+                    UserInfo.user_id == user_id, UserInfo.id > cursor, changed
+                ).order_by(UserInfo.id).limit(SYNC_BATCH).all()
+                if not rows:
+                    break
+                self._add_rows(index, rows)
+                index.watermark = max(index.watermark, rows[-1].id)
+                cursor = rows[-1].id
+                if self.leader is None:
+                    self.record_vector_ids(rows)
+                if len(rows) < SYNC_BATCH:
+                    break
+            if self.leader is None:
+                db.session.commit()
+                if index.unsaved >= self.save_every:
+                    self.save(user_id, index)
+        return index
+
+    def vector_id(self, info_id):
+        """记录到UserInfo.vector_id的值"""
+        if self.store is not None:
+            return self.store.vector_id(info_id)
+        return f"local:{info_id}"
+
+    def record_vector_ids(self, rows):
+        """
+        回写已建索引的信息项的vector_id（由调用方提交）
+        带上原updated_at：不触发onupdate（否则会被再次同步），并且只在行没有被并发修改时才写入
+        """
+        table = UserInfo.__table__
+        updates = [{
+            'b_id': row.id,
+            'b_vector_id': self.vector_id(row.id),
+            'b_updated_at': row.updated_at
+        } for row in rows if row.vector_id != self.vector_id(row.id)]
+        if not updates:
+            return
+        db.session.execute(
+            update(table)
+            .where(
+                table.c.id == bindparam('b_id'),
+                or_(
+                    table.c.updated_at == bindparam('b_updated_at'),
+                    and_(table.c.updated_at.is_(None), bindparam('b_updated_at').is_(None))
+                )
+            )
+            .values(vector_id=bindparam('b_vector_id'), updated_at=bindparam('b_updated_at')),
+            updates
+        )
+
+    def _add_rows(self, index, rows, force=False):
+        """嵌入并加入一批信息项（跳过已是最新的行），返回实际处理的行；写入外部向量库在本地之前"""
+        versions = [info_version(row.updated_at) for row in rows]
+        if not force:
+            stale = index.stale([row.id for row in rows], versions)
+            rows = [row for row, is_stale in zip(rows, stale) if is_stale]
+            versions = [version for version, is_stale in zip(versions, stale) if is_stale]
+        if not rows:
+            return []
+        ids = [row.id for row in rows]
+        categories = [row.category or 'temporary' for row in rows]
+        texts = [info_text(row.title, row.description) for row in rows]
+        vectors = self.embedder.embed(texts)
+        if self.store is not None and self.leader is not False:
+            self.store.upsert(rows[0].user_id, ids, categories, vectors)
+        index.add(ids, categories, texts, vectors, versions)
+        return rows
+
+    def upsert(self, user_id, rows, force=False):
+        """
+        索引器调用：把同一用户的一批信息项写入索引（rows需要id、user_id、category、title、description、updated_at）
+        返回实际（重新）建索引的行；force为True时不跳过已是最新的行
+        """
+        index = self.get_index(user_id)
+        with index.lock:
+            return self._add_rows(index, rows, force)
+
+    def remove(self, user_id, ids):
+        """索引器调用：从索引（和外部向量库）中删除信息项"""
+        if self.store is not None:
+            self.store.delete(ids)
+        index = self.get_index(user_id)
+        with index.lock:
+            index.remove(ids)
+
+    def drop(self, user_id):
+        """清空用户索引（全量重建前调用）"""
+        index = self.get_index(user_id)
+        with index.lock:
+            index.reset(VectorIndex(self.embedder.dim), BM25Index())
+            index.watermark = 0
+            index.unsaved += 1
+
+    def evict(self, user_id):
+        """保存并卸载用户索引（回填时逐个用户处理，限制内存占用）"""
+        with self._lock:
+            index = self._indexes.pop(user_id, None)
+        if index is not None and index.unsaved:
+            self.save(user_id, index)
+
+    def clear(self):
+        """卸载所有索引（不保存），下次使用时从磁盘重新加载"""
+        with self._lock:
+            self._indexes.clear()
+
+    def save_dirty(self, min_unsaved=1):
+        """保存未保存改动不少于min_unsaved条的索引，返回保存的数量"""
+        with self._lock:
+            indexes = [(user_id, index) for user_id, index in self._indexes.items() if index.unsaved >= min_unsaved]
+        for user_id, index in indexes:
+            self.save(user_id, index)
+        return len(indexes)
+
+    def search(self, user_id, query, limit, category=None, mode='hybrid'):
+        """检索用户的信息项，返回[(信息项ID, 分数)]"""
+        index = self.sync_user(user_id)
+        vector = self.embedder.embed([query])[0]
+        vector_hits = None
+        if self.store is not None and mode != 'bm25':
+            try:
+                vector_hits = self.store.search(user_id, vector, search_depth(limit, mode), category)
+            except VectorStoreError as e:
+                print(f"向量库检索错误，改用本地索引: {e}")
+        with index.lock:
+            return index.search(search_terms(query), vector, limit, category, mode, self.nprobe, vector_hits)
+
+    def save_all(self):
+        """保存所有有未保存改动的索引（进程退出时调用）"""
+        try:
+            self.save_dirty()
+        except OSError as e:
+            print(f"保存检索索引错误: {e}")
+
+
+# 进程内创建的检索服务（弱引用，应用被回收后自动移除），进程退出时统一保存
+_services = weakref.WeakSet()
+
+@atexit.register
+def save_all_services():
+    """进程退出时保存所有检索服务的未保存改动（正常关闭时drain已经保存过）"""
+    for service in list(_services):
+        service.save_all()
+
+def init_search(app):
+    """
+    根据配置创建检索服务，保存在app.extensions中
+    SEARCH_INDEX_PATH为相对路径时按后端目录解析，与启动时的工作目录无关
+    """
+    store = None
+    if app.config.get('VECTOR_DB_URL'):
+        store = QdrantStore(
+            app.config['VECTOR_DB_URL'],
+            app.config.get('VECTOR_DB_COLLECTION', 'user_infos'),
+            app.config.get('EMBEDDING_DIM', 256),
+            api_key=app.config.get('VECTOR_DB_API_KEY')
+        )
+    path = app.config.get('SEARCH_INDEX_PATH')
+    if path and not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(app.root_path), path)
+    service = SearchService(
+        path,
+        dim=app.config.get('EMBEDDING_DIM', 256),
+        max_loaded=app.config.get('SEARCH_MAX_LOADED_USERS', 32),
+        ivf_min_items=app.config.get('SEARCH_IVF_MIN_ITEMS', 20000),
+        nprobe=app.config.get('SEARCH_IVF_NPROBE', 8),
+        save_every=app.config.get('SEARCH_SAVE_EVERY', 2000),
+        sync_interval=app.config.get('SEARCH_SYNC_INTERVAL', 1.0),
+        overlap=app.config.get('SEARCH_INDEXER_OVERLAP', 5.0),
+        store=store
+    )
+    app.extensions['search'] = service
+    _services.add(service)
+    return service
+
+def get_search_service():
+    """获取当前应用的检索服务"""
+    return current_app.extensions['search']
+
+def index_user_infos(user_id):
+    """
+    写入信息项并提交后调用（失败不影响写入）
+    启用索引器时唤醒索引器处理，否则直接把新信息项加入本进程的检索索引
+    """
+    try:
+        indexer = current_app.extensions.get('search_indexer')
+        if indexer is not None:
+            indexer.notify()
+            return
+        get_search_service().sync_user(user_id, force=True)
+    except Exception as e:
+        print(f"更新检索索引错误: {e}")
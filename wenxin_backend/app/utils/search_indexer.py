@@ -0,0 +1,328 @@
+import os
+import time
+import uuid
+import socket
+import threading
+from collections import defaultdict
+from datetime import timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, or_, event, func, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.user_info import UserInfo, SearchTombstone, IndexerState, beijing_time
+from app.utils.search_index import index_rows_query
+
+# indexer_state中的两条进度记录
+INCREMENTAL = 'incremental'
+BACKFILL = 'backfill'
+
+def record_tombstone(mapper, connection, target):
+    """删除信息项时记录墓碑（删除对话时级联逐条触发），与删除在同一事务中提交"""
+    connection.execute(insert(SearchTombstone.__table__).values(
+        info_id=target.id,
+        user_id=target.user_id,
+        vector_id=target.vector_id,
+        created_at=beijing_time()
+    ))
+
+def get_state(name):
+    """获取索引器进度记录，不存在则创建（多进程同时创建时以先写入者为准）"""
+    state = db.session.get(IndexerState, name)
+    if state is not None:
+        return state
+    try:
+        with db.session.begin_nested():
+            state = IndexerState(name=name, watermark_id=0, cursor_user_id=0, cursor_id=0)
+            db.session.add(state)
+    except IntegrityError:
+        state = db.session.get(IndexerState, name)
+    return state
+
+class SearchIndexer:
+    """
+    后台检索索引器：按(updated_at, id)水位线分批读取新增或修改的信息项，批量嵌入后写入检索索引
+    （配置了VECTOR_DB_URL时同时写入向量库），回写UserInfo.vector_id，并按墓碑删除已删除的信息项
+    每次扫描都从水位线往前回退overlap秒，避免漏掉提交较晚的事务；已是最新的行会被跳过，重复处理无副作用
+    多进程部署时通过indexer_state中的租约保证同一时间只有一个进程写索引
+    """
+
+    def __init__(self, app, service, batch_size=256, interval=5.0, overlap=5.0,
+                 lease_seconds=30.0, save_idle=30.0):
+        self.app = app
+        self.service = service
+        self.batch_size = batch_size
+        self.interval = interval
+        self.overlap = overlap
+        self.lease_seconds = lease_seconds
+        self.save_idle = save_idle
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.stats = {
+            'indexed_total': 0,
+            'deleted_total': 0,
+            'batches': 0,
+            'last_batch_seconds': 0.0,
+            'last_run_at': None,
+            'last_error': None
+        }
+        self._last_change = time.monotonic()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def start(self):
+        """启动后台线程（重复调用无副作用）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run_forever, name='search-indexer', daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """有新写入时唤醒索引器（未在本进程运行时由运行索引器的进程按间隔轮询）"""
+        self._wakeup.set()
+
+    def shutdown(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self):
+        """持续处理新写入，直到shutdown（后台线程或专用索引进程中运行）"""
+        while not self._stopping.is_set():
+            more = False
+            with self.app.app_context():
+                try:
+                    more = self.run_once()
+                except Exception as e:
+                    db.session.rollback()
+                    self.stats['last_error'] = str(e)
+                    print(f"检索索引器错误: {e}")
+                finally:
+                    db.session.remove()
+            if not more:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+
+    def acquire_lease(self):
+        """获取或续期写索引的租约，返回是否持有"""
+        get_state(INCREMENTAL)
+        now = beijing_time()
+        result = db.session.execute(
+            update(IndexerState)
+            .where(
+                IndexerState.name == INCREMENTAL,
+                or_(
+                    IndexerState.lease_owner == self.owner,
+                    IndexerState.lease_owner.is_(None),
+                    IndexerState.lease_until < now
+                )
+            )
+            .values(lease_owner=self.owner, lease_until=now + timedelta(seconds=self.lease_seconds))
+        )
+        db.session.commit()
+        leader = result.rowcount == 1
+        if leader and self.service.leader is not True:
+            # 刚拿到租约：丢弃只读期间加载的索引，从磁盘上最新的快照重新加载
+            self.service.clear()
+        self.service.leader = leader
+        return leader
+
+    def run_once(self):
+        """处理一轮墓碑和变更，返回是否还有未处理完的数据"""
+        self.stats['last_run_at'] = beijing_time().isoformat()
+        if not self.acquire_lease():
+            return False
+        deleted, more_deletes = self.process_tombstones()
+        indexed, more_changes = self.process_changes()
+        if deleted or indexed:
+            self._last_change = time.monotonic()
+
+        # 新增较多时立即压缩保存；空闲一段时间后保存剩余改动，供只读进程重新加载
+        self.service.save_dirty(self.service.save_every)
+        if time.monotonic() - self._last_change >= self.save_idle:
+            self.service.save_dirty()
+        self.stats['last_error'] = None
+        return more_deletes or more_changes
+
+    def index_rows(self, rows, force=False):
+        """嵌入并写入一批信息项（可跨用户），回写vector_id，返回实际建索引的条数"""
+        start = time.perf_counter()
+        by_user = defaultdict(list)
+        for row in rows:
+            by_user[row.user_id].append(row)
+        indexed = 0
+        for user_id, user_rows in by_user.items():
+            indexed += len(self.service.upsert(user_id, user_rows, force))
+
+        self.service.record_vector_ids(rows)
+
+        self.stats['indexed_total'] += indexed
+        self.stats['batches'] += 1
+        self.stats['last_batch_seconds'] = round(time.perf_counter() - start, 4)
+        return indexed
+
+    def process_changes(self, max_batches=20):
+        """按水位线处理新增或修改的信息项，返回(建索引条数, 是否还有剩余)"""
+        state = get_state(INCREMENTAL)
+        cursor_at = state.watermark_at - timedelta(seconds=self.overlap) if state.watermark_at else None
+        cursor_id = 0
+        indexed = 0
+        for _ in range(max_batches):
+            query = index_rows_query().filter(UserInfo.updated_at.isnot(None))
+            if cursor_at is not None:
+                query = query.filter(or_(
+                    UserInfo.updated_at > cursor_at,
+                    and_(UserInfo.updated_at == cursor_at, UserInfo.id > cursor_id)
+                ))
+            rows = query.order_by(UserInfo.updated_at, UserInfo.id).limit(self.batch_size).all()
+            if not rows:
+                return indexed, False
+
+            indexed += self.index_rows(rows)
+            cursor_at, cursor_id = rows[-1].updated_at, rows[-1].id
+            if state.watermark_at is None or (cursor_at, cursor_id) > (state.watermark_at, state.watermark_id or 0):
+                state.watermark_at, state.watermark_id = cursor_at, cursor_id
+            db.session.commit()
+            if len(rows) < self.batch_size:
+                return indexed, False
+        return indexed, True
+
+    def process_tombstones(self):
+        """从索引和向量库中删除已删除的信息项，返回(删除条数, 是否还有剩余)"""
+        tombstones = SearchTombstone.query.order_by(SearchTombstone.id).limit(self.batch_size).all()
+        if not tombstones:
+            return 0, False
+        by_user = defaultdict(list)
+        for tombstone in tombstones:
+            by_user[tombstone.user_id].append(tombstone.info_id)
+        for user_id, ids in by_user.items():
+            self.service.remove(user_id, ids)
+        db.session.execute(delete(SearchTombstone).where(
+            SearchTombstone.id.in_([tombstone.id for tombstone in tombstones])
+        ))
+        db.session.commit()
+        self.stats['deleted_total'] += len(tombstones)
+        return len(tombstones), len(tombstones) == self.batch_size
+
+    def backfill(self, reindex=False, echo=print):
+        """
+        按(user_id, id)顺序分批处理全部信息项（包括没有updated_at的旧数据）
+        每处理完一个用户就保存并卸载其索引，内存占用与总行数无关；进度保存在indexer_state中，中断后重新执行会继续
+        reindex为True时清空每个用户的索引并重新嵌入所有行
+        """
+        state = get_state(BACKFILL)
+        db.session.commit()
+        current_user_id = state.cursor_user_id or None
+        total = 0
+        while True:
+            if not self.acquire_lease():
+                echo('其他进程正在写索引，等待租约...')
+                time.sleep(self.lease_seconds / 3)
+                continue
+            rows = index_rows_query().filter(or_(
+                UserInfo.user_id > state.cursor_user_id,
+                and_(UserInfo.user_id == state.cursor_user_id, UserInfo.id > state.cursor_id)
+            )).order_by(UserInfo.user_id, UserInfo.id).limit(self.batch_size).all()
+            if not rows:
+                break
+
+            for user_id in sorted({row.user_id for row in rows}):
+                if user_id != current_user_id:
+                    if current_user_id is not None:
+                        self.service.evict(current_user_id)
+                    if reindex:
+                        self.service.drop(user_id)
+                    current_user_id = user_id
+                    echo(f"用户{user_id}...")
+            total += self.index_rows(rows, force=reindex)
+            state.cursor_user_id, state.cursor_id = rows[-1].user_id, rows[-1].id
+            db.session.commit()
+
+        if current_user_id is not None:
+            self.service.evict(current_user_id)
+        state.cursor_user_id, state.cursor_id = 0, 0
+        db.session.commit()
+        echo(f"回填完成，建索引{total}条")
+        return total
+
+    def lag(self):
+        """同步延迟指标：待处理行数、最早待处理行的等待秒数、待处理的删除数"""
+        state = get_state(INCREMENTAL)
+        pending = db.session.query(func.count(UserInfo.id), func.min(UserInfo.updated_at))
+        if state.watermark_at is not None:
+            pending = pending.filter(or_(
+                UserInfo.updated_at > state.watermark_at,
+                and_(UserInfo.updated_at == state.watermark_at, UserInfo.id > (state.watermark_id or 0))
+            ))
+        else:
+            pending = pending.filter(UserInfo.updated_at.isnot(None))
+        pending_rows, oldest = pending.one()
+        return dict(
+            self.stats,
+            leader=self.service.leader is True,
+            lease_owner=state.lease_owner,
+            watermark_at=state.watermark_at.isoformat() if state.watermark_at else None,
+            pending_rows=pending_rows,
+            pending_deletes=db.session.query(func.count(SearchTombstone.id)).scalar(),
+            lag_seconds=round((beijing_time() - oldest).total_seconds(), 3) if oldest else 0.0,
+            unindexed_rows=db.session.query(func.count(UserInfo.id)).filter(UserInfo.vector_id.is_(None)).scalar()
+        )
+
+
+def build_search_indexer(app, service):
+    """按配置创建检索索引器（不启动后台线程）"""
+    return SearchIndexer(
+        app, service,
+        batch_size=app.config.get('SEARCH_INDEXER_BATCH', 256),
+        interval=app.config.get('SEARCH_INDEXER_INTERVAL', 5.0),
+        overlap=app.config.get('SEARCH_INDEXER_OVERLAP', 5.0),
+        lease_seconds=app.config.get('SEARCH_INDEXER_LEASE', 30.0),
+        save_idle=app.config.get('SEARCH_SAVE_IDLE', 30.0)
+    )
+
+def command_indexer():
+    """命令行使用的索引器：复用已创建的（未启动的）索引器，未启用时临时创建"""
+    indexer = current_app.extensions.get('search_indexer')
+    if indexer is None:
+        indexer = build_search_indexer(current_app._get_current_object(), current_app.extensions['search'])
+    return indexer
+
+@click.command('search-backfill')
+@click.option('--reindex', is_flag=True, help='清空并重新嵌入所有信息项')
+@with_appcontext
+def search_backfill_command(reindex):
+    """为全部信息项建立检索索引（可中断，重新执行时继续）"""
+    command_indexer().backfill(reindex=reindex, echo=click.echo)
+
+@click.command('search-indexer')
+@with_appcontext
+def search_indexer_command():
+    """在当前进程中持续运行检索索引器（专用索引进程，Ctrl+C退出）"""
+    indexer = command_indexer()
+    click.echo(f"检索索引器已启动（{indexer.owner}）")
+    try:
+        indexer.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        current_app.extensions['search'].save_all()
+
+def init_search_indexer(app, service):
+    """
+    根据配置创建检索索引器，保存在app.extensions中
+    这里不启动后台线程：由gunicorn工作进程（lifecycle.start_background）或flask search-indexer进程运行
+    """
+    app.cli.add_command(search_backfill_command)
+    app.cli.add_command(search_indexer_command)
+    if not app.config.get('SEARCH_INDEXER_ENABLED', False):
+        return None
+    if not event.contains(UserInfo, 'after_delete', record_tombstone):
+        event.listen(UserInfo, 'after_delete', record_tombstone)
+
+    indexer = build_search_indexer(app, service)
+    app.extensions['search_indexer'] = indexer
+    return indexer
@@ -0,0 +1,109 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.extensions import db
+from app.models.user_info import Message
+from app.utils.ai_process import process_text_with_ai
+
+# 保存指令保存的是对话中最近几条消息的内容
+RECENT_SAVE_MESSAGES = 5
+
+def recent_save_content(conversation_id, before_id=None):
+    """
+    保存指令对应的待提取文本：对话中最近几条已写入的消息（不含会话中尚未写入的新消息）
+    before_id为保存指令本身的消息ID，只取它之前的消息（与预提取时的内容一致）
+    """
+    query = db.session.query(Message.role, Message.content).filter(Message.conversation_id == conversation_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    with db.session.no_autoflush:
+        rows = (
+            query
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(RECENT_SAVE_MESSAGES)
+            .all()
+        )
+    return "\n".join(f"{row.role}: {row.content}" for row in reversed(rows))
+
+
+class SpeculativeExtractor:
+    """
+    预先提取可能被保存的信息项：回复中包含可保存信息时在后台提取，按对话缓存结果
+    用户随后发送保存指令时，待提取文本与预提取时一致则直接使用结果，不再等待模型
+    每个对话只保留最新一次预提取，超过ttl秒未使用的结果自动失效
+    """
+
+    def __init__(self, app, ttl=300.0, workers=2, max_entries=1000):
+        self.app = app
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # 对话ID -> (Future, 过期时间)
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='speculative')
+
+    def _extract(self, conversation_id):
+        with self.app.app_context():
+            try:
+                content = recent_save_content(conversation_id)
+            finally:
+                db.session.remove()
+            return content, process_text_with_ai(content)
+
+    def _prune(self, now):
+        for conversation_id in [cid for cid, (_, expires) in self._entries.items() if expires <= now]:
+            del self._entries[conversation_id]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def start(self, conversation_id):
+        """在后台开始预提取（替换该对话之前的预提取结果）"""
+        future = self.executor.submit(self._extract, conversation_id)
+        now = time.monotonic()
+        with self._lock:
+            self._entries[conversation_id] = (future, now + self.ttl)
+            self._entries.move_to_end(conversation_id)
+            self._prune(now)
+        return future
+
+    def take(self, conversation_id, content, wait=10.0):
+        """
+        取出与content一致且未过期的预提取结果，正在提取时最多等待wait秒
+        没有可用结果（未预提取、已过期、对话内容已变化、提取失败）时返回None
+        """
+        with self._lock:
+            entry = self._entries.pop(conversation_id, None)
+        if entry is None:
+            return None
+        future, expires = entry
+        if expires <= time.monotonic():
+            future.cancel()
+            return None
+        try:
+            speculative_content, items = future.result(timeout=wait)
+        except Exception as e:
+            print(f"预提取结果不可用: {e!r}")
+            return None
+        return items if speculative_content == content else None
+
+    def shutdown(self):
+        """放弃排队中的预提取，等待进行中的模型调用结束"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+def get_speculative_extractor():
+    """获取预提取器，未启用时返回None"""
+    return current_app.extensions.get('speculative')
+
+def init_speculative(app):
+    """根据配置创建预提取器，保存在app.extensions中"""
+    if not app.config.get('SPECULATIVE_EXTRACTION_ENABLED', True):
+        return None
+    extractor = SpeculativeExtractor(
+        app,
+        ttl=app.config.get('SPECULATIVE_TTL', 300.0),
+        workers=app.config.get('SPECULATIVE_WORKERS', 2),
+        max_entries=app.config.get('SPECULATIVE_MAX_ENTRIES', 1000)
+    )
+    app.extensions['speculative'] = extractor
+    return extractor
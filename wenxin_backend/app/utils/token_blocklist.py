@@ -0,0 +1,129 @@
+import math
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.user_info import TokenBlocklist
+
+# 增量刷新时向前多读的时间窗口，覆盖其他进程中稍晚提交的黑名单记录
+REFRESH_SLACK = timedelta(seconds=5)
+
+class BloomFilter:
+    """布隆过滤器：判断不存在时一定不存在，判断存在时可能误判"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.sha256(item.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationCache:
+    """
+    进程内的Token黑名单缓存
+    布隆过滤器中没有的jti直接判定为未吊销，只有可能命中时才查询数据库
+    过滤器按created_at水位增量刷新，本进程退出登录时立即加入
+    """
+
+    def __init__(self, refresh_interval=5.0, capacity=100000, error_rate=0.001):
+        self.refresh_interval = refresh_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.watermark = None  # 已加载记录的最大created_at
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """从数据库加载水位之后新增的黑名单记录"""
+        if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return
+            query = db.session.query(TokenBlocklist.jti, TokenBlocklist.created_at)
+            if self.watermark is not None:
+                query = query.filter(TokenBlocklist.created_at >= self.watermark - REFRESH_SLACK)
+            for jti, created_at in query:
+                self.bloom.add(jti)
+                if self.watermark is None or created_at > self.watermark:
+                    self.watermark = created_at
+            self._last_refresh = time.monotonic()
+
+    def rebuild(self):
+        """按当前数据库内容重建过滤器（清理过期记录后调用，布隆过滤器无法删除元素）"""
+        count = db.session.query(db.func.count(TokenBlocklist.id)).scalar() or 0
+        bloom = BloomFilter(max(self.capacity, count * 2), self.error_rate)
+        watermark = None
+        for jti, created_at in db.session.query(TokenBlocklist.jti, TokenBlocklist.created_at):
+            bloom.add(jti)
+            if watermark is None or created_at > watermark:
+                watermark = created_at
+        with self._lock:
+            self.bloom = bloom
+            self.watermark = watermark
+            self._last_refresh = time.monotonic()
+
+    def revoke(self, jti):
+        """本进程吊销Token时立即加入过滤器"""
+        self.bloom.add(jti)
+
+    def is_revoked(self, jti):
+        """判断Token是否已吊销"""
+        self.refresh()
+        if jti not in self.bloom:
+            return False
+        # 可能命中（含误判），以数据库为准
+        return db.session.query(TokenBlocklist.id).filter_by(jti=jti).first() is not None
+
+
+class BlocklistPurger:
+    """后台定期删除已过期的黑名单记录（Token过期后无需再保留），并重建过滤器"""
+
+    def __init__(self, app, cache, interval):
+        self.app = app
+        self.cache = cache
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None or not self.interval:
+                return
+            self._thread = threading.Thread(target=self._run, name='token-blocklist-purge', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    purge_expired_tokens(self.app.config.get('JWT_ACCESS_TOKEN_EXPIRES'))
+                    self.cache.rebuild()
+                except Exception as e:
+                    print(f"清理Token黑名单错误: {e}")
+                finally:
+                    db.session.remove()
+
+
+def purge_expired_tokens(expires_seconds):
+    """删除早于Token有效期的黑名单记录，返回删除条数"""
+    cutoff = datetime.utcnow() - timedelta(seconds=expires_seconds)
+    deleted = TokenBlocklist.query.filter(TokenBlocklist.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
@@ -0,0 +1,39 @@
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.user_info import UploadQuota
+
+def remaining_quota(user_id):
+    """用户剩余可上传字节数，未配置配额时返回None"""
+    quota = current_app.config.get('UPLOAD_QUOTA_BYTES', 0)
+    if not quota:
+        return None
+    used = db.session.query(UploadQuota.bytes_used).filter_by(user_id=user_id).scalar() or 0
+    return max(quota - used, 0)
+
+def record_upload(user_id, size, count=1):
+    """
+    累加用户的上传用量（与本次上传的文件记录一起，在调用模型之前提交）
+    配置了配额时用一条带条件的UPDATE检查并累加，超出配额时不修改并返回False
+    """
+    quota = current_app.config.get('UPLOAD_QUOTA_BYTES', 0)
+    query = UploadQuota.query.filter_by(user_id=user_id)
+    if quota:
+        query = query.filter(UploadQuota.bytes_used + size <= quota)
+    updated = query.update({
+        UploadQuota.bytes_used: UploadQuota.bytes_used + size,
+        UploadQuota.file_count: UploadQuota.file_count + count
+    }, synchronize_session=False)
+    if updated:
+        return True
+    if quota and (size > quota or db.session.query(
+        UploadQuota.query.filter_by(user_id=user_id).exists()
+    ).scalar()):
+        return False
+    try:
+        with db.session.begin_nested():
+            db.session.add(UploadQuota(user_id=user_id, bytes_used=size, file_count=count))
+    except IntegrityError:
+        # 并发请求已创建记录，改为累加
+        return record_upload(user_id, size, count)
+    return True
@@ -0,0 +1,181 @@
+import os
+import hashlib
+import tempfile
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+# 各扩展名对应的文件头（魔数）
+MAGIC_BYTES = {
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+}
+
+# 判断文件类型需要读取的文件头长度
+SNIFF_BYTES = 16
+
+def matches_extension(head, extension):
+    """
+    检查文件头是否与扩展名相符（文本文件不能包含NUL字节）
+    其他扩展名不在这里检查，由视图按允许的扩展名拒绝
+    """
+    if extension == 'txt':
+        return b'\x00' not in head
+    signatures = MAGIC_BYTES.get(extension)
+    if signatures is None:
+        return True
+    return any(head.startswith(signature) for signature in signatures)
+
+
+class MemoryBudget:
+    """一次请求中所有上传文件保留在内存中的总字节数上限（多个文件共享）"""
+
+    def __init__(self, limit):
+        self.remaining = limit
+
+    def take(self, size):
+        if size > self.remaining:
+            return False
+        self.remaining -= size
+        return True
+
+    def give_back(self, size):
+        self.remaining += size
+
+
+class StreamedUpload:
+    """
+    上传文件的写入目标：multipart解析时直接按块写入上传目录下的临时文件
+    写入过程中计算SHA-256、检查文件头和大小，超限或类型不符时立即中止读取请求体
+    """
+
+    def __init__(self, folder, extension, max_bytes, keep_bytes_limit=0, memory_budget=None):
+        os.makedirs(folder or '.', exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=folder or '.', suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self.keep_bytes_limit = keep_bytes_limit
+        self.memory_budget = memory_budget
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self._head = b''
+        self._checked = False
+        self._chunks = []
+        self.finalized = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise RequestEntityTooLarge('上传文件过大')
+        if not self._checked:
+            self._head += data[:SNIFF_BYTES]
+            if len(self._head) >= SNIFF_BYTES:
+                self.check_type()
+        self.hasher.update(data)
+        if self._chunks is not None:
+            if self.size > self.keep_bytes_limit or (
+                self.memory_budget is not None and not self.memory_budget.take(len(data))
+            ):
+                self.drop_chunks(len(data))
+            else:
+                self._chunks.append(data)
+        return self._file.write(data)
+
+    def drop_chunks(self, pending=0):
+        """不再在内存中保留文件内容（之后从磁盘读取），已占用的内存额度还给请求"""
+        if self.memory_budget is not None:
+            self.memory_budget.give_back(self.size - pending)
+        self._chunks = None
+
+    def check_type(self):
+        if not matches_extension(self._head, self.extension):
+            raise UnsupportedMediaType('文件内容与扩展名不符')
+        self._checked = True
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def tell(self):
+        return self._file.tell()
+
+    def finalize(self, file_path):
+        """
+        把临时文件移动到最终位置（已存在相同内容的文件时丢弃临时文件）
+        返回内存中保留的文件内容（超过keep_bytes_limit时为None）
+        """
+        if not self._checked:
+            self.check_type()
+        self._file.close()
+        if os.path.exists(file_path):
+            os.remove(self.tmp_path)
+        else:
+            os.replace(self.tmp_path, file_path)
+        self.finalized = True
+        return b''.join(self._chunks) if self._chunks is not None else None
+
+    @property
+    def digest(self):
+        return self.hasher.hexdigest()
+
+    def close(self):
+        """关闭并删除未被保存的临时文件"""
+        if not self._file.closed:
+            self._file.close()
+        if not self.finalized and os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def uploaded_size(file):
+    """已解析的上传文件的字节数"""
+    if isinstance(file.stream, StreamedUpload):
+        return file.stream.size
+    position = file.stream.tell()
+    size = file.stream.seek(0, os.SEEK_END)
+    file.stream.seek(position)
+    return size
+
+
+class UploadRequest(Request):
+    """上传接口的文件直接流式写入上传目录，不经过Werkzeug的临时文件缓冲"""
+
+    # 流式写入上传目录的接口，其他接口中的文件使用Werkzeug默认的临时文件
+    upload_endpoints = ('process.upload_info', 'process.upload_batch')
+
+    # 本次请求允许的单个文件最大字节数（视图中可按用户剩余配额调小）
+    upload_limit = None
+
+    @property
+    def memory_budget(self):
+        """本次请求的上传文件共享的内存额度"""
+        if '_memory_budget' not in self.__dict__:
+            self._memory_budget = MemoryBudget(current_app.config.get('UPLOAD_KEEP_IN_MEMORY_REQUEST_BYTES', 0))
+        return self._memory_budget
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint not in self.upload_endpoints:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        extension = filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else ''
+        max_bytes = self.upload_limit or current_app.config.get('UPLOAD_MAX_BYTES')
+        if max_bytes and content_length and content_length > max_bytes:
+            raise RequestEntityTooLarge('上传文件过大')
+
+        stream = StreamedUpload(
+            current_app.config.get('UPLOAD_FOLDER', 'uploads'),
+            extension,
+            max_bytes,
+            current_app.config.get('UPLOAD_KEEP_IN_MEMORY_BYTES', 0),
+            self.memory_budget
+        )
+        self.__dict__.setdefault('_upload_streams', []).append(stream)
+        return stream
+
+    def close(self):
+        super().close()
+        # 解析中途出错时files尚未生成，这里确保临时文件都被清理
+        for stream in self.__dict__.get('_upload_streams', ()):
+            stream.close()
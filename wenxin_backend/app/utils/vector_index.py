@@ -0,0 +1,105 @@
+import numpy as np
+
+def top_k(scores, k):
+    """返回分数最高的k个下标（按分数降序），忽略-inf"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+    return candidates[np.isfinite(scores[candidates])]
+
+def assign_lists(vectors, centroids, batch_size=8192):
+    """按内积把每个向量分配到最近的聚类中心"""
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        block = np.asarray(vectors[start:start + batch_size])
+        assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+def train_centroids(vectors, nlist, iterations=10, sample_size=65536, seed=0):
+    """在（抽样的）归一化向量上训练球面k-means聚类中心"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    else:
+        sample = np.asarray(vectors)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = assign_lists(sample, centroids)
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=nlist)
+        nonempty = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[nonempty]
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        # 空簇保留原中心
+        centroids[nonempty] = sums
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class VectorIndex:
+    """
+    基于NumPy的向量索引，按内积（归一化后即余弦）检索
+    base为压缩保存时写出的只读段（可以是内存映射），按IVF倒排列表排序存放，
+    offsets[i]:offsets[i+1]为第i个列表；base之后新增的向量追加在内存中的delta段，暴力检索
+    """
+
+    def __init__(self, dim, base=None, centroids=None, offsets=None):
+        self.dim = dim
+        self.base = base if base is not None else np.zeros((0, dim), dtype=np.float32)
+        self.centroids = centroids
+        self.offsets = offsets
+        self._delta = np.zeros((64, dim), dtype=np.float32)
+        self._delta_size = 0
+
+    def __len__(self):
+        return len(self.base) + self._delta_size
+
+    def add(self, vectors):
+        """追加向量，返回第一条的位置"""
+        position = len(self)
+        needed = self._delta_size + len(vectors)
+        if needed > len(self._delta):
+            grown = np.zeros((max(needed, len(self._delta) * 2), self.dim), dtype=np.float32)
+            grown[:self._delta_size] = self._delta[:self._delta_size]
+            self._delta = grown
+        self._delta[self._delta_size:needed] = vectors
+        self._delta_size = needed
+        return position
+
+    def vectors(self):
+        """全部向量（压缩保存时使用）"""
+        return np.concatenate([np.asarray(self.base), self._delta[:self._delta_size]])
+
+    def _base_candidates(self, query, nprobe):
+        """IVF检索时要扫描的base位置；未训练聚类时返回None（扫描全部）"""
+        if self.centroids is None:
+            return None
+        lists = top_k(self.centroids @ query, nprobe)
+        ranges = [np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists]
+        return np.concatenate(ranges) if ranges else np.zeros(0, dtype=np.int64)
+
+    def search(self, query, k, mask=None, nprobe=8):
+        """返回内积最高的k个(位置数组, 分数数组)，mask为按位置的布尔过滤条件"""
+        candidates = self._base_candidates(query, nprobe)
+        if candidates is None:
+            base_positions = np.arange(len(self.base))
+            base_scores = np.asarray(self.base) @ query if len(self.base) else np.zeros(0, dtype=np.float32)
+        else:
+            base_positions = candidates
+            base_scores = np.asarray(self.base[candidates]) @ query if len(candidates) else np.zeros(0, dtype=np.float32)
+
+        delta_positions = np.arange(len(self.base), len(self))
+        delta_scores = self._delta[:self._delta_size] @ query
+        positions = np.concatenate([base_positions, delta_positions])
+        scores = np.concatenate([base_scores, delta_scores]).astype(np.float32)
+        if mask is not None and len(positions):
+            scores[~mask[positions]] = -np.inf
+
+        best = top_k(scores, k)
+        return positions[best], scores[best]
@@ -0,0 +1,79 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+class VectorStoreError(Exception):
+    """向量库请求失败（索引器不推进水位线，下次重试）"""
+
+
+class QdrantStore:
+    """
+    通过REST接口读写Qdrant兼容的向量库（VECTOR_DB_URL）
+    点ID为信息项ID，payload中保存user_id和category用于过滤；写入和删除都是幂等的
+    """
+
+    def __init__(self, url, collection, dim, api_key=None, timeout=10.0, pool_size=4):
+        self.url = url.rstrip('/')
+        self.collection = collection
+        self.dim = dim
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if api_key:
+            self.session.headers['api-key'] = api_key
+        self._ready = False
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, f"{self.url}{path}", timeout=self.timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise VectorStoreError(f"请求向量库失败: {e}")
+        if response.status_code >= 400 and not (method == 'GET' and response.status_code == 404):
+            raise VectorStoreError(f"向量库返回{response.status_code}: {response.text[:200]}")
+        return response
+
+    def ensure_collection(self):
+        """集合不存在时按向量维度创建（余弦距离）"""
+        if self._ready:
+            return
+        path = f"/collections/{self.collection}"
+        if self._request('GET', path).status_code == 404:
+            self._request('PUT', path, json={'vectors': {'size': self.dim, 'distance': 'Cosine'}})
+        self._ready = True
+
+    def vector_id(self, info_id):
+        """信息项在向量库中的ID（记录到UserInfo.vector_id）"""
+        return f"{self.collection}:{info_id}"
+
+    def upsert(self, user_id, ids, categories, vectors):
+        """写入一批向量（同一用户）"""
+        self.ensure_collection()
+        points = [{
+            'id': int(info_id),
+            'vector': vector.tolist(),
+            'payload': {'user_id': user_id, 'category': category}
+        } for info_id, category, vector in zip(ids, categories, vectors)]
+        self._request('PUT', f"/collections/{self.collection}/points?wait=true", json={'points': points})
+
+    def delete(self, ids):
+        """删除一批向量（不存在的ID忽略）"""
+        self.ensure_collection()
+        self._request(
+            'POST', f"/collections/{self.collection}/points/delete?wait=true",
+            json={'points': [int(info_id) for info_id in ids]}
+        )
+
+    def search(self, user_id, vector, limit, category=None):
+        """检索用户的向量，返回[(信息项ID, 相似度)]"""
+        self.ensure_collection()
+        conditions = [{'key': 'user_id', 'match': {'value': user_id}}]
+        if category:
+            conditions.append({'key': 'category', 'match': {'value': category}})
+        response = self._request('POST', f"/collections/{self.collection}/points/search", json={
+            'vector': vector.tolist(),
+            'limit': limit,
+            'filter': {'must': conditions},
+            'with_payload': False
+        })
+        return [(int(hit['id']), float(hit['score'])) for hit in response.json().get('result', [])]
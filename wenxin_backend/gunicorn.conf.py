@@ -0,0 +1,62 @@
+"""
+gunicorn配置：对话请求的大部分时间在等待模型返回，按工作模式设置并发和数据库连接池
+
+WEB_WORKER_CLASS 选择工作模式：
+    gthread（默认）：每个进程WEB_THREADS个线程，等待模型时占用一个线程
+    gevent：只设置了WEB_WORKER_CONNECTIONS和连接池大小，gevent不在依赖中，这种模式未经测试
+进程数默认等于CPU核数（WEB_WORKERS），数据库连接池按每个进程的并发数设置（DB_POOL_SIZE可覆盖）
+收到SIGTERM后停止接收新请求，在graceful_timeout内等待进行中的请求（含模型调用）完成
+"""
+import os
+import multiprocessing
+
+worker_class = os.getenv('WEB_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count()))
+bind = os.getenv('WEB_BIND', '0.0.0.0:5000')
+
+if worker_class == 'gevent':
+    worker_connections = int(os.getenv('WEB_WORKER_CONNECTIONS', 500))
+    # 协程数远多于连接数：大部分请求在等待模型，查询数据库的时间很短，超出的请求排队等待连接
+    os.environ.setdefault('DB_POOL_SIZE', str(min(worker_connections, 20)))
+    os.environ.setdefault('DB_MAX_OVERFLOW', '10')
+else:
+    threads = int(os.getenv('WEB_THREADS', 32))
+    # 每个线程同一时间最多使用一个连接
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+    os.environ.setdefault('DB_MAX_OVERFLOW', '0')
+
+# 模型调用最长LLM_TIMEOUT秒，退出时留足时间让进行中的请求完成
+llm_timeout = float(os.getenv('LLM_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', llm_timeout + 15))
+timeout = int(os.getenv('WEB_TIMEOUT', max(120, graceful_timeout)))
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+
+# 定期重启工作进程，避免长期运行的内存增长
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 0))
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+
+def on_starting(server):
+    per_worker = int(os.environ['DB_POOL_SIZE']) + int(os.environ['DB_MAX_OVERFLOW'])
+    server.log.info(
+        f"工作模式 {worker_class}，{workers} 个进程，"
+        f"数据库连接最多 {workers} x {per_worker} = {workers * per_worker} 个（需小于数据库的max_connections）"
+    )
+
+def post_worker_init(worker):
+    """工作进程加载应用后启动后台工作（flask命令行等其他进程不会启动）"""
+    flask_app = getattr(worker, 'wsgi', None)
+    if flask_app is None or not hasattr(flask_app, 'extensions'):
+        return
+    from app.utils.lifecycle import start_background
+    start_background(flask_app)
+
+def worker_exit(server, worker):
+    """工作进程退出前停止后台线程，等待其中进行中的模型调用完成"""
+    flask_app = getattr(worker, 'wsgi', None)
+    if flask_app is None or not hasattr(flask_app, 'extensions'):
+        return
+    from app.utils.lifecycle import drain
+    drain(flask_app, timeout=graceful_timeout)
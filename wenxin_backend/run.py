@@ -1,6 +1,8 @@
 from app import create_app
+from app.utils.lifecycle import start_background
 
 app = create_app()
 
 if __name__ == '__main__':
+    start_background(app)
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
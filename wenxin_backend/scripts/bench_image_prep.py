@@ -0,0 +1,92 @@
+"""
+OCR图片预处理基准：对比发送原图和预处理后图片的字节数与耗时
+
+用法（在wenxin_backend目录下）：
+    python scripts/bench_image_prep.py uploads/
+    python scripts/bench_image_prep.py uploads/ --mbps 5
+    python scripts/bench_image_prep.py uploads/ --live   # 实际调用OCR模型，需要配置DASHSCOPE_API_KEY
+"""
+import os
+import sys
+import time
+import base64
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URI', 'sqlite://')
+os.environ.setdefault('SEARCH_INDEXER_ENABLED', 'false')
+
+from flask import current_app
+from app import create_app
+from app.utils.image_prep import IMAGE_MIME_TYPES, prepare_image_for_ocr
+from app.utils.llm_client import get_llm_client
+
+def payload_size(data):
+    """data URL（base64）实际发送的字节数"""
+    return len(base64.b64encode(data))
+
+def ocr_latency(data, mime_type):
+    """调用一次OCR模型，返回耗时（秒）"""
+    image_url = f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+    messages = [{
+        'role': 'user',
+        'content': [
+            {'type': 'image_url', 'image_url': {'url': image_url}},
+            {'type': 'text', 'text': '请识别图片中的文字'}
+        ]
+    }]
+    start = time.perf_counter()
+    get_llm_client().chat(messages, model=current_app.config.get('LLM_OCR_MODEL', 'qwen-vl-ocr'))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folder', help='图片目录')
+    parser.add_argument('--mbps', type=float, default=10.0, help='估算上传耗时所用的上行带宽（Mbit/s）')
+    parser.add_argument('--live', action='store_true', help='实际调用OCR模型测量端到端耗时')
+    args = parser.parse_args()
+
+    app = create_app()
+    # 预处理结果写入临时目录，测量的是首次（未命中缓存）处理的耗时
+    app.config['OCR_DERIVED_FOLDER'] = tempfile.mkdtemp(prefix='ocr-derived-')
+
+    files = sorted(
+        f for f in os.listdir(args.folder)
+        if f.rsplit('.', 1)[-1].lower() in IMAGE_MIME_TYPES
+    )
+    totals = {'before': 0, 'after': 0, 'prep': 0.0, 'ocr_before': 0.0, 'ocr_after': 0.0}
+    print(f"{'文件':<48} {'原图字节':>10} {'预处理后':>10} {'预处理ms':>9} {'上传ms(前/后)':>16}")
+    with app.app_context():
+        for name in files:
+            path = os.path.join(args.folder, name)
+            with open(path, 'rb') as f:
+                original = f.read()
+            start = time.perf_counter()
+            prepared, mime_type = prepare_image_for_ocr(path, original, digest=f"bench-{name}")
+            prep = time.perf_counter() - start
+
+            before, after = payload_size(original), payload_size(prepared)
+            upload_before = before * 8 / (args.mbps * 1e6)
+            upload_after = after * 8 / (args.mbps * 1e6)
+            totals['before'] += before
+            totals['after'] += after
+            totals['prep'] += prep
+            print(f"{name:<48} {before:>10} {after:>10} {prep * 1000:>9.1f} "
+                  f"{upload_before * 1000:>7.0f}/{upload_after * 1000:<7.0f}")
+
+            if args.live:
+                original_mime = IMAGE_MIME_TYPES[name.rsplit('.', 1)[-1].lower()]
+                totals['ocr_before'] += ocr_latency(original, original_mime)
+                totals['ocr_after'] += ocr_latency(prepared, mime_type)
+
+    if not files:
+        print('目录中没有图片')
+        return
+    print(f"合计发送字节 {totals['before']} -> {totals['after']} "
+          f"（减少{(1 - totals['after'] / totals['before']) * 100:.0f}%），预处理共{totals['prep'] * 1000:.0f}ms")
+    if args.live:
+        print(f"OCR平均耗时 {totals['ocr_before'] / len(files):.2f}s -> {totals['ocr_after'] / len(files):.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+检索索引基准：构造单个用户的大量信息项，测量建索引、压缩保存（含IVF训练）和查询耗时
+
+用法（在wenxin_backend目录下）：
+    python scripts/bench_search.py
+    python scripts/bench_search.py --items 200000 --queries 500
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.search_index import SearchService, UserSearchIndex, info_text
+from app.utils.tokenizer import search_terms
+
+WORDS = [
+    '项目', '周会', '预算', '报销', '会议室', '打车', '午饭', '合同', '客户', '需求', '评审', '上线',
+    '发票', '差旅', '培训', '招聘', '季度', '目标', '复盘', '接口', '登录', 'token', 'Q3', 'README'
+]
+CATEGORIES = ['temporary', 'meeting', 'work', 'finance']
+
+def make_items(count, seed=42):
+    """生成随机的(标题, 描述, 分类)"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        title = ''.join(rng.choice(WORDS) for _ in range(rng.randint(2, 4)))
+        description = '，'.join(''.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))) for _ in range(3))
+        yield title, description, rng.choice(CATEGORIES)
+
+def time_queries(service, index, queries, mode, category=None):
+    """返回查询耗时的(p50, p99)，单位毫秒"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        vector = service.embedder.embed([query])[0]
+        index.search(search_terms(query), vector, 20, category, mode, service.nprobe)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=100000, help='信息项条数')
+    parser.add_argument('--queries', type=int, default=200, help='查询次数')
+    parser.add_argument('--dim', type=int, default=256, help='向量维度')
+    args = parser.parse_args()
+
+    service = SearchService(tempfile.mkdtemp(prefix='search-bench-'), dim=args.dim, ivf_min_items=20000)
+    index = UserSearchIndex(args.dim)
+
+    start = time.perf_counter()
+    batch = []
+    for info_id, (title, description, category) in enumerate(make_items(args.items), start=1):
+        batch.append((info_id, category, info_text(title, description)))
+        if len(batch) == 1000:
+            texts = [text for _, _, text in batch]
+            index.add([b[0] for b in batch], [b[1] for b in batch], texts, service.embedder.embed(texts))
+            batch = []
+    if batch:
+        texts = [text for _, _, text in batch]
+        index.add([b[0] for b in batch], [b[1] for b in batch], texts, service.embedder.embed(texts))
+    print(f"建索引 {args.items}条：{time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(7)
+    queries = [''.join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) for _ in range(args.queries)]
+    for mode in ('bm25', 'vector', 'hybrid'):
+        p50, p99 = time_queries(service, index, queries, mode)
+        print(f"未压缩 {mode:<7} p50 {p50:6.2f}ms  p99 {p99:6.2f}ms")
+
+    start = time.perf_counter()
+    service.save(1, index)
+    print(f"压缩保存（IVF {'启用' if index.vectors.centroids is not None else '未启用'}）：{time.perf_counter() - start:.1f}s")
+    for mode in ('bm25', 'vector', 'hybrid'):
+        p50, p99 = time_queries(service, index, queries, mode)
+        print(f"已压缩 {mode:<7} p50 {p50:6.2f}ms  p99 {p99:6.2f}ms")
+    p50, p99 = time_queries(service, index, queries, 'hybrid', category='meeting')
+    print(f"已压缩 hybrid+分类 p50 {p50:6.2f}ms  p99 {p99:6.2f}ms")
+
+    start = time.perf_counter()
+    service._indexes.clear()
+    loaded = service.load(1)
+    print(f"从磁盘加载：{(time.perf_counter() - start) * 1000:.0f}ms，{len(loaded)}条")
+
+if __name__ == '__main__':
+    main()
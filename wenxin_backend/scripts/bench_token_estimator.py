@@ -0,0 +1,73 @@
+"""
+token估算方法的微基准：比较原逐字符估算、正则估算和真实分词器（可选）的速度与准确度
+
+用法（在wenxin_backend目录下）：
+    python scripts/bench_token_estimator.py
+    python scripts/bench_token_estimator.py --tokenizer /path/to/qwen/tokenizer.json
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.tokenizer import fast_estimate, load_tokenizer
+
+SAMPLES = [
+    "明天下午三点在三楼会议室开项目周会，讨论Q3预算和人员安排。",
+    "Reminder: submit the expense report for the Shanghai trip before Friday.",
+    "午饭 32.5 元，打车 46 元，咖啡 18 元，合计 96.5 元。",
+    "你好，我是问心智能体，有什么可以帮你？",
+    "TODO: 修复登录接口的 token 过期问题 & 更新 README 文档",
+]
+
+def legacy_estimate(text):
+    """原实现：逐字符判断是否为汉字"""
+    chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
+    english_words = len(text.split())
+    return chinese_chars + english_words
+
+def make_corpus(count, seed=42):
+    """生成长短不一的测试消息"""
+    rng = random.Random(seed)
+    return [''.join(rng.choice(SAMPLES) for _ in range(rng.randint(1, 20))) for _ in range(count)]
+
+def bench(name, func, corpus, repeat=5):
+    """返回最快一轮的耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(corpus)
+        best = min(best, time.perf_counter() - start)
+    chars = sum(len(text) for text in corpus)
+    print(f"{name:<20} {best * 1000:9.2f} ms  {chars / best / 1e6:8.2f} M字符/秒")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20000, help='测试消息条数')
+    parser.add_argument('--tokenizer', help='Qwen tokenizer.json路径（需安装tokenizers）')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.messages)
+    legacy = [legacy_estimate(text) for text in corpus]
+    fast = [fast_estimate(text) for text in corpus]
+    assert legacy == fast, '正则估算结果与原实现不一致'
+
+    print(f"{args.messages}条消息，共{sum(len(t) for t in corpus)}字符")
+    base = bench('原逐字符估算', lambda texts: [legacy_estimate(t) for t in texts], corpus)
+    best = bench('正则估算', lambda texts: [fast_estimate(t) for t in texts], corpus)
+    print(f"正则估算加速 {base / best:.1f}x，结果与原实现一致")
+
+    tokenizer = load_tokenizer(args.tokenizer) if args.tokenizer else None
+    if tokenizer is None:
+        return
+    bench('真实分词器(批量)', lambda texts: tokenizer.encode_batch(texts, add_special_tokens=False), corpus)
+    actual = [len(e.ids) for e in tokenizer.encode_batch(corpus, add_special_tokens=False)]
+    error = sum(abs(a - b) / max(b, 1) for a, b in zip(fast, actual)) / len(actual)
+    print(f"估算方法相对真实token数的平均误差 {error * 100:.1f}%")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+对话接口压测：多个并发客户端持续发送消息，统计吞吐、延迟和每核可承载的并发对话数
+
+先用模拟模型（每次调用固定延迟）启动服务，例如：
+    LLM_BACKEND=fake LLM_FAKE_LATENCY=2 gunicorn -c gunicorn.conf.py wsgi:app
+再运行（在wenxin_backend目录下）：
+    python scripts/load_test.py --url http://127.0.0.1:5000 --concurrency 200 --duration 30
+    python scripts/load_test.py --concurrency 50,100,200,400 --duration 20 --cores 4
+
+每个客户端使用自己的对话，循环发送消息直到时间结束
+按Little定律，实际并发 = 吞吐 x 平均延迟；实际并发接近设定并发、且p50接近模拟延迟时，服务端没有成为瓶颈
+逐步增大并发，p50明显高于模拟延迟或出现错误前的最大实际并发除以核数，即每核可承载的并发对话数
+"""
+import os
+import time
+import uuid
+import argparse
+import threading
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+MESSAGES = ['你好', '明天下午3点开项目周会', '帮我记一下午饭花了35元', '周五前提交季度报告', '今天有什么安排']
+
+def login(url):
+    """注册一个压测用户并登录，返回请求头"""
+    name = f"load_{uuid.uuid4().hex[:8]}"
+    requests.post(f"{url}/api/auth/register", json={
+        'username': name, 'password': name, 'email': f"{name}@example.com"
+    }, timeout=30).raise_for_status()
+    response = requests.post(f"{url}/api/auth/login", json={'username': name, 'password': name}, timeout=30)
+    response.raise_for_status()
+    return {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+def make_session(size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def run_level(url, headers, concurrency, duration, stream, timeout):
+    """以concurrency个客户端压测duration秒，返回(延迟列表, 错误数, 实际耗时)"""
+    session = make_session(concurrency)
+    conversations = [
+        session.post(f"{url}/api/conversation", headers=headers, timeout=timeout).json()['conversation_id']
+        for _ in range(concurrency)
+    ]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def client(index):
+        conversation_id = conversations[index]
+        start_barrier.wait()
+        sent = 0
+        while time.perf_counter() < deadline[0]:
+            message = MESSAGES[(index + sent) % len(MESSAGES)]
+            sent += 1
+            started = time.perf_counter()
+            try:
+                response = session.post(
+                    f"{url}/api/conversation/{conversation_id}/message",
+                    params={'stream': '1'} if stream else None,
+                    json={'content': message},
+                    headers=headers,
+                    timeout=timeout,
+                    stream=stream
+                )
+                if stream:
+                    for _ in response.iter_content(chunk_size=None):
+                        pass
+                ok = response.status_code in (200, 201)
+                response.close()
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='服务地址')
+    parser.add_argument('--concurrency', default='50', help='并发客户端数，逗号分隔时依次压测多个并发级别')
+    parser.add_argument('--duration', type=float, default=30, help='每个并发级别的持续时间（秒）')
+    parser.add_argument('--cores', type=int, default=os.cpu_count(), help='服务端CPU核数（计算每核并发）')
+    parser.add_argument('--stream', action='store_true', help='使用流式接口（读完整个响应）')
+    parser.add_argument('--timeout', type=float, default=120, help='单个请求超时（秒）')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    headers = login(url)
+    print(f"{'并发':>6} {'完成':>8} {'错误':>6} {'吞吐/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'实际并发':>8} {'每核并发':>8}")
+    for concurrency in [int(level) for level in args.concurrency.split(',')]:
+        latencies, errors, elapsed = run_level(url, headers, concurrency, args.duration, args.stream, args.timeout)
+        if not latencies:
+            print(f"{concurrency:>6} {0:>8} {errors:>6}  全部请求失败")
+            continue
+        throughput = len(latencies) / elapsed
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        in_flight = throughput * float(np.mean(latencies))
+        print(
+            f"{concurrency:>6} {len(latencies):>8} {errors:>6} {throughput:>8.1f} "
+            f"{p50:>7.2f}s {p95:>7.2f}s {p99:>7.2f}s {in_flight:>8.1f} {in_flight / args.cores:>8.1f}"
+        )
+
+if __name__ == '__main__':
+    main()
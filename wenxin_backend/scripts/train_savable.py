@@ -0,0 +1,89 @@
+"""
+训练可保存信息分类器：在本地哈希特征上训练逻辑回归，保存为.npz供SAVABLE_MODEL_PATH加载
+
+训练数据为JSONL，每行 {"text": "消息内容", "savable": true/false}
+用法（在wenxin_backend目录下）：
+    python scripts/train_savable.py data/savable.jsonl -o savable_model.npz
+    python scripts/train_savable.py data/savable.jsonl -o savable_model.npz --dim 512 --epochs 300
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.embedding import HashingEmbedder
+
+def load_samples(path):
+    texts, labels = [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            sample = json.loads(line)
+            texts.append(sample['text'])
+            labels.append(1.0 if sample['savable'] else 0.0)
+    return texts, np.array(labels, dtype=np.float32)
+
+def train(features, labels, epochs, learning_rate, l2):
+    """批量梯度下降训练带L2正则的逻辑回归，返回(weights, bias)"""
+    weights = np.zeros(features.shape[1], dtype=np.float32)
+    bias = 0.0
+    for _ in range(epochs):
+        probabilities = 1.0 / (1.0 + np.exp(-(features @ weights + bias)))
+        error = probabilities - labels
+        weights -= learning_rate * (features.T @ error / len(labels) + l2 * weights)
+        bias -= learning_rate * float(error.mean())
+    return weights, bias
+
+def best_threshold(probabilities, labels):
+    """在验证集上选取F1最高的阈值（F1相同时取最接近0.5的）"""
+    best, best_f1 = 0.5, -1.0
+    for threshold in np.linspace(0.1, 0.9, 17):
+        predicted = probabilities >= threshold
+        tp = float((predicted & (labels == 1)).sum())
+        precision = tp / max(predicted.sum(), 1)
+        recall = tp / max((labels == 1).sum(), 1)
+        f1 = 2 * precision * recall / max(precision + recall, 1e-9)
+        if f1 > best_f1 + 1e-9 or (abs(f1 - best_f1) <= 1e-9 and abs(threshold - 0.5) < abs(best - 0.5)):
+            best, best_f1 = float(threshold), f1
+    return best, best_f1
+
+def main():
+    parser = argparse.ArgumentParser(description='训练可保存信息分类器')
+    parser.add_argument('data', help='训练数据（JSONL）')
+    parser.add_argument('-o', '--output', default='savable_model.npz', help='模型输出路径')
+    parser.add_argument('--dim', type=int, default=256, help='哈希特征维度')
+    parser.add_argument('--epochs', type=int, default=200)
+    parser.add_argument('--lr', type=float, default=2.0, help='学习率')
+    parser.add_argument('--l2', type=float, default=1e-4, help='L2正则系数')
+    parser.add_argument('--holdout', type=float, default=0.2, help='留作验证集的比例（用于选择阈值）')
+    args = parser.parse_args()
+
+    texts, labels = load_samples(args.data)
+    features = HashingEmbedder(args.dim).embed(texts)
+    order = np.random.default_rng(42).permutation(len(texts))
+    split = int(len(order) * (1 - args.holdout))
+    train_rows, holdout_rows = order[:split], order[split:]
+    print(f"样本 {len(texts)} 条（可保存 {int(labels.sum())} 条），训练 {len(train_rows)} 条，验证 {len(holdout_rows)} 条")
+
+    start = time.perf_counter()
+    weights, bias = train(features[train_rows], labels[train_rows], args.epochs, args.lr, args.l2)
+    print(f"训练耗时 {time.perf_counter() - start:.2f}s")
+
+    threshold = 0.5
+    if len(holdout_rows):
+        probabilities = 1.0 / (1.0 + np.exp(-(features[holdout_rows] @ weights + bias)))
+        threshold, f1 = best_threshold(probabilities, labels[holdout_rows])
+        print(f"验证集最佳阈值 {threshold:.2f}，F1 {f1:.3f}")
+
+    np.savez(args.output, weights=weights, bias=np.float32(bias), threshold=np.float32(threshold))
+    print(f"模型已保存到 {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+测试使用本地模拟模型和每个测试单独的SQLite数据库，不需要网络和MySQL
+运行（在wenxin_backend目录下）：python -m pytest
+"""
+import os
+import uuid
+import pytest
+
+# 配置类在导入时读取环境变量，必须在导入app之前设置
+os.environ['LLM_BACKEND'] = 'fake'
+os.environ.setdefault('SECRET_KEY', uuid.uuid4().hex * 2)
+os.environ.setdefault('DATABASE_URI', 'sqlite://')
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.utils.lifecycle import drain
+
+@pytest.fixture
+def app_config():
+    """测试模块可覆盖此fixture，返回创建应用前要修改的配置项"""
+    return {}
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_config):
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'SEARCH_INDEX_PATH': str(tmp_path / 'search_index'),
+        'JOB_QUEUE_PATH': str(tmp_path / 'jobs.sqlite3'),
+        'LLM_CACHE_PATH': None,
+        'SEARCH_INDEXER_ENABLED': False,
+        'METRICS_ENABLED': False,
+    }
+    settings.update(app_config)
+    for key, value in settings.items():
+        monkeypatch.setattr(Config, key, value, raising=False)
+
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+    yield app
+    drain(app, timeout=5.0)
+    with app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def register_user(client):
+    """注册并登录一个新用户，返回请求头"""
+    name = f"user_{uuid.uuid4().hex[:8]}"
+    client.post('/api/auth/register', json={'username': name, 'password': name, 'email': f"{name}@example.com"})
+    response = client.post('/api/auth/login', json={'username': name, 'password': name})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+@pytest.fixture
+def auth_headers(client):
+    return register_user(client)
+
+@pytest.fixture
+def conversation_id(client, auth_headers):
+    return client.post('/api/conversation', headers=auth_headers).get_json()['conversation_id']
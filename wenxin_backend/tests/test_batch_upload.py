@@ -0,0 +1,125 @@
+import io
+import os
+import threading
+import time
+import pytest
+from app.extensions import db
+from app.models.user_info import UploadQuota, UserInfo
+from app.utils.upload_stream import MemoryBudget, StreamedUpload, UploadRequest
+
+def png(payload):
+    return b'\x89PNG\r\n\x1a\n' + payload
+
+@pytest.fixture
+def app_config():
+    return {'BATCH_UPLOAD_CONCURRENCY': 2, 'BATCH_UPLOAD_MAX_ITEMS': 5}
+
+@pytest.fixture
+def model_calls(app, monkeypatch):
+    """记录模拟后端的调用次数和最大并发数"""
+    backend = app.extensions['llm_client'].backend
+    chat = backend.chat
+    state = {'calls': [], 'active': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def counting_chat(model, messages, timeout, **params):
+        with lock:
+            state['calls'].append(model)
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        try:
+            time.sleep(0.05)
+            return chat(model, messages, timeout, **params)
+        finally:
+            with lock:
+                state['active'] -= 1
+
+    monkeypatch.setattr(backend, 'chat', counting_chat)
+    return state
+
+def upload_batch(client, headers, conversation_id, files=(), texts=()):
+    data = {
+        'conversation_id': str(conversation_id),
+        'files': [(io.BytesIO(payload), name) for payload, name in files],
+        'texts': list(texts)
+    }
+    return client.post('/api/process/upload/batch', headers=headers, data=data, content_type='multipart/form-data')
+
+def stored_files(app):
+    folder = app.config['UPLOAD_FOLDER']
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name for name in os.listdir(folder) if os.path.isfile(os.path.join(folder, name)))
+
+def test_batch_fans_out_and_deduplicates(app, client, auth_headers, conversation_id, model_calls):
+    files = [(png(b'a' * 32), 'a.png'), (png(b'a' * 32), 'copy.png'), (png(b'b' * 32), 'b.png')]
+    response = upload_batch(client, auth_headers, conversation_id, files, ['第一段', '第二段'])
+    assert response.status_code == 201
+    results = response.get_json()['results']
+    assert [(r['index'], r['type'], r['name'], r['status']) for r in results] == [
+        (0, 'image', 'a.png', 'ok'),
+        (1, 'image', 'copy.png', 'ok'),
+        (2, 'image', 'b.png', 'ok'),
+        (3, 'text', None, 'ok'),
+        (4, 'text', None, 'ok'),
+    ]
+    # 相同内容的文件只调用一次模型，调用并发受BATCH_UPLOAD_CONCURRENCY限制
+    assert len(model_calls['calls']) == 4
+    assert model_calls['peak'] == 2
+    assert len(stored_files(app)) == 2
+    with app.app_context():
+        assert UserInfo.query.filter_by(conversation_id=conversation_id).count() == 5
+
+def test_batch_reuses_previous_image_results(client, auth_headers, conversation_id, model_calls):
+    files = [(png(b'a' * 32), 'a.png')]
+    assert upload_batch(client, auth_headers, conversation_id, files).status_code == 201
+    assert upload_batch(client, auth_headers, conversation_id, files).status_code == 201
+    assert len(model_calls['calls']) == 1
+
+def test_batch_item_limit(client, auth_headers, conversation_id, model_calls):
+    response = upload_batch(client, auth_headers, conversation_id, texts=[str(i) for i in range(6)])
+    assert response.status_code == 400
+    assert model_calls['calls'] == []
+
+def test_batch_reserves_quota_for_all_files(app, client, auth_headers, conversation_id, model_calls):
+    app.config['UPLOAD_QUOTA_BYTES'] = 100
+    files = [(png(b'a' * 60), 'a.png'), (png(b'b' * 60), 'b.png')]
+    response = upload_batch(client, auth_headers, conversation_id, files)
+    assert response.status_code == 413
+    assert stored_files(app) == []
+    assert model_calls['calls'] == []
+
+    response = upload_batch(client, auth_headers, conversation_id, files[:1])
+    assert response.status_code == 201
+    with app.app_context():
+        quota = db.session.get(UploadQuota, 1)
+        assert (quota.bytes_used, quota.file_count) == (68, 1)
+
+def test_body_larger_than_quota_is_rejected_before_parsing(app, client, auth_headers, conversation_id, monkeypatch):
+    app.config['UPLOAD_QUOTA_BYTES'] = 1024
+    opened = []
+    original = UploadRequest._get_file_stream
+
+    def tracking(self, *args, **kwargs):
+        opened.append(args)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(UploadRequest, '_get_file_stream', tracking)
+    payload = b'x' * (2 * 1024 * 1024)
+    response = upload_batch(client, auth_headers, conversation_id, [(payload, 'big.txt')])
+    assert response.status_code == 413
+    assert opened == []
+
+def test_memory_budget_is_shared_by_files(tmp_path):
+    budget = MemoryBudget(150)
+    uploads = [StreamedUpload(str(tmp_path), 'txt', 0, keep_bytes_limit=100, memory_budget=budget) for _ in range(3)]
+    for index, upload in enumerate(uploads):
+        upload.write(b'x' * 40)
+        upload.write(b'y' * 40)
+    kept = [upload.finalize(str(tmp_path / f"{index}.txt")) for index, upload in enumerate(uploads)]
+    # 前两个文件共占160字节超出额度：第二个文件在超出时改为从磁盘读取，并归还已占用的额度
+    assert kept[0] == b'x' * 40 + b'y' * 40
+    assert kept[1] is None
+    assert kept[2] is None
+    assert budget.remaining == 70
+    assert (tmp_path / '1.txt').read_bytes() == b'x' * 40 + b'y' * 40
@@ -0,0 +1,50 @@
+import io
+import os
+import pytest
+from PIL import Image
+from app.extensions import db
+from app.models.user_info import UploadBlob, UserInfo
+
+@pytest.fixture
+def jpeg_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), (200, 80, 40)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+def upload(client, headers, conversation_id, payload, filename):
+    return client.post(
+        '/api/process/upload',
+        headers=headers,
+        data={'conversation_id': str(conversation_id), 'file': (io.BytesIO(payload), filename)},
+        content_type='multipart/form-data'
+    )
+
+def stored_files(app):
+    """上传目录中的文件（不含OCR预处理缓存目录）"""
+    folder = app.config['UPLOAD_FOLDER']
+    return sorted(name for name in os.listdir(folder) if os.path.isfile(os.path.join(folder, name)))
+
+def test_same_content_is_stored_once(app, client, auth_headers, conversation_id, jpeg_bytes):
+    assert upload(client, auth_headers, conversation_id, jpeg_bytes, 'a.jpg').status_code == 201
+    assert upload(client, auth_headers, conversation_id, jpeg_bytes, 'b.jpg').status_code == 201
+    assert len(stored_files(app)) == 1
+
+def test_same_content_with_other_extension_leaves_no_orphan(app, client, auth_headers, conversation_id, jpeg_bytes):
+    assert upload(client, auth_headers, conversation_id, jpeg_bytes, 'photo.jpg').status_code == 201
+    assert upload(client, auth_headers, conversation_id, jpeg_bytes, 'photo.jpeg').status_code == 201
+
+    with app.app_context():
+        blob = UploadBlob.query.one()
+        contents = {info.content for info in UserInfo.query.all()}
+    assert contents == {blob.file_path}
+    assert stored_files(app) == [os.path.basename(blob.file_path)]
+
+def test_reupload_reuses_earlier_extraction(app, client, auth_headers, conversation_id, jpeg_bytes, monkeypatch):
+    assert upload(client, auth_headers, conversation_id, jpeg_bytes, 'first.jpg').status_code == 201
+
+    def unexpected_call(*args, **kwargs):
+        raise AssertionError('相同图片不应再次调用模型')
+    monkeypatch.setattr(app.extensions['llm_client'].backend, 'chat', unexpected_call)
+    response = upload(client, auth_headers, conversation_id, jpeg_bytes, 'again.jpeg')
+    assert response.status_code == 201
+    assert response.get_json()['info_items'][0]['title'] == '模拟信息项'
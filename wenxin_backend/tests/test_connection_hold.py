@@ -0,0 +1,77 @@
+"""调用模型期间不占用数据库连接：连接占用时间不随模拟模型延迟增长（scripts/connection_hold.py的并发版本用于压测）"""
+import time
+import threading
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+
+LATENCY = 0.5
+
+@pytest.fixture
+def app_config():
+    # 关闭预提取和结果缓存，保存指令每次都调用模型
+    return {'SPECULATIVE_EXTRACTION_ENABLED': False, 'LLM_CACHE_ENABLED': False}
+
+@pytest.fixture
+def holds(app):
+    """记录每次连接从取出到归还的时长（秒）"""
+    samples = []
+    lock = threading.Lock()
+    with app.app_context():
+        engine = db.engine
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+
+    def on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop('checked_out_at', None)
+        if started is not None:
+            with lock:
+                samples.append(time.perf_counter() - started)
+
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+    yield samples
+    event.remove(engine, 'checkout', on_checkout)
+    event.remove(engine, 'checkin', on_checkin)
+
+def send(client, headers, conversation_id, content, **options):
+    response = client.post(
+        f"/api/conversation/{conversation_id}/message",
+        json=dict(options, content=content),
+        headers=headers
+    )
+    assert response.status_code == 201
+
+def exercise(client, headers, conversation_id):
+    """覆盖生成回复、保存指令和上传文本三条调用模型的路径"""
+    send(client, headers, conversation_id, '明天下午3点开项目周会')
+    send(client, headers, conversation_id, '保存', no_cache=True)
+    response = client.post(
+        '/api/process/upload',
+        headers=headers,
+        data={'conversation_id': str(conversation_id), 'text': '本月房租3000元'},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 201
+
+def test_connection_hold_does_not_grow_with_model_latency(app, client, auth_headers, conversation_id, holds):
+    backend = app.extensions['llm_client'].backend
+
+    backend.latency = 0.0
+    exercise(client, auth_headers, conversation_id)
+    fast = list(holds)
+    holds.clear()
+
+    backend.latency = LATENCY
+    started = time.perf_counter()
+    exercise(client, auth_headers, conversation_id)
+    elapsed = time.perf_counter() - started
+    slow = list(holds)
+
+    # 确认模型调用确实发生在这些请求中
+    assert elapsed >= 3 * LATENCY
+    assert fast and slow
+    # 每次连接占用都远小于一次模型调用，总占用时间与无延迟时同一量级
+    assert max(slow) < LATENCY / 2
+    assert sum(slow) < sum(fast) + LATENCY / 2
@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta
+import pytest
+from app.extensions import db
+from app.models.user_info import UserInfo
+from app.utils import digest
+
+MONDAY = date(2026, 10, 12)
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    """替换摘要的模型调用，记录每次调用的已有摘要和信息项"""
+    calls = []
+
+    def summarize(previous, items, label):
+        calls.append(('day', previous, [item.split('] ', 1)[1] for item in items]))
+        return f"{label}摘要{len(calls)}"
+
+    def merge(summaries, label):
+        calls.append(('merge', None, summaries))
+        return f"{label}合并摘要"
+
+    monkeypatch.setattr(digest, 'summarize_info_items', summarize)
+    monkeypatch.setattr(digest, 'merge_digest_summaries', merge)
+    return calls
+
+def add_item(app, conversation_id, title, day, hour=9, category='work'):
+    with app.app_context():
+        created = datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+        info = UserInfo(user_id=1, conversation_id=conversation_id, info_type='text', content=title,
+                        category=category, title=title, description='', created_at=created, updated_at=created)
+        db.session.add(info)
+        db.session.commit()
+        return info.id
+
+def build(app, period='week', category=None, day=MONDAY):
+    with app.app_context():
+        return digest.build_digest(1, category, period, day)
+
+@pytest.fixture
+def week(app, auth_headers, conversation_id):
+    """周一两条、周三一条信息项"""
+    return [
+        add_item(app, conversation_id, '周会', MONDAY),
+        add_item(app, conversation_id, '写周报', MONDAY, hour=15),
+        add_item(app, conversation_id, '交房租', MONDAY + timedelta(days=2), category='finance'),
+    ]
+
+def test_unchanged_items_use_cache(app, week, model_calls):
+    result = build(app)
+    assert result['item_count'] == 3 and not result['cached']
+    assert [call[0] for call in model_calls] == ['day', 'day', 'merge']
+
+    model_calls.clear()
+    again = build(app)
+    assert again['cached'] and again['summary'] == result['summary']
+    assert model_calls == []
+
+def test_new_item_is_merged_into_cached_day(app, conversation_id, week, model_calls):
+    build(app)
+    model_calls.clear()
+    add_item(app, conversation_id, '约客户吃饭', MONDAY, hour=18)
+    result = build(app)
+    # 只把新增的信息项并入周一已有的摘要，周三直接使用缓存，再重新合并周摘要
+    assert model_calls[0] == ('day', '2026-10-12摘要1', ['约客户吃饭：'])
+    assert [call[0] for call in model_calls] == ['day', 'merge']
+    assert result['item_count'] == 4 and not result['cached']
+
+@pytest.mark.parametrize('change', ['edit', 'delete'])
+def test_changed_day_is_regenerated(app, week, model_calls, change):
+    build(app)
+    model_calls.clear()
+    with app.app_context():
+        info = db.session.get(UserInfo, week[0])
+        if change == 'edit':
+            info.title = '项目周会'
+        else:
+            db.session.delete(info)
+        db.session.commit()
+    build(app)
+    # 已并入摘要的信息项有变化：整天重新生成（不基于旧摘要）
+    expected = ['项目周会：', '写周报：'] if change == 'edit' else ['写周报：']
+    assert model_calls[0] == ('day', None, expected)
+    assert [call[0] for call in model_calls] == ['day', 'merge']
+
+def test_category_digests_are_cached_separately(app, week, model_calls):
+    finance = build(app, category='finance')
+    assert finance['item_count'] == 1
+    # 只有一天时不需要合并
+    assert [call[0] for call in model_calls] == ['day']
+    model_calls.clear()
+    assert not build(app)['cached']
+    assert build(app, category='finance')['cached']
+
+def test_failed_summary_is_not_cached(app, week, model_calls, monkeypatch):
+    monkeypatch.setattr(digest, 'summarize_info_items', lambda previous, items, label: None)
+    result = build(app, period='day')
+    assert result['summary'] == '周会：；写周报：'
+    assert not result['cached']
+    assert not build(app, period='day')['cached']
+
+def test_digest_endpoint(client, auth_headers, week, model_calls):
+    response = client.get('/api/generate/digest', headers=auth_headers,
+                          query_string={'period': 'week', 'date': '2026-10-14'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['start'], body['end'], body['item_count']) == ('2026-10-12', '2026-10-18', 3)
+    assert [d['date'] for d in body['days']] == ['2026-10-12', '2026-10-14']
+    assert client.get('/api/generate/digest', headers=auth_headers,
+                      query_string={'period': 'year'}).status_code == 400
+    assert client.get('/api/generate/digest', headers=auth_headers,
+                      query_string={'date': '2026/10/12'}).status_code == 400
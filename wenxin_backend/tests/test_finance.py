@@ -0,0 +1,110 @@
+import io
+import json
+from datetime import date
+from decimal import Decimal
+import pytest
+from app.extensions import db
+from app.models.user_info import FinanceRecord, UserInfo
+from app.utils import info_store
+from app.utils.finance import finance_fields
+
+# 每段文本对应的模型提取结果
+EXTRACTED = {
+    '午饭': [{'title': '午饭', 'description': '和同事吃午饭花了¥58.5', 'category': 'finance',
+              'counterparty': '面馆', 'date': '2026-10-12'}],
+    '工资': [{'title': '十月工资', 'description': '工资到账', 'category': 'finance', 'amount': '12,000',
+              'direction': 'income', 'currency': '人民币', 'date': '2026-10-15', 'counterparty': '公司'}],
+    '房租': [{'title': '房租', 'description': '交房租3000元', 'category': 'finance', 'date': '2026-11-01'},
+             {'title': '看房', 'description': '周六去看房', 'category': 'temporary'}],
+    '咖啡': [{'title': '咖啡', 'description': '买咖啡20美元', 'category': 'finance', 'date': '2026-10-12',
+              'counterparty': '面馆'}],
+}
+
+@pytest.fixture(autouse=True)
+def fake_extraction(monkeypatch):
+    def extract(text, use_cache=True):
+        return json.loads(json.dumps(EXTRACTED[text]))
+    monkeypatch.setattr(info_store, 'process_text_with_ai', extract)
+    monkeypatch.setattr('app.routes.process.extract_text_items', extract)
+
+def upload_batch(client, headers, conversation_id, texts):
+    return client.post('/api/process/upload/batch', headers=headers,
+                       data={'conversation_id': str(conversation_id), 'texts': texts},
+                       content_type='multipart/form-data')
+
+def finance(client, headers, **params):
+    response = client.get('/api/info/finance', headers=headers, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()['groups']
+
+@pytest.mark.parametrize('item, expected', [
+    ({'category': 'finance', 'amount': 99}, (Decimal('99.00'), 'CNY', 'expense')),
+    ({'category': 'finance', 'amount': '-1,200.5', 'currency': 'usd'}, (Decimal('1200.50'), 'USD', 'expense')),
+    ({'category': 'finance', 'description': '奖金到账3.5万元'}, (Decimal('35000.00'), 'CNY', 'income')),
+    ({'category': 'finance', 'description': '打车€12'}, (Decimal('12.00'), 'EUR', 'expense')),
+])
+def test_finance_fields(app, item, expected):
+    with app.app_context():
+        record = finance_fields(item, date(2026, 10, 18))
+    assert (record['amount'], record['currency'], record['direction']) == expected
+    assert record['occurred_on'] == date(2026, 10, 18)
+
+@pytest.mark.parametrize('item', [
+    {'category': 'work', 'amount': 100},
+    {'category': 'finance', 'description': '这个月要省钱'},
+])
+def test_items_without_amount_have_no_record(app, item):
+    with app.app_context():
+        assert finance_fields(item, date(2026, 10, 18)) is None
+
+def test_batch_upload_writes_finance_records(app, client, auth_headers, conversation_id):
+    response = upload_batch(client, auth_headers, conversation_id, ['午饭', '工资', '房租'])
+    assert response.status_code == 201
+    with app.app_context():
+        records = db.session.query(FinanceRecord, UserInfo.title).join(
+            UserInfo, UserInfo.id == FinanceRecord.info_id
+        ).order_by(FinanceRecord.id).all()
+        assert [(title, record.amount, record.direction) for record, title in records] == [
+            ('午饭', Decimal('58.50'), 'expense'),
+            ('十月工资', Decimal('12000.00'), 'income'),
+            ('房租', Decimal('3000.00'), 'expense'),
+        ]
+        assert UserInfo.query.count() == 4
+
+def test_single_upload_writes_finance_record(app, client, auth_headers, conversation_id):
+    response = client.post('/api/process/upload', headers=auth_headers,
+                           data={'conversation_id': str(conversation_id), 'text': '午饭'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 201
+    info_id = response.get_json()['info_items'][0]['id']
+    with app.app_context():
+        assert FinanceRecord.query.filter_by(info_id=info_id).one().amount == Decimal('58.50')
+
+def test_finance_aggregation(client, auth_headers, conversation_id):
+    assert upload_batch(client, auth_headers, conversation_id, ['午饭', '工资', '房租', '咖啡']).status_code == 201
+
+    assert finance(client, auth_headers) == [
+        {'currency': 'CNY', 'direction': 'expense', 'amount': '3058.50', 'count': 2},
+        {'currency': 'CNY', 'direction': 'income', 'amount': '12000.00', 'count': 1},
+        {'currency': 'USD', 'direction': 'expense', 'amount': '20.00', 'count': 1},
+    ]
+    months = finance(client, auth_headers, group_by='month', direction='expense', currency='cny')
+    assert [(g['month'], g['amount']) for g in months] == [('2026-10', '58.50'), ('2026-11', '3000.00')]
+
+    days = finance(client, auth_headers, group_by='day', start='2026-10-12', end='2026-10-15')
+    assert [(g['date'], g['currency'], g['amount']) for g in days] == [
+        ('2026-10-12', 'CNY', '58.50'), ('2026-10-12', 'USD', '20.00'), ('2026-10-15', 'CNY', '12000.00')
+    ]
+
+    counterparties = finance(client, auth_headers, group_by='counterparty', currency='CNY')
+    assert [(g['counterparty'], g['amount']) for g in counterparties] == [
+        ('公司', '12000.00'), (None, '3000.00'), ('面馆', '58.50')
+    ]
+
+@pytest.mark.parametrize('params', [
+    {'group_by': 'year'},
+    {'direction': 'refund'},
+    {'start': '2026/10/01'},
+])
+def test_finance_parameters_are_validated(client, auth_headers, params):
+    assert client.get('/api/info/finance', headers=auth_headers, query_string=params).status_code == 400
@@ -0,0 +1,72 @@
+import io
+import os
+import pytest
+from app.utils.image_prep import derived_path, prepare_image_for_ocr
+
+Image = pytest.importorskip('PIL.Image')
+
+@pytest.fixture
+def app_config():
+    return {'OCR_MAX_SIDE': 400, 'OCR_JPEG_QUALITY': 80}
+
+def encode(image, format, **params):
+    output = io.BytesIO()
+    image.save(output, format=format, **params)
+    return output.getvalue()
+
+def noisy_image(size):
+    """带噪点的图片，重新编码后不会明显变小"""
+    return Image.effect_noise(size, 64).convert('RGB')
+
+def decode(data):
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        return image
+
+def test_large_image_is_downscaled(app, tmp_path):
+    data = encode(noisy_image((1200, 900)), 'PNG')
+    path = tmp_path / 'photo.png'
+    path.write_bytes(data)
+    with app.app_context():
+        result, mime_type = prepare_image_for_ocr(str(path))
+    assert mime_type == 'image/jpeg'
+    image = decode(result)
+    assert image.format == 'JPEG'
+    assert image.size == (400, 300)
+    assert len(result) < len(data)
+
+def test_exif_is_applied_and_stripped(app, tmp_path):
+    image = noisy_image((800, 400))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 需要顺时针旋转90度
+    data = encode(image, 'JPEG', exif=exif, quality=95)
+    with app.app_context():
+        result, _ = prepare_image_for_ocr(str(tmp_path / 'photo.jpg'), image_bytes=data)
+    image = decode(result)
+    assert image.size == (200, 400)
+    assert 0x0112 not in image.getexif()
+
+def test_small_image_is_sent_unchanged(app, tmp_path):
+    data = encode(Image.new('RGB', (40, 30), 'white'), 'PNG')
+    with app.app_context():
+        result, mime_type = prepare_image_for_ocr(str(tmp_path / 'note.png'), image_bytes=data)
+    assert (result, mime_type) == (data, 'image/png')
+
+def test_unreadable_image_falls_back_to_original(app, tmp_path):
+    with app.app_context():
+        result, mime_type = prepare_image_for_ocr(str(tmp_path / 'broken.gif'), image_bytes=b'not an image')
+    assert (result, mime_type) == (b'not an image', 'image/gif')
+
+def test_derived_image_is_cached_by_digest(app, tmp_path):
+    data = encode(noisy_image((1200, 900)), 'PNG')
+    with app.app_context():
+        first, _ = prepare_image_for_ocr(str(tmp_path / 'a.png'), image_bytes=data, digest='abc')
+        cached = derived_path('abc', 400)
+        assert os.path.exists(cached)
+        # 命中缓存时不再读取原图
+        second, mime_type = prepare_image_for_ocr(str(tmp_path / 'missing.png'), digest='abc')
+        assert (second, mime_type) == (first, 'image/jpeg')
+        # 目标尺寸变化后使用新的缓存文件
+        app.config['OCR_MAX_SIDE'] = 200
+        third, _ = prepare_image_for_ocr(str(tmp_path / 'a.png'), image_bytes=data, digest='abc')
+    assert decode(third).size == (200, 150)
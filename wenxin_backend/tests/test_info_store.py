@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+from app.models.user_info import UserInfo
+from app.utils.info_store import build_info_rows, insert_info_rows
+
+def make_rows(conversation_id, count, prefix='信息项'):
+    items = [{'title': f"{prefix}{i}", 'description': f"描述{i}", 'category': 'work'} for i in range(count)]
+    return build_info_rows(1, conversation_id, 'text', '原文', items)
+
+@pytest.fixture
+def insert_statements(app):
+    """记录执行的INSERT语句（每次executemany记一次）"""
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO user_infos'):
+                statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        yield statements
+        event.remove(engine, 'before_cursor_execute', record)
+
+@pytest.fixture(params=[True, False], ids=['returning', 'no-returning'])
+def returning(request, app, monkeypatch):
+    """分别在支持和不支持 INSERT ... RETURNING 的情况下运行（后者模拟MySQL）"""
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'insert_executemany_returning', request.param)
+    return request.param
+
+def test_ids_follow_row_order(app, conversation_id, returning, insert_statements):
+    with app.app_context():
+        # 先写入一些行，使新ID不从1开始
+        insert_info_rows(make_rows(conversation_id, 3, prefix='已有'))
+        db.session.commit()
+        insert_statements.clear()
+
+        rows = make_rows(conversation_id, 5)
+        ids = insert_info_rows(rows)
+        db.session.commit()
+        if not returning:
+            assert len(insert_statements) == 1
+        titles = dict(db.session.query(UserInfo.id, UserInfo.title).filter(UserInfo.id.in_(ids)).all())
+        assert [titles[info_id] for info_id in ids] == [row['title'] for row in rows]
+        assert ids == sorted(ids)
+
+def test_rows_without_ids(app, conversation_id, returning, insert_statements):
+    with app.app_context():
+        rows = make_rows(conversation_id, 4)
+        ids = insert_info_rows(rows, return_ids=False)
+        db.session.commit()
+        assert len(ids) == 4
+        assert len(insert_statements) == 1
+        assert UserInfo.query.filter_by(conversation_id=conversation_id).count() == 4
+
+def test_empty_rows(app):
+    with app.app_context():
+        assert insert_info_rows([]) == []
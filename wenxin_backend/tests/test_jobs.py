@@ -0,0 +1,89 @@
+import time
+import pytest
+from app.extensions import db
+from app.models.user_info import ProcessJob, UserInfo
+from app.utils.lifecycle import start_background
+
+def submit_text(client, headers, conversation_id, text='周五前提交季度报告'):
+    return client.post(
+        '/api/process/upload',
+        headers=headers,
+        data={'conversation_id': str(conversation_id), 'text': text, 'async': '1'},
+        content_type='multipart/form-data'
+    )
+
+def wait_for_status(client, headers, job_id, statuses=('done', 'failed'), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/process/jobs/{job_id}", headers=headers).get_json()
+        if job['status'] in statuses or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+def hold_workers(monkeypatch, runner):
+    """提交任务时不启动工作线程，任务留在队列中"""
+    monkeypatch.setattr(runner, 'start', lambda: None)
+
+def test_create_app_does_not_start_workers(app):
+    assert app.extensions['job_runner']._threads == []
+
+def test_job_moves_from_pending_to_done(app, client, auth_headers, conversation_id):
+    response = submit_text(client, auth_headers, conversation_id)
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['status'] == 'pending'
+
+    job = wait_for_status(client, auth_headers, body['job_id'])
+    assert job['status'] == 'done'
+    assert job['error'] is None
+    assert [item['title'] for item in job['info_items']] == ['模拟信息项']
+    with app.app_context():
+        assert UserInfo.query.filter_by(conversation_id=conversation_id).count() == 1
+
+def test_failed_job_records_error(app, client, auth_headers, conversation_id, monkeypatch):
+    def broken_save(*args, **kwargs):
+        raise RuntimeError('写入失败')
+    monkeypatch.setattr('app.utils.jobs.save_info_items', broken_save)
+
+    job_id = submit_text(client, auth_headers, conversation_id).get_json()['job_id']
+    job = wait_for_status(client, auth_headers, job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == '写入失败'
+    with app.app_context():
+        assert UserInfo.query.count() == 0
+
+@pytest.mark.parametrize('app_config', [{'JOB_QUEUE_SIZE': 1}])
+def test_full_queue_rejects_and_marks_job_failed(app, client, auth_headers, conversation_id, monkeypatch):
+    hold_workers(monkeypatch, app.extensions['job_runner'])
+    assert submit_text(client, auth_headers, conversation_id).status_code == 202
+
+    response = submit_text(client, auth_headers, conversation_id)
+    assert response.status_code == 503
+    with app.app_context():
+        statuses = sorted(job.status for job in ProcessJob.query.all())
+        rejected = ProcessJob.query.filter_by(status='failed').one()
+    assert statuses == ['failed', 'pending']
+    assert rejected.error == '任务队列已满'
+
+@pytest.mark.parametrize('app_config', [{'JOB_QUEUE_BACKEND': 'sqlite'}])
+def test_sqlite_queue_jobs_run_when_server_starts(app, client, auth_headers, conversation_id, monkeypatch):
+    runner = app.extensions['job_runner']
+    hold_workers(monkeypatch, runner)
+    job_id = submit_text(client, auth_headers, conversation_id).get_json()['job_id']
+    assert runner.queue.qsize() == 1
+    assert wait_for_status(client, auth_headers, job_id, timeout=0.2)['status'] == 'pending'
+
+    monkeypatch.delattr(runner, 'start')
+    start_background(app)
+    assert wait_for_status(client, auth_headers, job_id)['status'] == 'done'
+    assert runner.queue.qsize() == 0
+
+def test_finished_job_is_not_run_again(app, client, auth_headers, conversation_id):
+    job_id = submit_text(client, auth_headers, conversation_id).get_json()['job_id']
+    assert wait_for_status(client, auth_headers, job_id)['status'] == 'done'
+
+    app.extensions['job_runner'].submit(job_id)
+    time.sleep(0.2)
+    with app.app_context():
+        assert UserInfo.query.count() == 1
+        assert db.session.get(ProcessJob, job_id).status == 'done'
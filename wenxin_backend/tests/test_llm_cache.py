@@ -0,0 +1,100 @@
+import time
+import pytest
+from app.utils.ai_process import process_text_with_ai
+from app.utils.llm_cache import ResponseCache, make_cache_key
+
+@pytest.fixture
+def model_calls(app, monkeypatch):
+    """记录模拟后端收到的调用"""
+    backend = app.extensions['llm_client'].backend
+    calls = []
+    chat = backend.chat
+
+    def counting_chat(model, messages, timeout, **params):
+        calls.append(messages)
+        return chat(model, messages, timeout, **params)
+
+    monkeypatch.setattr(backend, 'chat', counting_chat)
+    return calls
+
+def upload_text(client, headers, conversation_id, text, **options):
+    response = client.post(
+        '/api/process/upload',
+        headers=options.pop('request_headers', headers),
+        data=dict({'conversation_id': str(conversation_id), 'text': text}, **options),
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 201
+    return response
+
+def test_same_text_hits_cache(app, model_calls):
+    with app.app_context():
+        first = process_text_with_ai('明天下午3点开项目周会')
+        second = process_text_with_ai('明天下午3点开项目周会')
+    assert first == second
+    assert len(model_calls) == 1
+    assert app.extensions['llm_client'].cache.stats()['hits'] == 1
+
+def test_whitespace_only_difference_hits_cache(app, model_calls):
+    with app.app_context():
+        process_text_with_ai('明天 下午3点\n开项目周会')
+        process_text_with_ai('明天  下午3点 开项目周会')
+    assert len(model_calls) == 1
+
+def test_different_text_misses(app, model_calls):
+    with app.app_context():
+        process_text_with_ai('明天下午3点开项目周会')
+        process_text_with_ai('后天上午10点开项目周会')
+    assert len(model_calls) == 2
+
+def test_use_cache_false_bypasses(app, model_calls):
+    with app.app_context():
+        process_text_with_ai('明天下午3点开项目周会')
+        process_text_with_ai('明天下午3点开项目周会', use_cache=False)
+    assert len(model_calls) == 2
+
+def test_request_can_bypass_cache(client, auth_headers, conversation_id, model_calls):
+    upload_text(client, auth_headers, conversation_id, '本月房租3000元')
+    upload_text(client, auth_headers, conversation_id, '本月房租3000元')
+    assert len(model_calls) == 1
+    upload_text(client, auth_headers, conversation_id, '本月房租3000元', no_cache='1')
+    upload_text(
+        client, auth_headers, conversation_id, '本月房租3000元',
+        request_headers=dict(auth_headers, **{'Cache-Control': 'no-cache'})
+    )
+    assert len(model_calls) == 3
+
+def test_unparseable_result_is_not_cached(app, model_calls, monkeypatch):
+    backend = app.extensions['llm_client'].backend
+    replies = iter(['不是JSON', '[{"title": "周会", "description": "明天下午3点", "category": "meeting"}]'])
+    monkeypatch.setattr(backend, 'chat', lambda model, messages, timeout, **params: next(replies))
+    with app.app_context():
+        assert process_text_with_ai('明天下午3点开项目周会')[0]['title'] == '原始文本'
+        assert process_text_with_ai('明天下午3点开项目周会')[0]['title'] == '周会'
+
+def test_cache_key_depends_on_model_and_params():
+    messages = [{'role': 'user', 'content': '你好'}]
+    key = make_cache_key('qwen-plus', messages, {})
+    assert key == make_cache_key('qwen-plus', [{'role': 'user', 'content': ' 你好 '}], {})
+    assert key != make_cache_key('qwen-max', messages, {})
+    assert key != make_cache_key('qwen-plus', messages, {'temperature': 0.1})
+
+def test_entries_expire_and_lru_is_bounded():
+    cache = ResponseCache(max_entries=2, ttl=0.05)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    assert cache.get('a') == '1'
+    cache.set('c', '3')
+    # b最久未使用，被淘汰
+    assert cache.get('b') is None
+    time.sleep(0.06)
+    assert cache.get('a') is None
+
+def test_persistent_cache_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    ResponseCache(persistent_path=path).set('key', 'value')
+    other = ResponseCache(persistent_path=path)
+    assert other.get('key') == 'value'
+    assert other.stats()['persistent_hits'] == 1
+    other.delete('key')
+    assert ResponseCache(persistent_path=path).get('key') is None
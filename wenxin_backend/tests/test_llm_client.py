@@ -0,0 +1,114 @@
+import time
+import pytest
+from app.utils.llm_client import LLMClient, LLMError, LLMUnavailable, CircuitBreaker
+
+class ScriptedBackend:
+    """按顺序返回结果或抛出异常的后端，记录每次调用得到的剩余时间"""
+
+    def __init__(self, *outcomes, delay=0.0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.timeouts = []
+
+    def chat(self, model, messages, timeout, **params):
+        self.timeouts.append(timeout)
+        if self.delay:
+            time.sleep(self.delay)
+        outcome = self.outcomes.pop(0) if self.outcomes else 'ok'
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def make_client(backend, **options):
+    options.setdefault('backoff_base', 0.001)
+    options.setdefault('breaker', CircuitBreaker(threshold=3, cooldown=0.2))
+    return LLMClient(backend, **options)
+
+MESSAGES = [{'role': 'user', 'content': '你好'}]
+
+def chat(client, **options):
+    return client.chat(MESSAGES, model='test-model', **options)
+
+def test_transient_errors_are_retried():
+    backend = ScriptedBackend(LLMError('限流', transient=True), LLMError('超时', transient=True), 'ok')
+    assert chat(make_client(backend, max_retries=2)) == 'ok'
+    assert len(backend.timeouts) == 3
+
+def test_retries_stop_at_max_retries():
+    backend = ScriptedBackend(*[LLMError('服务端错误', transient=True)] * 5)
+    with pytest.raises(LLMError):
+        chat(make_client(backend, max_retries=1))
+    assert len(backend.timeouts) == 2
+
+def test_permanent_error_is_not_retried_and_not_counted():
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    backend = ScriptedBackend(LLMError('参数错误'))
+    with pytest.raises(LLMError):
+        chat(make_client(backend, breaker=breaker))
+    assert len(backend.timeouts) == 1
+    assert not breaker.is_open
+
+def test_each_attempt_gets_the_remaining_deadline():
+    backend = ScriptedBackend(LLMError('超时', transient=True), 'ok', delay=0.05)
+    client = make_client(backend, timeout=1.0, max_retries=3)
+    assert chat(client) == 'ok'
+    first, second = backend.timeouts
+    assert first <= 1.0
+    assert second <= first - 0.05
+
+def test_no_retry_past_the_deadline():
+    backend = ScriptedBackend(*[LLMError('超时', transient=True)] * 10, delay=0.06)
+    client = make_client(backend, timeout=0.1, max_retries=10, backoff_base=0.05)
+    started = time.monotonic()
+    with pytest.raises(LLMError):
+        chat(client)
+    assert time.monotonic() - started < 0.3
+    assert len(backend.timeouts) <= 2
+
+def test_breaker_opens_fails_fast_and_recovers_after_probe():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.1)
+    backend = ScriptedBackend(*[LLMError('服务端错误', transient=True)] * 2)
+    client = make_client(backend, max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            chat(client)
+    assert breaker.is_open
+
+    # 打开期间不调用后端
+    with pytest.raises(LLMUnavailable):
+        chat(client)
+    assert len(backend.timeouts) == 2
+
+    # 冷却后放行一次试探请求，成功后关闭
+    time.sleep(0.12)
+    assert chat(client) == 'ok'
+    assert not breaker.is_open
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    # 试探请求进行中，其他请求仍被拒绝
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+
+def test_stream_retries_only_before_first_chunk():
+    class StreamBackend:
+        calls = 0
+
+        def stream(self, model, messages, timeout, **params):
+            StreamBackend.calls += 1
+            if StreamBackend.calls == 1:
+                raise LLMError('连接失败', transient=True)
+            yield '第一段'
+            raise LLMError('中断', transient=True)
+
+    client = make_client(StreamBackend(), max_retries=2)
+    received = []
+    with pytest.raises(LLMError):
+        for delta in client.stream(MESSAGES, model='test-model'):
+            received.append(delta)
+    assert received == ['第一段']
+    assert StreamBackend.calls == 2
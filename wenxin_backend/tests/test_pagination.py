@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+import pytest
+from app.extensions import db
+from app.models.user_info import Conversation, UserInfo
+from app.utils.pagination import encode_cursor, decode_cursor
+
+BASE_TIME = datetime(2024, 5, 6, 9, 30)
+
+def fetch_all_pages(client, headers, url, limit, **filters):
+    """沿X-Next-Cursor翻页，返回每页的id列表"""
+    pages, cursor = [], None
+    while True:
+        params = dict(filters, limit=limit)
+        if cursor:
+            params['cursor'] = cursor
+        response = client.get(url, headers=headers, query_string=params)
+        assert response.status_code == 200
+        pages.append([row['id'] for row in response.get_json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return pages
+
+@pytest.fixture
+def user_id(app, conversation_id):
+    with app.app_context():
+        return db.session.get(Conversation, conversation_id).user_id
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(BASE_TIME, 42)) == (BASE_TIME, 42)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor('yesterday', 1), 'WzEsMiwzXQ'])
+def test_invalid_cursor_is_rejected(client, auth_headers, cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+    response = client.get('/api/conversation', headers=auth_headers, query_string={'cursor': cursor})
+    assert response.status_code == 400
+
+def test_conversation_pages_cover_ties_and_nulls_once(app, client, auth_headers, user_id, conversation_id):
+    # 多个对话更新时间相同，另有一个更新时间为空（倒序时排在最后）
+    updated = [BASE_TIME, BASE_TIME, BASE_TIME, BASE_TIME - timedelta(minutes=1), BASE_TIME + timedelta(minutes=1), None]
+    with app.app_context():
+        db.session.add_all(Conversation(user_id=user_id, title='对话') for _ in updated)
+        db.session.flush()
+        conversations = Conversation.query.filter_by(user_id=user_id).order_by(Conversation.id).all()
+        for conv, value in zip(conversations, updated + [BASE_TIME - timedelta(days=1)]):
+            db.session.execute(
+                db.update(Conversation).where(Conversation.id == conv.id).values(updated_at=value)
+            )
+        db.session.commit()
+        expected = [conv.id for conv in sorted(
+            Conversation.query.filter_by(user_id=user_id).all(),
+            key=lambda conv: (conv.updated_at is not None, conv.updated_at or BASE_TIME, conv.id),
+            reverse=True
+        )]
+
+    pages = fetch_all_pages(client, auth_headers, '/api/conversation', limit=2)
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert [conv_id for page in pages for conv_id in page] == expected
+
+def test_info_pages_follow_created_order_within_category(app, client, auth_headers, user_id, conversation_id):
+    with app.app_context():
+        rows = []
+        for i in range(7):
+            rows.append(UserInfo(
+                conversation_id=conversation_id,
+                user_id=user_id,
+                info_type='text',
+                title=f"信息{i}",
+                category='work' if i % 2 else 'meeting',
+                created_at=BASE_TIME - timedelta(minutes=i // 3)
+            ))
+        db.session.add_all(rows)
+        db.session.commit()
+        expected = [info.id for info in sorted(
+            (info for info in rows if info.category == 'meeting'),
+            key=lambda info: (info.created_at, info.id),
+            reverse=True
+        )]
+
+    pages = fetch_all_pages(client, auth_headers, '/api/process/info', limit=3, category='meeting')
+    assert [len(page) for page in pages] == [3, 1]
+    assert [info_id for page in pages for info_id in page] == expected
+
+@pytest.mark.parametrize('app_config', [{'MAX_PAGE_SIZE': 3}])
+def test_page_size_is_capped(app, client, auth_headers, user_id):
+    with app.app_context():
+        db.session.add_all(Conversation(user_id=user_id, title='对话') for _ in range(4))
+        db.session.commit()
+    response = client.get('/api/conversation', headers=auth_headers, query_string={'limit': 1000})
+    assert len(response.get_json()) == 3
+    assert response.headers.get('X-Next-Cursor')
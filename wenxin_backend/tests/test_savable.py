@@ -0,0 +1,91 @@
+from concurrent.futures import Future
+import numpy as np
+import pytest
+from app.utils.embedding import HashingEmbedder
+from app.utils.savable import SavableClassifier
+
+MODEL_TEXT = '帮我记一下奶茶店的新口味'
+
+@pytest.fixture
+def model_path(tmp_path):
+    """只对MODEL_TEXT给出高概率的小模型（规则不会命中这条消息）"""
+    weights = HashingEmbedder(64).embed([MODEL_TEXT])[0] * 20
+    path = tmp_path / 'savable.npz'
+    np.savez(path, weights=weights, bias=np.float32(-10), threshold=np.float32(0.6))
+    return str(path)
+
+@pytest.fixture
+def classifier():
+    classifier = SavableClassifier()
+    yield classifier
+    classifier.shutdown()
+
+@pytest.mark.parametrize('text, expected', [
+    ('这顿饭花了¥128', True),
+    ('明天下午3点开项目周会', True),
+    ('3月5日之前提交报销单', True),
+    ('明天天气怎么样', False),      # 只有时间没有事项
+    ('会议室在哪里', False),        # 只有事项没有时间
+    ('   ', False),
+    (None, False),
+])
+def test_rules_without_model(classifier, text, expected):
+    assert classifier.classify(text) is expected
+
+def test_no_model_file_uses_rules_only(tmp_path):
+    classifier = SavableClassifier(model_path=str(tmp_path / 'missing.npz'))
+    assert classifier.weights is None
+    assert classifier.score(MODEL_TEXT) is None
+    assert classifier.classify(MODEL_TEXT) is False
+    assert classifier.classify('明天下午3点开项目周会') is True
+    classifier.shutdown()
+
+def test_model_complements_rules(model_path):
+    classifier = SavableClassifier(model_path=model_path)
+    assert classifier.threshold == pytest.approx(0.6)
+    assert classifier.score(MODEL_TEXT) > 0.6
+    assert classifier.score('今天心情不错') < 0.6
+    assert classifier.classify(MODEL_TEXT) is True
+    assert classifier.classify('今天心情不错') is False
+    # 模型给出低概率时规则仍可判定为可保存
+    assert classifier.classify('这顿饭花了¥128') is True
+    classifier.shutdown()
+
+def test_bad_model_file_falls_back_to_rules(tmp_path, capsys):
+    path = tmp_path / 'broken.npz'
+    path.write_bytes(b'not a model')
+    classifier = SavableClassifier(model_path=str(path))
+    assert classifier.weights is None
+    assert '加载可保存信息模型错误' in capsys.readouterr().out
+    assert classifier.classify(MODEL_TEXT) is False
+    assert classifier.classify('这顿饭花了¥128') is True
+    classifier.shutdown()
+
+@pytest.fixture
+def app_config(model_path):
+    return {'SAVABLE_MODEL_PATH': model_path}
+
+def send(client, auth_headers, conversation_id, content):
+    response = client.post(
+        f"/api/conversation/{conversation_id}/message",
+        json={'content': content},
+        headers=auth_headers
+    )
+    assert response.status_code == 201
+    return response.get_json()['savable']
+
+def test_configured_model_is_used_for_messages(app, client, auth_headers, conversation_id):
+    assert app.extensions['savable'].weights is not None
+    assert send(client, auth_headers, conversation_id, MODEL_TEXT) is True
+    assert send(client, auth_headers, conversation_id, '今天心情不错') is False
+
+def test_classifier_errors_are_not_savable(app, client, auth_headers, conversation_id, monkeypatch):
+    def broken(text):
+        raise RuntimeError('模型损坏')
+    monkeypatch.setattr(app.extensions['savable'], 'classify', broken)
+    assert send(client, auth_headers, conversation_id, '这顿饭花了¥128') is False
+
+    failed = Future()
+    failed.set_exception(RuntimeError('模型损坏'))
+    monkeypatch.setattr(app.extensions['savable'], 'submit', lambda text: failed)
+    assert send(client, auth_headers, conversation_id, '这顿饭花了¥128') is False
@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+from app.extensions import db
+from app.models.user_info import UserInfo
+from app.utils.bm25 import BM25Index
+from app.utils.search_index import SearchService, UserSearchIndex
+from app.utils.tokenizer import search_terms
+from app.utils.vector_index import VectorIndex, assign_lists, train_centroids
+
+DOCUMENTS = [
+    '明天下午三点开项目周会',
+    '报销出差的火车票和酒店发票',
+    '周五之前提交季度工作总结',
+    '本月房租和水电费支出',
+    '项目评审会议改到下周一上午',
+]
+
+def build_bm25(documents):
+    index = BM25Index()
+    for position, text in enumerate(documents):
+        index.add(position, search_terms(text))
+    return index
+
+def test_bm25_ranks_matching_documents():
+    index = build_bm25(DOCUMENTS)
+    positions, scores = index.search(search_terms('项目会议'), 10)
+    # 只返回命中词项的文档，同时命中“项目”和“会议”的排在最前
+    assert list(positions[:1]) == [4]
+    assert set(positions) == {0, 4}
+    assert list(scores) == sorted(scores, reverse=True)
+
+def test_bm25_mask_and_round_trip():
+    index = build_bm25(DOCUMENTS)
+    mask = np.ones(len(DOCUMENTS), dtype=bool)
+    mask[4] = False
+    positions, _ = index.search(search_terms('项目会议'), 10, mask)
+    assert list(positions) == [0]
+
+    # 导出并丢弃第0个文档后恢复，其余文档的分数不依赖存放方式
+    remap = np.array([-1, 0, 1, 2, 3])
+    restored = BM25Index.from_arrays(index.to_arrays(remap, 4))
+    expected = build_bm25(DOCUMENTS[1:])
+    for query in ('发票', '会议 项目', '周五工作'):
+        terms = search_terms(query)
+        got_positions, got_scores = restored.search(terms, 10)
+        want_positions, want_scores = expected.search(terms, 10)
+        assert list(got_positions) == list(want_positions)
+        assert np.allclose(got_scores, want_scores)
+
+def ivf_index(vectors, nlist):
+    """按IVF倒排列表重排向量后建索引，返回(索引, 新位置 -> 原下标)"""
+    centroids = train_centroids(vectors, nlist)
+    assign = assign_lists(vectors, centroids)
+    order = np.argsort(assign, kind='stable')
+    offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+    return VectorIndex(vectors.shape[1], vectors[order], centroids, offsets), order
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(2000, 32)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+def test_ivf_with_all_lists_matches_brute_force(vectors):
+    index, order = ivf_index(vectors, 40)
+    brute = VectorIndex(32, vectors)
+    query = vectors[123]
+    positions, scores = index.search(query, 10, nprobe=40)
+    want_positions, want_scores = brute.search(query, 10)
+    assert list(order[positions]) == list(want_positions)
+    assert np.allclose(scores, want_scores)
+
+def test_ivf_recall(vectors):
+    index, order = ivf_index(vectors, 40)
+    rng = np.random.default_rng(2)
+    found = 0
+    for target in range(0, 2000, 20):
+        query = vectors[target] + rng.normal(scale=0.05, size=32).astype(np.float32)
+        query /= np.linalg.norm(query)
+        positions, _ = index.search(query, 1, nprobe=4)
+        found += int(order[positions[0]] == target)
+    assert found >= 95
+
+def test_delta_vectors_are_searched_after_base(vectors):
+    index, order = ivf_index(vectors[:1000], 20)
+    start = index.add(vectors[1000:1010])
+    positions, scores = index.search(vectors[1005], 1, nprobe=1)
+    assert list(positions) == [start + 5]
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+
+def test_snapshot_keeps_results(tmp_path):
+    service = SearchService(str(tmp_path), dim=64, ivf_min_items=4)
+    index = UserSearchIndex(64)
+    ids = list(range(1, len(DOCUMENTS) + 1))
+    index.add(ids, ['work'] * len(ids), DOCUMENTS, service.embedder.embed(DOCUMENTS), [1.0] * len(ids))
+    index.remove([2])
+    query = '项目会议'
+    vector = service.embedder.embed([query])[0]
+    before = [info_id for info_id, _ in index.search(search_terms(query), vector, 3, mode='bm25')]
+
+    service.save(7, index)
+    loaded = service.load(7)
+    assert loaded.vectors.centroids is not None
+    assert len(loaded) == len(DOCUMENTS) - 1
+    # 压缩移除已删除的文档后BM25统计量变化，排序不变
+    assert [info_id for info_id, _ in loaded.search(search_terms(query), vector, 3, mode='bm25')] == before
+    assert loaded.search(search_terms(query), vector, 3, mode='vector')[0][0] in (1, 5)
+
+def add_infos(app, user_id, conversation_id, items):
+    with app.app_context():
+        for title, category in items:
+            db.session.add(UserInfo(user_id=user_id, conversation_id=conversation_id, info_type='text', content=title,
+                                    category=category, title=title, description=title))
+        db.session.commit()
+
+def search(client, headers, **params):
+    return client.get('/api/search/query', headers=headers, query_string=params)
+
+def test_search_endpoint(app, client, auth_headers, conversation_id):
+    add_infos(app, 1, conversation_id, [(text, 'finance' if '费' in text or '发票' in text else 'work') for text in DOCUMENTS])
+    for mode in ('hybrid', 'bm25', 'vector'):
+        response = search(client, auth_headers, q='报销发票', mode=mode)
+        assert response.status_code == 200
+        assert response.get_json()[0]['title'] == DOCUMENTS[1]
+
+    results = search(client, auth_headers, q='费用 发票 项目', category='finance', mode='bm25').get_json()
+    assert {row['category'] for row in results} == {'finance'}
+
+    # 其他用户看不到
+    other = client.post('/api/auth/register', json={'username': 'other', 'password': 'other', 'email': 'o@example.com'})
+    assert other.status_code == 201
+    token = client.post('/api/auth/login', json={'username': 'other', 'password': 'other'}).get_json()['access_token']
+    assert search(client, {'Authorization': f"Bearer {token}"}, q='报销发票').get_json() == []
+
+def test_search_endpoint_validates_parameters(client, auth_headers):
+    assert search(client, auth_headers).status_code == 400
+    assert search(client, auth_headers, q='会议', mode='fuzzy').status_code == 400
+    assert search(client, auth_headers, q='会议', category='unknown').status_code == 400
+
+def test_new_items_are_searchable_after_upload(app, client, auth_headers, conversation_id):
+    response = client.post(
+        '/api/process/upload', headers=auth_headers,
+        data={'conversation_id': str(conversation_id), 'text': '下周三去机场接客户'},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 201
+    info_id = response.get_json()['info_items'][0]['id']
+    # 写入后立即更新本进程的索引，不等待同步间隔
+    results = search(client, auth_headers, q='模拟信息项', mode='bm25').get_json()
+    assert [row['id'] for row in results] == [info_id]
@@ -0,0 +1,65 @@
+import os
+import atexit
+import pytest
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models.user_info import UserInfo
+from app.utils import search_index
+
+@pytest.fixture
+def app_config():
+    return {'SEARCH_SYNC_INTERVAL': 0.0}
+
+def add_info(app, conversation_id, title):
+    with app.app_context():
+        info = UserInfo(user_id=1, conversation_id=conversation_id, info_type='text', content=title,
+                        category='work', title=title, description=title)
+        db.session.add(info)
+        db.session.commit()
+        return info.id
+
+def search_ids(client, headers, q):
+    response = client.get('/api/search/query', headers=headers, query_string={'q': q, 'mode': 'bm25'})
+    assert response.status_code == 200
+    return [row['id'] for row in response.get_json()]
+
+def test_edited_items_are_reindexed(app, client, auth_headers, conversation_id):
+    info_id = add_info(app, conversation_id, '周五提交季度总结')
+    assert search_ids(client, auth_headers, '季度总结') == [info_id]
+
+    with app.app_context():
+        info = db.session.get(UserInfo, info_id)
+        info.title = info.description = '下周一去机场接客户'
+        db.session.commit()
+    assert search_ids(client, auth_headers, '机场接客户') == [info_id]
+    assert search_ids(client, auth_headers, '季度总结') == []
+
+def test_vector_id_is_recorded_without_touching_updated_at(app, client, auth_headers, conversation_id):
+    info_id = add_info(app, conversation_id, '报销出差发票')
+    with app.app_context():
+        before = db.session.get(UserInfo, info_id).updated_at
+    search_ids(client, auth_headers, '发票')
+    with app.app_context():
+        info = db.session.get(UserInfo, info_id)
+        assert info.vector_id == f"local:{info_id}"
+        assert info.updated_at == before
+
+    # 回写vector_id没有改变updated_at，不会被当作修改再次建索引
+    index = app.extensions['search'].get_index(1)
+    unsaved = index.unsaved
+    search_ids(client, auth_headers, '发票')
+    assert index.unsaved == unsaved
+
+def test_create_app_does_not_register_atexit_per_app(app, monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, 'register', lambda func, *args, **kwargs: registered.append(func))
+    other = create_app()
+    assert registered == []
+    assert other.extensions['search'] in search_index._services
+
+def test_relative_index_path_is_resolved_against_backend_dir(app, monkeypatch):
+    monkeypatch.setattr(Config, 'SEARCH_INDEX_PATH', 'search_index_test')
+    other = create_app()
+    backend_dir = os.path.dirname(other.root_path)
+    assert other.extensions['search'].path == os.path.join(backend_dir, 'search_index_test')
@@ -0,0 +1,83 @@
+import time
+import pytest
+from app.utils.speculative import recent_save_content
+
+@pytest.fixture
+def app_config():
+    return {'LLM_CACHE_ENABLED': False}
+
+@pytest.fixture
+def extractor(app):
+    return app.extensions['speculative']
+
+@pytest.fixture
+def backend(app):
+    return app.extensions['llm_client'].backend
+
+@pytest.fixture
+def extraction_calls(backend, monkeypatch):
+    """记录模拟后端收到的信息提取调用次数"""
+    calls = []
+    chat = backend.chat
+
+    def counting_chat(model, messages, timeout, **params):
+        if '只返回JSON数组' in messages[-1]['content']:
+            calls.append(messages)
+        return chat(model, messages, timeout, **params)
+
+    monkeypatch.setattr(backend, 'chat', counting_chat)
+    return calls
+
+@pytest.fixture
+def chatted(client, auth_headers, conversation_id):
+    response = client.post(
+        f"/api/conversation/{conversation_id}/message",
+        json={'content': '明天下午3点开项目周会'},
+        headers=auth_headers
+    )
+    assert response.status_code == 201
+    return conversation_id
+
+def test_take_returns_items_for_same_content(app, extractor, chatted):
+    with app.app_context():
+        extractor.start(chatted).result(timeout=5)
+        items = extractor.take(chatted, recent_save_content(chatted), wait=1.0)
+    assert items and items[0]['title'] == '模拟信息项'
+    # 结果只能取出一次
+    with app.app_context():
+        assert extractor.take(chatted, recent_save_content(chatted), wait=1.0) is None
+
+def test_take_rejects_changed_content(app, extractor, chatted):
+    with app.app_context():
+        extractor.start(chatted).result(timeout=5)
+        assert extractor.take(chatted, 'user: 另一段内容', wait=1.0) is None
+
+def test_take_gives_up_after_wait(app, extractor, backend, chatted):
+    backend.latency = 2.0
+    with app.app_context():
+        content = recent_save_content(chatted)
+        extractor.start(chatted)
+        started = time.monotonic()
+        assert extractor.take(chatted, content, wait=0.2) is None
+    assert time.monotonic() - started < 1.0
+
+def test_take_ignores_expired_result(app, extractor, chatted):
+    extractor.ttl = 0
+    with app.app_context():
+        extractor.start(chatted)
+        assert extractor.take(chatted, recent_save_content(chatted), wait=1.0) is None
+
+def test_save_command_uses_speculative_result(app, client, auth_headers, extractor, extraction_calls, chatted):
+    with app.app_context():
+        extractor.start(chatted).result(timeout=5)
+    calls_before_save = len(extraction_calls)
+
+    response = client.post(
+        f"/api/conversation/{chatted}/message",
+        json={'content': '保存'},
+        headers=auth_headers
+    )
+    assert response.status_code == 201
+    assert len(extraction_calls) == calls_before_save
+    detail = client.get(f"/api/conversation/{chatted}", headers=auth_headers).get_json()
+    assert [item['title'] for item in detail['info_items']] == ['模拟信息项']
@@ -0,0 +1,78 @@
+import json
+import pytest
+from app.extensions import db
+from app.models.user_info import Message
+from app.utils.llm_client import LLMError
+
+def parse_events(body):
+    """按SSE格式解析响应体，返回[(事件名, 数据)]（未命名的事件为message）"""
+    events = []
+    for block in body.split('\n\n'):
+        if not block:
+            continue
+        name, data = 'message', None
+        for line in block.split('\n'):
+            field, _, value = line.partition(': ')
+            if field == 'event':
+                name = value
+            elif field == 'data':
+                data = json.loads(value)
+        events.append((name, data))
+    return events
+
+def assistant_messages(app, conversation_id):
+    with app.app_context():
+        return [row.content for row in Message.query.filter_by(conversation_id=conversation_id, role='assistant')]
+
+def stream_message(client, headers, conversation_id, content):
+    return client.post(
+        f"/api/conversation/{conversation_id}/message?stream=1",
+        json={'content': content},
+        headers=headers,
+        buffered=False
+    )
+
+def test_stream_framing_and_single_save_at_end(app, client, auth_headers, conversation_id):
+    response = stream_message(client, auth_headers, conversation_id, '你好')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    chunks = iter(response.response)
+    first = next(chunks).decode('utf-8')
+    assert first.startswith('event: start\n') and first.endswith('\n\n')
+    # 回复输出完之前不写入智能体消息
+    assert assistant_messages(app, conversation_id) == []
+
+    body = first + b''.join(chunks).decode('utf-8')
+    response.close()
+    events = parse_events(body)
+
+    names = [name for name, _ in events]
+    assert names[0] == 'start' and names[-1] == 'done'
+    assert set(names[1:-1]) == {'message'}
+    deltas = ''.join(data['delta'] for name, data in events if name == 'message')
+    done = events[-1][1]
+    assert events[0][1]['user_message']['content'] == '你好'
+    assert done['assistant_reply']['content'] == deltas
+    assert deltas.startswith('你好，我是问心智能体')
+    assert assistant_messages(app, conversation_id) == [deltas]
+
+def test_stream_error_saves_partial_reply_once(app, client, auth_headers, conversation_id, monkeypatch):
+    def broken_stream(model, messages, timeout, **params):
+        yield '部分'
+        raise LLMError('连接中断', transient=True)
+    monkeypatch.setattr(app.extensions['llm_client'].backend, 'stream', broken_stream)
+
+    response = stream_message(client, auth_headers, conversation_id, '你好')
+    events = parse_events(response.get_data(as_text=True))
+    assert [name for name, _ in events] == ['start', 'message', 'error', 'done']
+    assert assistant_messages(app, conversation_id) == ['部分']
+
+def test_stream_save_command_uses_same_events(app, client, auth_headers, conversation_id):
+    client.post(f"/api/conversation/{conversation_id}/message", json={'content': '明天下午3点开会'}, headers=auth_headers)
+    response = stream_message(client, auth_headers, conversation_id, '保存')
+    events = parse_events(response.get_data(as_text=True))
+    assert [name for name, _ in events] == ['start', 'message', 'done']
+    assert events[-1][1]['savable'] is False
+    assert len(assistant_messages(app, conversation_id)) == 2
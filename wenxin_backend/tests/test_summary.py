@@ -0,0 +1,85 @@
+import threading
+import pytest
+from app.extensions import db
+from app.models.user_info import Conversation
+from app.utils import context_builder
+
+@pytest.fixture
+def app_config():
+    return {'CHAT_CONTEXT_WINDOW': 4, 'CHAT_SUMMARY_BATCH': 2, 'SPECULATIVE_EXTRACTION_ENABLED': False}
+
+@pytest.fixture
+def blocked_summary(monkeypatch):
+    """摘要调用阻塞到测试放行为止，记录调用时的已有摘要"""
+    release = threading.Event()
+    started = threading.Semaphore(0)
+    calls = []
+
+    def summarize(previous, messages):
+        calls.append(previous)
+        started.release()
+        release.wait(10)
+        return f"摘要{len(calls)}"
+
+    monkeypatch.setattr(context_builder, 'summarize_conversation', summarize)
+    return release, started, calls
+
+def send(client, headers, conv_id, content):
+    response = client.post(f'/api/conversation/{conv_id}/message', headers=headers, json={'content': content})
+    assert response.status_code == 201
+
+def wait_for_summary(app):
+    """等待排队中的摘要更新完成"""
+    updater = app.extensions['summary_updater']
+    updater.executor.submit(lambda: None).result(timeout=10)
+
+def stored_summary(app, conv_id):
+    with app.app_context():
+        return db.session.get(Conversation, conv_id).summary
+
+def test_summary_runs_after_response(app, client, auth_headers, conversation_id, blocked_summary):
+    release, started, calls = blocked_summary
+    # 第4轮请求时已有6条消息，最近4条之外有2条旧消息
+    for i in range(4):
+        send(client, auth_headers, conversation_id, f"第{i}条消息")
+    # 摘要调用仍被阻塞，回复已经返回
+    assert started.acquire(timeout=10)
+    assert calls == [None]
+    assert stored_summary(app, conversation_id) is None
+
+    # 更新进行中时，后续请求不重复提交，继续使用已有摘要
+    send(client, auth_headers, conversation_id, '第4条消息')
+    assert calls == [None]
+
+    release.set()
+    wait_for_summary(app)
+    assert stored_summary(app, conversation_id) == '摘要1'
+
+    # 下一次更新在已有摘要的基础上合并
+    send(client, auth_headers, conversation_id, '第5条消息')
+    wait_for_summary(app)
+    assert calls == [None, '摘要1']
+    assert stored_summary(app, conversation_id) == '摘要2'
+
+def test_summary_does_not_touch_updated_at(app, client, auth_headers, conversation_id, blocked_summary):
+    release, started, _ = blocked_summary
+    for i in range(4):
+        send(client, auth_headers, conversation_id, f"第{i}条消息")
+    assert started.acquire(timeout=10)
+    with app.app_context():
+        before = db.session.get(Conversation, conversation_id).updated_at
+    release.set()
+    wait_for_summary(app)
+    with app.app_context():
+        conversation = db.session.get(Conversation, conversation_id)
+        assert conversation.summary == '摘要1'
+        assert conversation.updated_at == before
+
+@pytest.mark.parametrize('app_config', [{'CHAT_CONTEXT_WINDOW': 4, 'CHAT_SUMMARY_BATCH': 2, 'CHAT_SUMMARY_ASYNC': False}])
+def test_synchronous_mode(app, client, auth_headers, conversation_id, blocked_summary):
+    release, _, calls = blocked_summary
+    release.set()
+    for i in range(4):
+        send(client, auth_headers, conversation_id, f"第{i}条消息")
+    assert 'summary_updater' not in app.extensions
+    assert stored_summary(app, conversation_id) == '摘要1'
@@ -0,0 +1,75 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from app.extensions import db
+from app.models.user_info import TokenBlocklist
+from app.utils.token_blocklist import BloomFilter, purge_expired_tokens
+from conftest import register_user
+
+def new_jti():
+    return str(uuid.uuid4())
+
+def block(jti, created_at=None):
+    """模拟其他进程写入黑名单记录（不经过本进程的缓存）"""
+    db.session.add(TokenBlocklist(jti=jti, created_at=created_at or datetime.utcnow()))
+    db.session.commit()
+
+@pytest.fixture
+def cache(app):
+    return app.extensions['token_revocation']
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    added = [new_jti() for _ in range(1000)]
+    for jti in added:
+        bloom.add(jti)
+    assert all(jti in bloom for jti in added)
+    false_positives = sum(new_jti() in bloom for _ in range(5000))
+    assert false_positives < 5000 * 0.03
+
+def test_logout_revokes_only_that_token(client):
+    headers = register_user(client)
+    assert client.get('/api/conversation', headers=headers).status_code == 200
+
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    assert client.get('/api/conversation', headers=headers).status_code == 401
+    assert client.get('/api/conversation', headers=register_user(client)).status_code == 200
+
+def test_bloom_hit_without_row_is_not_revoked(app, cache):
+    jti = new_jti()
+    cache.revoke(jti)
+    with app.app_context():
+        assert cache.is_revoked(jti) is False
+
+@pytest.mark.parametrize('app_config', [{'JWT_BLOCKLIST_REFRESH_SECONDS': 3600}])
+def test_other_process_revocations_apply_after_refresh(app, cache):
+    jti = new_jti()
+    with app.app_context():
+        assert cache.is_revoked(jti) is False
+        block(jti)
+        # 刷新间隔内仍使用本进程的过滤器
+        assert cache.is_revoked(jti) is False
+        cache.refresh(force=True)
+        assert cache.is_revoked(jti) is True
+
+def test_refresh_picks_up_late_commits_behind_watermark(app, cache):
+    with app.app_context():
+        block(new_jti())
+        cache.refresh(force=True)
+        # 另一进程稍早开始、稍晚提交的记录，created_at在水位之前
+        late = new_jti()
+        block(late, cache.watermark - timedelta(seconds=2))
+        cache.refresh(force=True)
+        assert late in cache.bloom
+        assert cache.is_revoked(late) is True
+
+def test_rebuild_after_purge_drops_expired_entries(app, cache):
+    expired, recent = new_jti(), new_jti()
+    with app.app_context():
+        block(expired, datetime.utcnow() - timedelta(days=3))
+        block(recent)
+        cache.refresh(force=True)
+        assert purge_expired_tokens(86400) == 1
+        cache.rebuild()
+        assert expired not in cache.bloom
+        assert cache.is_revoked(recent) is True
@@ -0,0 +1,75 @@
+import random
+import pytest
+from app.utils import tokenizer
+from app.utils.ai_process import estimate_token_length, estimate_token_lengths, truncate_context
+from app.utils.tokenizer import fast_estimate, search_terms
+
+def reference_estimate(text):
+    """原来的逐字符估算方法"""
+    chinese_chars = sum(1 for c in text if '一' <= c <= '鿿')
+    english_words = len(text.split())
+    return chinese_chars + english_words
+
+SAMPLES = [
+    '',
+    '   ',
+    '你好',
+    'hello world',
+    '明天下午3点在A会议室开project周会',
+    '发票金额：¥1,280.00\n商户：星巴克 Starbucks',
+    '中文，标点。混合English\tand\n换行',
+    '一鿿边界字符㐀扩展A区',
+]
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_fast_estimate_matches_reference(text):
+    assert fast_estimate(text) == reference_estimate(text)
+
+def test_fast_estimate_matches_reference_on_random_text():
+    rng = random.Random(0)
+    alphabet = '问心智能体会议财务 abcXYZ019，。!\n\t　一鿿'
+    for _ in range(500):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        assert fast_estimate(text) == reference_estimate(text)
+
+def test_estimate_without_tokenizer_uses_regex(app):
+    with app.app_context():
+        assert estimate_token_length(SAMPLES[4]) == reference_estimate(SAMPLES[4])
+        assert estimate_token_lengths(SAMPLES) == [reference_estimate(text) for text in SAMPLES]
+
+@pytest.fixture
+def tokenizer_path(tmp_path):
+    """构造一个本地的小词表tokenizer.json：按字符切分，每个字符一个token"""
+    tokenizers = pytest.importorskip('tokenizers')
+    vocab = {'[UNK]': 0}
+    for char in ''.join(SAMPLES):
+        vocab.setdefault(char, len(vocab))
+    model = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token='[UNK]'))
+    model.pre_tokenizer = tokenizers.pre_tokenizers.Split('', behavior='isolated')
+    path = tmp_path / 'tokenizer.json'
+    model.save(str(path))
+    tokenizer.load_tokenizer.cache_clear()
+    yield str(path)
+    tokenizer.load_tokenizer.cache_clear()
+
+def test_configured_tokenizer_is_used(app, tokenizer_path):
+    app.config['QWEN_TOKENIZER_PATH'] = tokenizer_path
+    with app.app_context():
+        assert estimate_token_length('hello world') == len('hello world')
+        # 批量结果与逐条结果一致
+        assert estimate_token_lengths(SAMPLES) == [estimate_token_length(text) for text in SAMPLES]
+
+def test_missing_tokenizer_file_falls_back(app, tmp_path):
+    app.config['QWEN_TOKENIZER_PATH'] = str(tmp_path / 'missing.json')
+    with app.app_context():
+        assert estimate_token_length('hello world') == 2
+
+def test_truncate_context_keeps_latest_messages(app):
+    # 估算值依次为4、3、5（汉字数+空白分隔的词数）
+    context = [{'role': 'user', 'content': text} for text in ('一二三', '四五', '六七八九')]
+    with app.app_context():
+        assert truncate_context(context, max_tokens=8) == context[1:]
+        assert truncate_context(context, max_tokens=4) == context[1:2]
+
+def test_search_terms_use_unigrams_and_bigrams():
+    assert search_terms('周会 Project2024') == ['周', '会', '周会', 'project2024']
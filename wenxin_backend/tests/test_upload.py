@@ -0,0 +1,102 @@
+import io
+import os
+import pytest
+from flask import request
+from app.extensions import db
+from app.models.user_info import UploadQuota
+from app.utils.upload_quota import record_upload
+from app.utils.upload_stream import StreamedUpload
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+FILE_LIMIT = 2 * 1024 * 1024
+
+@pytest.fixture
+def app_config():
+    return {
+        'UPLOAD_MAX_BYTES': FILE_LIMIT,
+        'UPLOAD_MAX_CONTENT_LENGTH': FILE_LIMIT + 1024 * 1024,
+    }
+
+def upload(client, headers, conversation_id, payload, filename, **form):
+    data = {'conversation_id': str(conversation_id), 'file': (io.BytesIO(payload), filename)}
+    data.update(form)
+    return client.post('/api/process/upload', headers=headers, data=data, content_type='multipart/form-data')
+
+def leftover_files(app):
+    folder = app.config['UPLOAD_FOLDER']
+    return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+def test_oversized_file_is_rejected_and_removed(app, client, auth_headers, conversation_id):
+    response = upload(client, auth_headers, conversation_id, b'a' * (FILE_LIMIT + 1), 'big.txt')
+    assert response.status_code == 413
+    assert leftover_files(app) == []
+    with app.app_context():
+        assert db.session.query(UploadQuota).count() == 0
+
+@pytest.mark.parametrize('payload, filename', [
+    (b'not really a png image', 'fake.png'),
+    (PNG, 'photo.jpg'),
+    (b'hello\x00world' * 4, 'notes.txt'),
+])
+def test_content_not_matching_extension_is_rejected(app, client, auth_headers, conversation_id, payload, filename):
+    response = upload(client, auth_headers, conversation_id, payload, filename)
+    assert response.status_code == 415
+    assert leftover_files(app) == []
+
+def test_unsupported_extension_is_rejected(client, auth_headers, conversation_id):
+    response = upload(client, auth_headers, conversation_id, b'MZ' + b'\x00' * 32, 'tool.exe')
+    assert response.status_code == 400
+
+def test_upload_route_accepts_bodies_above_global_limit(app, client, auth_headers, conversation_id):
+    payload = b'x' * (FILE_LIMIT - 1024)
+    response = upload(client, auth_headers, conversation_id, payload, 'large.txt', **{'async': '1'})
+    assert response.status_code == 202
+    with app.app_context():
+        assert db.session.get(UploadQuota, 1).bytes_used == len(payload)
+
+def test_other_routes_keep_small_global_limit(app, client, auth_headers, conversation_id):
+    assert app.config['MAX_CONTENT_LENGTH'] < FILE_LIMIT - 1024
+    response = client.post(
+        f"/api/conversation/{conversation_id}/message",
+        json={'content': 'x' * (FILE_LIMIT - 1024)},
+        headers=auth_headers
+    )
+    assert response.status_code == 413
+
+def test_quota_limits_file_size(app, client, auth_headers, conversation_id):
+    app.config['UPLOAD_QUOTA_BYTES'] = 1024
+    response = upload(client, auth_headers, conversation_id, b'y' * 2048, 'quota.txt')
+    assert response.status_code == 413
+    assert leftover_files(app) == []
+
+def test_quota_is_checked_atomically(app, client, auth_headers, conversation_id, monkeypatch):
+    app.config['UPLOAD_QUOTA_BYTES'] = 1024
+    assert upload(client, auth_headers, conversation_id, b'a' * 600, 'first.txt', **{'async': '1'}).status_code == 202
+    # 模拟并发请求：读取剩余配额时另一个请求尚未提交，预检查通过
+    monkeypatch.setattr('app.routes.process.remaining_quota', lambda user_id: 1024)
+    response = upload(client, auth_headers, conversation_id, b'b' * 600, 'second.txt', **{'async': '1'})
+    assert response.status_code == 413
+    assert len(leftover_files(app)) == 1
+    with app.app_context():
+        quota = db.session.get(UploadQuota, 1)
+        assert (quota.bytes_used, quota.file_count) == (600, 1)
+
+def test_record_upload_respects_quota(app):
+    app.config['UPLOAD_QUOTA_BYTES'] = 100
+    with app.app_context():
+        assert not record_upload(1, 101)
+        assert record_upload(1, 60)
+        assert not record_upload(1, 41)
+        assert record_upload(1, 40)
+        db.session.commit()
+        assert db.session.get(UploadQuota, 1).bytes_used == 100
+
+@pytest.mark.parametrize('path, streamed', [
+    ('/api/auth/login', False),
+    ('/api/process/upload', True),
+])
+def test_only_upload_endpoints_stream_into_upload_folder(app, path, streamed):
+    data = {'file': (io.BytesIO(b'hello'), 'note.txt')}
+    with app.test_request_context(path, method='POST', data=data):
+        assert isinstance(request.files['file'].stream, StreamedUpload) == streamed
+        assert len(leftover_files(app)) == int(streamed)
@@ -0,0 +1,11 @@
+"""
+生产环境入口（gunicorn加载 wsgi:app）
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+开发调试仍可使用 python run.py（Flask开发服务器，单进程）
+"""
+import os
+from app import create_app
+
+app = create_app(os.getenv('FLASK_CONFIG', 'production'))